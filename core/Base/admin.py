@@ -60,7 +60,6 @@ class TagAdmin(ImportExportModelAdmin):
 admin.site.register(Tag, TagAdmin)
 
 class IndicatorAdmin(ImportExportModelAdmin):
-    resource_classes = [IndicatorResource, AnnualDataResource , MonthDataWideResource , QuarterDataWideResource]
     list_display = (
         'id',
         'title_ENG', 'code', 'frequency', 
@@ -76,6 +75,10 @@ class IndicatorAdmin(ImportExportModelAdmin):
     search_fields = ['code', 'title_ENG', 'title_AMH']
     autocomplete_fields = ['for_category', 'parent']
 
+    def get_resource_classes(self, request):
+        # the wide resources have a column per year, built on first use
+        return [IndicatorResource, annual_aggregate_resource(), month_aggregate_resource(), quarter_aggregate_resource()]
+
 admin.site.register(Indicator, IndicatorAdmin)
 
 
@@ -93,6 +96,7 @@ admin.site.register(DataPoint,  DataPointAdmin)
 class AnnualDataAdmin(ImportExportModelAdmin):
     resource_classes = [AnnualDataWideResource]
     list_display = ('indicator_title', 'for_datapoint', 'performance', 'target', 'is_verified',)
+    ordering = ('for_datapoint__year_EC',)
     list_filter = ('indicator__for_category__topic','indicator__for_category' ,'indicator',  'for_datapoint')
     search_fields = ('indicator__code','indicator__title_ENG','for_datapoint__year_EC', 'performance')
 
@@ -109,8 +113,8 @@ admin.site.register(AnnualData,  AnnualDataAdmin)
 
 
 class QuarterDataAdmin(ImportExportModelAdmin):
-    resource_classes = [QuarterDataResource, QuarterDataWideResource]
     list_display = ('id','for_datapoint', 'for_quarter', 'performance', 'target', 'is_verified')
+    ordering = ('for_datapoint__year_EC', 'for_quarter__number')
     list_filter = ('indicator__for_category__topic__title_ENG', 'indicator', 'for_datapoint')
     search_fields = (
         'indicator__for_category__topic__title_ENG',
@@ -121,14 +125,17 @@ class QuarterDataAdmin(ImportExportModelAdmin):
     autocomplete_fields = ['indicator']
     list_editable = ('for_datapoint','for_quarter', 'performance', 'target')
 
+    def get_resource_classes(self, request):
+        return [QuarterDataResource, quarter_aggregate_resource()]
+
     
 
 admin.site.register(QuarterData,  QuarterDataAdmin)
 
 
 class MonthDataAdmin(ImportExportModelAdmin):
-    resource_classes = [MonthDataResource,MonthDataWideResource]
     list_display = ('id','for_datapoint' , 'for_month' ,'performance','target', 'is_verified', )
+    ordering = ('for_datapoint__year_EC', 'for_month__number')
     list_filter = ('indicator' , 'for_datapoint')
     search_fields = (
         'indicator__for_category__topic__title_ENG',
@@ -140,6 +147,9 @@ class MonthDataAdmin(ImportExportModelAdmin):
     autocomplete_fields = ['indicator']
     list_editable = ('for_datapoint','for_month', 'performance', 'target')
 
+    def get_resource_classes(self, request):
+        return [MonthDataResource, month_aggregate_resource()]
+
 
 
 class TrendingIndicatorAdmin(ImportExportModelAdmin):
@@ -198,6 +208,13 @@ class ContentAdmin(ImportExportModelAdmin):
 admin.site.register(TrendingIndicator, TrendingIndicatorAdmin)
 
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('token', 'locked_by', 'locked_at', 'created_at', 'finished_at')
+
+
 auditlog.register(Indicator)
 auditlog.register(AnnualData)
 auditlog.register(MonthData)
@@ -11,14 +11,21 @@ from ..serializer import (
     WeeklyKPIRecordUpdateSerializer,
     DailyKPIRecordUpdateSerializer,
 )
-from ..serializer import TopicSerializers, TrendingIndicatorSerializer,IndicatorQuarterlySerializer
+from ..serializer import TopicSerializers, TrendingIndicatorSerializer,IndicatorQuarterlySerializer, JobSerializer
+from django.db import transaction
 from django.db.models import F, Prefetch
-from ..models import AnnualData, MonthData, QuarterData, DataPoint, TrendingIndicator, Category, Quarter, Month, KPIRecord, Document, DocumentCategory, Topic
+from ..models import AnnualData, MonthData, QuarterData, DataPoint, TrendingIndicator, Category, Quarter, Month, KPIRecord, Document, DocumentCategory, Topic, Job
+from ..rollups import deferred_rollups
+from .. import api_cache, audit, latest_values, series
+from ..latest_values import latest_records
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
 from django.db.models import Q
 import json
 from datetime import datetime
-from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, EthDate
+from ..ethiopian_calendar import ethiopian_week
+
 
 def indicator_data_api(request, indicator_title):
     try:
@@ -80,7 +87,8 @@ def indicator_data_api(request, indicator_title):
     if recent_year:
         dps = DataPoint.objects.filter(year_GC=recent_year)
         quarter_qs = QuarterData.objects.filter(for_datapoint__in=dps, indicator=indicator, is_verified=True)\
-            .select_related('for_quarter', 'for_datapoint')
+            .select_related('for_quarter', 'for_datapoint')\
+            .order_by('for_datapoint__year_EC', 'for_quarter__number')
         quarterly = [
             {
                 'quarter': q.for_quarter.title_ENG if q.for_quarter else '',
@@ -193,7 +201,8 @@ def indicator_data_by_id_api(request, indicator_id):
     if recent_year:
         dps = DataPoint.objects.filter(year_GC=recent_year)
         quarter_qs = QuarterData.objects.filter(for_datapoint__in=dps, indicator=indicator, is_verified=True)\
-            .select_related('for_quarter', 'for_datapoint')
+            .select_related('for_quarter', 'for_datapoint')\
+            .order_by('for_datapoint__year_EC', 'for_quarter__number')
         quarterly = [
             {
                 'quarter': q.for_quarter.title_ENG if q.for_quarter else '',
@@ -312,185 +321,187 @@ def indicators_bulk_api(request):
         errors = []
         results = []
 
-        for item in updates:
-            indicator_id = item.get('indicator_id')
-            value = item.get('value')
-            year_ec = item.get('year_ec')
-            year_gc = item.get('year_gc')
-
-            if not indicator_id or year_ec is None or value is None:
-                errors.append({'item': item, 'error': 'Missing indicator_id, year_ec, or value.'})
-                continue
-
-            try:
-                indicator = Indicator.objects.get(id=indicator_id)
-            except Indicator.DoesNotExist:
-                errors.append({'item': item, 'error': 'Indicator not found.'})
-                continue
-
-            datapoint, _ = DataPoint.objects.get_or_create(year_EC=year_ec)
-            if year_gc:
-                datapoint.year_GC = year_gc
-                datapoint.save()
-
-            try:
-                if mode_patch == 'annual':
-                    ad, created = AnnualData.objects.update_or_create(
-                        indicator=indicator,
-                        for_datapoint=datapoint,
-                        defaults={
-                            'performance': value, 
-                            'is_verified': is_verified_status,
-                            'submitted_by': request.user,
-                            'is_seen': False if not is_verified_status else True
-                        }
-
-                    )
-                    results.append({
-                        'indicator_id': indicator_id, 
-                        'year_ec': year_ec, 
-                        'value': value, 
-                        'created': created,
-                        'is_verified': ad.is_verified,
-                        'is_seen': ad.is_seen
-                    })
-
-                elif mode_patch == 'monthly':
-                    month_number = item.get('month_number')
-                    if month_number is None:
-                        errors.append({'item': item, 'error': 'month_number is required for monthly updates.'})
-                        continue
-                    month = Month.objects.filter(number=month_number).first()
-                    if not month:
-                        errors.append({'item': item, 'error': f'Month with number {month_number} not found.'})
-                        continue
-                    md, created = MonthData.objects.update_or_create(
-                        indicator=indicator,
-                        for_datapoint=datapoint,
-                        for_month=month,
-                        defaults={
-                            'performance': value, 
-                            'is_verified': is_verified_status,
-                            'submitted_by': request.user,
-                            'is_seen': False if not is_verified_status else True
-                        }
-
-                    )
-                    results.append({
-                        'indicator_id': indicator_id, 
-                        'year_ec': year_ec, 
-                        'month_number': month_number, 
-                        'value': value, 
-                        'created': created,
-                        'is_verified': md.is_verified,
-                        'is_seen': md.is_seen
-                    })
-
-                elif mode_patch == 'quarterly':
-                    quarter_number = item.get('quarter_number')
-                    if quarter_number is None:
-                        errors.append({'item': item, 'error': 'quarter_number is required for quarterly updates.'})
-                        continue
-                    quarter = Quarter.objects.filter(number=quarter_number).first()
-                    if not quarter:
-                        errors.append({'item': item, 'error': f'Quarter with number {quarter_number} not found.'})
-                        continue
-                    qd, created = QuarterData.objects.update_or_create(
-                        indicator=indicator,
-                        for_datapoint=datapoint,
-                        for_quarter=quarter,
-                        defaults={
-                            'performance': value, 
-                            'is_verified': is_verified_status,
-                            'submitted_by': request.user,
-                            'is_seen': False if not is_verified_status else True
-                        }
-
-                    )
-                    results.append({
-                        'indicator_id': indicator_id, 
-                        'year_ec': year_ec, 
-                        'quarter_number': quarter_number, 
-                        'value': value, 
-                        'created': created,
-                        'is_verified': qd.is_verified,
-                        'is_seen': qd.is_seen
-                    })
+        # daily saves refresh their weekly rollups once, after the loop; rows are audited per batch
+        with transaction.atomic(), deferred_rollups(), audit.bulk_audit(request.user, label='Data grid bulk save'):
+            for item in updates:
+                indicator_id = item.get('indicator_id')
+                value = item.get('value')
+                year_ec = item.get('year_ec')
+                year_gc = item.get('year_gc')
+
+                if not indicator_id or year_ec is None or value is None:
+                    errors.append({'item': item, 'error': 'Missing indicator_id, year_ec, or value.'})
+                    continue
+
+                try:
+                    indicator = Indicator.objects.get(id=indicator_id)
+                except Indicator.DoesNotExist:
+                    errors.append({'item': item, 'error': 'Indicator not found.'})
+                    continue
+
+                datapoint, _ = DataPoint.objects.get_or_create(year_EC=year_ec)
+                if year_gc:
+                    datapoint.year_GC = year_gc
+                    datapoint.save()
+
+                try:
+                    if mode_patch == 'annual':
+                        ad, created = AnnualData.objects.update_or_create(
+                            indicator=indicator,
+                            for_datapoint=datapoint,
+                            defaults={
+                                'performance': value, 
+                                'is_verified': is_verified_status,
+                                'submitted_by': request.user,
+                                'is_seen': False if not is_verified_status else True
+                            }
+
+                        )
+                        results.append({
+                            'indicator_id': indicator_id, 
+                            'year_ec': year_ec, 
+                            'value': value, 
+                            'created': created,
+                            'is_verified': ad.is_verified,
+                            'is_seen': ad.is_seen
+                        })
+
+                    elif mode_patch == 'monthly':
+                        month_number = item.get('month_number')
+                        if month_number is None:
+                            errors.append({'item': item, 'error': 'month_number is required for monthly updates.'})
+                            continue
+                        month = Month.objects.filter(number=month_number).first()
+                        if not month:
+                            errors.append({'item': item, 'error': f'Month with number {month_number} not found.'})
+                            continue
+                        md, created = MonthData.objects.update_or_create(
+                            indicator=indicator,
+                            for_datapoint=datapoint,
+                            for_month=month,
+                            defaults={
+                                'performance': value, 
+                                'is_verified': is_verified_status,
+                                'submitted_by': request.user,
+                                'is_seen': False if not is_verified_status else True
+                            }
+
+                        )
+                        results.append({
+                            'indicator_id': indicator_id, 
+                            'year_ec': year_ec, 
+                            'month_number': month_number, 
+                            'value': value, 
+                            'created': created,
+                            'is_verified': md.is_verified,
+                            'is_seen': md.is_seen
+                        })
+
+                    elif mode_patch == 'quarterly':
+                        quarter_number = item.get('quarter_number')
+                        if quarter_number is None:
+                            errors.append({'item': item, 'error': 'quarter_number is required for quarterly updates.'})
+                            continue
+                        quarter = Quarter.objects.filter(number=quarter_number).first()
+                        if not quarter:
+                            errors.append({'item': item, 'error': f'Quarter with number {quarter_number} not found.'})
+                            continue
+                        qd, created = QuarterData.objects.update_or_create(
+                            indicator=indicator,
+                            for_datapoint=datapoint,
+                            for_quarter=quarter,
+                            defaults={
+                                'performance': value, 
+                                'is_verified': is_verified_status,
+                                'submitted_by': request.user,
+                                'is_seen': False if not is_verified_status else True
+                            }
+
+                        )
+                        results.append({
+                            'indicator_id': indicator_id, 
+                            'year_ec': year_ec, 
+                            'quarter_number': quarter_number, 
+                            'value': value, 
+                            'created': created,
+                            'is_verified': qd.is_verified,
+                            'is_seen': qd.is_seen
+                        })
                 
-                elif mode_patch == 'weekly':
-                    week = item.get('week')
-                    date_str = item.get('date')
-                    if not date_str:
-                        errors.append({'item': item, 'error': 'date is required for weekly updates.'})
-                        continue
+                    elif mode_patch == 'weekly':
+                        week = item.get('week')
+                        date_str = item.get('date')
+                        if not date_str:
+                            errors.append({'item': item, 'error': 'date is required for weekly updates.'})
+                            continue
                     
-                    from datetime import datetime
-                    try:
-                        record_date = datetime.fromisoformat(date_str).date()
-                    except:
-                        errors.append({'item': item, 'error': f'Invalid date format: {date_str}'})
-                        continue
+                        from datetime import datetime
+                        try:
+                            record_date = datetime.fromisoformat(date_str).date()
+                        except:
+                            errors.append({'item': item, 'error': f'Invalid date format: {date_str}'})
+                            continue
                     
-                    kr, created = KPIRecord.objects.update_or_create(
-                        indicator=indicator,
-                        record_type='weekly',
-                        date=record_date,
-                        defaults={
-                            'performance': value, 
-                            'is_verified': is_verified_status,
-                            'submitted_by': request.user,
-                            'is_seen': False if not is_verified_status else True
-                        }
-
-                    )
-                    results.append({
-                        'indicator_id': indicator_id, 
-                        'date': date_str, 
-                        'week': week, 
-                        'value': value, 
-                        'created': created,
-                        'is_verified': kr.is_verified,
-                        'is_seen': kr.is_seen
-                    })
+                        kr, created = KPIRecord.objects.update_or_create(
+                            indicator=indicator,
+                            record_type='weekly',
+                            date=record_date,
+                            defaults={
+                                'performance': value, 
+                                'is_verified': is_verified_status,
+                                'submitted_by': request.user,
+                                'is_seen': False if not is_verified_status else True
+                            }
+
+                        )
+                        results.append({
+                            'indicator_id': indicator_id, 
+                            'date': date_str, 
+                            'week': week, 
+                            'value': value, 
+                            'created': created,
+                            'is_verified': kr.is_verified,
+                            'is_seen': kr.is_seen
+                        })
                 
-                elif mode_patch == 'daily':
-                    date_str = item.get('date')
-                    if not date_str:
-                        errors.append({'item': item, 'error': 'date is required for daily updates.'})
-                        continue
+                    elif mode_patch == 'daily':
+                        date_str = item.get('date')
+                        if not date_str:
+                            errors.append({'item': item, 'error': 'date is required for daily updates.'})
+                            continue
                     
-                    from datetime import datetime
-                    try:
-                        record_date = datetime.fromisoformat(date_str).date()
-                    except:
-                        errors.append({'item': item, 'error': f'Invalid date format: {date_str}'})
-                        continue
+                        from datetime import datetime
+                        try:
+                            record_date = datetime.fromisoformat(date_str).date()
+                        except:
+                            errors.append({'item': item, 'error': f'Invalid date format: {date_str}'})
+                            continue
                     
-                    kr, created = KPIRecord.objects.update_or_create(
-                        indicator=indicator,
-                        record_type='daily',
-                        date=record_date,
-                        defaults={
-                            'performance': value, 
-                            'is_verified': is_verified_status,
-                            'submitted_by': request.user,
-                            'is_seen': False if not is_verified_status else True
-                        }
-
-                    )
-                    results.append({
-                        'indicator_id': indicator_id, 
-                        'date': date_str, 
-                        'value': value, 
-                        'created': created,
-                        'is_verified': kr.is_verified,
-                        'is_seen': kr.is_seen
-                    })
+                        kr, created = KPIRecord.objects.update_or_create(
+                            indicator=indicator,
+                            record_type='daily',
+                            date=record_date,
+                            defaults={
+                                'performance': value, 
+                                'is_verified': is_verified_status,
+                                'submitted_by': request.user,
+                                'is_seen': False if not is_verified_status else True
+                            }
+
+                        )
+                        results.append({
+                            'indicator_id': indicator_id, 
+                            'date': date_str, 
+                            'value': value, 
+                            'created': created,
+                            'is_verified': kr.is_verified,
+                            'is_seen': kr.is_seen
+                        })
                 
-                else:
-                    errors.append({'item': item, 'error': 'Invalid mode.'})
-            except Exception as e:
-                errors.append({'item': item, 'error': str(e)})
+                    else:
+                        errors.append({'item': item, 'error': 'Invalid mode.'})
+                except Exception as e:
+                    errors.append({'item': item, 'error': str(e)})
 
         response = {
             'results': results, 
@@ -514,7 +525,7 @@ def indicators_bulk_api(request):
         return JsonResponse({'results': [], 'datapoints': datapoints})
     
     # Safeguard: Warn if requesting too many indicators
-    MAX_INDICATORS = 2000
+    MAX_INDICATORS = 5000
     if len(id_list) > MAX_INDICATORS:
         return JsonResponse({
             'error': f'Too many indicators requested. Maximum is {MAX_INDICATORS}, but {len(id_list)} were requested.',
@@ -532,29 +543,34 @@ def indicators_bulk_api(request):
         .only('id', 'title_ENG', 'title_AMH', 'code')
     )
 
-    # --- Preload Annual Data ---
-    annual_all = AnnualData.objects.filter(
-        indicator_id__in=id_list, for_datapoint__isnull=False
-    ).select_related('for_datapoint')
-
-    annual_map = {}
-    for row in annual_all.values('id', 'indicator_id', 'for_datapoint__year_EC', 'for_datapoint__year_GC', 'performance', 'is_verified', 'is_seen'):
-        lst = annual_map.setdefault(str(row['indicator_id']), [])
-        lst.append({
-            'id': row['id'],
-            'year_ec': row['for_datapoint__year_EC'],
-            'year_gc': row['for_datapoint__year_GC'],
-            'value': float(row['performance']) if row['performance'] is not None else None,
-            'is_verified': row['is_verified'],
-            'is_seen': row['is_seen']
-        })
+    year_gc_by_ec = {dp['year_ec']: dp['year_gc'] for dp in datapoints}
 
-    for arr in annual_map.values():
-        arr.sort(key=lambda x: (x['year_gc'] or ''), reverse=True)
+    # --- Annual Data (annual mode and the fallback only) ---
+    def load_annual_map():
+        annual_map = {}
+        for indicator_id, stored in series.load(id_list, 'annual').items():
+            lst = [
+                {
+                    'id': row_id,
+                    'year_ec': year,
+                    'year_gc': year_gc_by_ec.get(year),
+                    'value': value,
+                    'is_verified': verified,
+                    'is_seen': seen
+                }
+                for row_id, year, _, value, _, verified, seen in stored.points()
+                if year is not None
+            ]
+            if lst:
+                annual_map[str(indicator_id)] = lst
+
+        for arr in annual_map.values():
+            arr.sort(key=lambda x: (x['year_gc'] or ''), reverse=True)
+        return annual_map
 
     # --- Annual Mode ---
     if mode in ('annual', 'all'):
-        ser = IndicatorAnnualSerializer(indicators, many=True, context={'annual_map': annual_map})
+        ser = IndicatorAnnualSerializer(indicators, many=True, context={'annual_map': load_annual_map()})
         response_data = {'mode': 'annual', 'results': ser.data, 'datapoints': datapoints}
         if warning_message:
             response_data['warning'] = warning_message
@@ -562,30 +578,25 @@ def indicators_bulk_api(request):
 
     # --- Monthly Mode ---
     if mode == 'monthly':
-        month_rows = MonthData.objects.filter(indicator_id__in=id_list)\
-            .select_related('for_month', 'for_datapoint')\
-            .values(
-                'id', 'indicator_id', 'performance', 'is_verified', 'is_seen',
-                'for_month__month_ENG', 'for_month__month_AMH', 'for_month__number',
-                'for_datapoint__year_EC', 'for_datapoint__year_GC'
-            )
+        months = {}
+        for month in Month.objects.order_by('number', 'id'):
+            months.setdefault(month.number, month)
 
         monthly_map = {str(ind.id): [] for ind in indicators}
-        for r in month_rows:
-            ind_id = r.get('indicator_id')
-            if not ind_id:
-                continue
-            monthly_map.setdefault(str(ind_id), []).append({
-                'id': r.get('id'),
-                'month': r.get('for_month__month_ENG'),
-                'month_amh': r.get('for_month__month_AMH'),
-                'month_number': r.get('for_month__number'),
-                'year_ec': r.get('for_datapoint__year_EC'),
-                'year_gc': r.get('for_datapoint__year_GC'),
-                'value': float(r['performance']) if r.get('performance') is not None else None,
-                'is_verified': r.get('is_verified'),
-                'is_seen': r.get('is_seen'),
-            })
+        for indicator_id, stored in series.load([ind.id for ind in indicators], 'monthly').items():
+            for row_id, year, month_number, value, _, verified, seen in stored.points():
+                month = months.get(month_number)
+                monthly_map[str(indicator_id)].append({
+                    'id': row_id,
+                    'month': month.month_ENG if month else None,
+                    'month_amh': month.month_AMH if month else None,
+                    'month_number': month_number,
+                    'year_ec': year,
+                    'year_gc': year_gc_by_ec.get(year),
+                    'value': value,
+                    'is_verified': verified,
+                    'is_seen': seen,
+                })
 
         # sort latest -> oldest, months newest first
         for arr in monthly_map.values():
@@ -596,45 +607,31 @@ def indicators_bulk_api(request):
 
     # --- Quarterly Mode ---
     if mode == 'quarterly':
-        qrows = QuarterData.objects.filter(indicator_id__in=id_list)\
-            .select_related('for_quarter', 'for_datapoint')\
-            .values(
-                'id', 'indicator_id',
-                'for_quarter__title_ENG', 'for_quarter__number',
-                'for_datapoint__year_EC', 'for_datapoint__year_GC',
-                'performance', 'is_verified', 'is_seen'
-            )
-    
+        quarter_titles = {}
+        for quarter in Quarter.objects.order_by('number', 'id'):
+            quarter_titles.setdefault(quarter.number, quarter.title_ENG)
+
         quarterly_map = {str(ind.id): [] for ind in indicators}
-        for r in qrows:
-            # Skip incomplete data (strict None check)
-            if r.get('for_quarter__number') is None or r.get('for_datapoint__year_EC') is None:
-                continue
-            ind_id = r.get('indicator_id')
-            if not ind_id:
-                continue
-            data_item = {
-                'id': r.get('id'),
-                'quarter': r.get('for_quarter__title_ENG') or f'Q{r.get("for_quarter__number")}',
-                'quarter_number': int(r.get('for_quarter__number')),
-                'year_ec': r.get('for_datapoint__year_EC'),
-                'year_gc': r.get('for_datapoint__year_GC'),
-                'value': float(r.get('performance')) if r.get('performance') is not None else None,
-                'is_verified': r.get('is_verified'),
-                'is_seen': r.get('is_seen'),
-            }
-            quarterly_map.setdefault(str(ind_id), []).append(data_item)
-    
-        # Sort latest -> oldest by EC year and quarter number
-        def safe_int(v, default=0):
-            try:
-                return int(v) if v is not None else default
-            except (ValueError, TypeError):
-                return default
+        for indicator_id, stored in series.load([ind.id for ind in indicators], 'quarterly').items():
+            for row_id, year, quarter_number, value, _, verified, seen in stored.points():
+                # Skip incomplete data
+                if quarter_number is None or year is None:
+                    continue
+                quarterly_map[str(indicator_id)].append({
+                    'id': row_id,
+                    'quarter': quarter_titles.get(quarter_number) or f'Q{quarter_number}',
+                    'quarter_number': quarter_number,
+                    'year_ec': year,
+                    'year_gc': year_gc_by_ec.get(year),
+                    'value': value,
+                    'is_verified': verified,
+                    'is_seen': seen,
+                })
 
+        # Sort latest -> oldest by EC year and quarter number
         for arr in quarterly_map.values():
-            arr.sort(key=lambda x: (safe_int(x.get('year_ec')), safe_int(x.get('quarter_number'))), reverse=True)
-    
+            arr.sort(key=lambda x: (x['year_ec'], x['quarter_number']), reverse=True)
+
         ser = IndicatorQuarterlySerializer(indicators, many=True, context={'quarterly_map': quarterly_map})
         return JsonResponse({'mode': 'quarterly', 'results': ser.data, 'datapoints': datapoints})
 
@@ -643,18 +640,11 @@ def indicators_bulk_api(request):
         weekly_map = {ind.id: [] for ind in indicators}
         
         # Get 5 most recent weeks PER indicator
+        latest_weeks = latest_records([ind.id for ind in indicators], 'weekly', 5)
         for ind in indicators:
-            weekly_rows = KPIRecord.objects.filter(
-                indicator=ind, 
-                record_type='weekly'
-            ).order_by('-date')[:5]  # 5 per indicator
-            
-            for r in weekly_rows:
-                # Parse Ethiopian date to get week info
-                parts = r.ethio_date.split('-') if r.ethio_date else []
-                week_num = int(parts[2]) if len(parts) == 3 else 1
-                month_num = int(parts[1]) if len(parts) >= 2 else r.date.month
-                year_ec = int(parts[0]) if len(parts) >= 1 else None
+            for r in latest_weeks.get(ind.id, []):
+                # Ethiopian week info
+                year_ec, month_num, week_num = r.ethiopian_week()
                 
                 # Get month name
                 month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
@@ -693,16 +683,12 @@ def indicators_bulk_api(request):
         daily_map = {ind.id: [] for ind in indicators}
         
         # Get 10 most recent days PER indicator
+        latest_days = latest_records([ind.id for ind in indicators], 'daily', 10)
         for ind in indicators:
-            daily_rows = KPIRecord.objects.filter(
-                indicator=ind,
-                record_type='daily'
-            ).order_by('-date')[:10]  # 10 per indicator
-            
-            for r in daily_rows:
-                # Parse Ethiopian date
-                parts = r.ethio_date.split('-') if r.ethio_date else []
-                year_ec = int(parts[0]) if len(parts) >= 1 else None
+            for r in latest_days.get(ind.id, []):
+                # Ethiopian date, converted once per row
+                ethio_date = r.ethio_date
+                year_ec = int(ethio_date.split('-')[0])
                 
                 # Format Gregorian date
                 greg_date_str = r.date.strftime("%b %d, %Y")
@@ -711,7 +697,7 @@ def indicators_bulk_api(request):
                     'id': r.id,
                     'date': r.date.isoformat(),
                     'greg_date_formatted': greg_date_str,
-                    'ethio_date': r.ethio_date,
+                    'ethio_date': ethio_date,
                     'day_label': f"{greg_date_str}",
                     'year_ec': year_ec,
                     'year_gc': str(r.date.year),
@@ -733,7 +719,7 @@ def indicators_bulk_api(request):
         return JsonResponse({'mode': 'daily', 'results': results_data, 'datapoints': datapoints})
     
     # Fallback to annual if mode doesn't match any known types
-    ser = IndicatorAnnualSerializer(indicators, many=True, context={'annual_map': annual_map})
+    ser = IndicatorAnnualSerializer(indicators, many=True, context={'annual_map': load_annual_map()})
     
     return JsonResponse({'mode': 'annual', 'results': ser.data, 'datapoints': datapoints})
 
@@ -751,53 +737,54 @@ def kpi_weekly_bulk_api(request):
     errors = []
     results = []
 
-    for item in updates:
-        serializer = WeeklyKPIRecordUpdateSerializer(data=item)
-        if not serializer.is_valid():
-            errors.append({'item': item, 'error': serializer.errors})
-            continue
+    # one transaction, so the series and latest values are rebuilt once per indicator
+    with transaction.atomic(), audit.bulk_audit(request.user, label='Weekly KPI bulk save'):
+        for item in updates:
+            serializer = WeeklyKPIRecordUpdateSerializer(data=item)
+            if not serializer.is_valid():
+                errors.append({'item': item, 'error': serializer.errors})
+                continue
 
-        ind_id = serializer.validated_data.get('indicator_id')
-        date_val = serializer.validated_data.get('date')
-        perf = serializer.validated_data.get('performance', item.get('value'))
-        target = serializer.validated_data.get('target')
-        is_manager = request.user.is_category_manager or request.user.is_superuser
-        req_verified = serializer.validated_data.get('is_verified', True)
-        is_verified = is_manager and req_verified
+            ind_id = serializer.validated_data.get('indicator_id')
+            date_val = serializer.validated_data.get('date')
+            perf = serializer.validated_data.get('performance', item.get('value'))
+            target = serializer.validated_data.get('target')
+            is_manager = request.user.is_category_manager or request.user.is_superuser
+            req_verified = serializer.validated_data.get('is_verified', True)
+            is_verified = is_manager and req_verified
 
-        try:
-            indicator = Indicator.objects.get(id=ind_id)
-        except Indicator.DoesNotExist:
-            errors.append({'item': item, 'error': 'Indicator not found.'})
-            continue
-
-        try:
-            # validate week within month (1-5) based on Ethiopian date
-            eth = to_ethiopian(EthDate(date_val.day, date_val.month, date_val.year))
-            week_num = min(((eth.day - 1) // 7) + 1, 5)
-            if week_num < 1 or week_num > 5:
-                errors.append({'item': item, 'error': 'Week must be between 1 and 5 for the month.'})
+            try:
+                indicator = Indicator.objects.get(id=ind_id)
+            except Indicator.DoesNotExist:
+                errors.append({'item': item, 'error': 'Indicator not found.'})
                 continue
 
-            _, created = KPIRecord.objects.update_or_create(
-                indicator=indicator,
-                record_type='weekly',
-                date=date_val,
-                defaults={
-                    'performance': perf,
+            try:
+                # validate week within month (1-5) based on Ethiopian date
+                week_num = ethiopian_week(date_val, last_week=5)[2]
+                if week_num < 1 or week_num > 5:
+                    errors.append({'item': item, 'error': 'Week must be between 1 and 5 for the month.'})
+                    continue
+
+                _, created = KPIRecord.objects.update_or_create(
+                    indicator=indicator,
+                    record_type='weekly',
+                    date=date_val,
+                    defaults={
+                        'performance': perf,
+                        'target': target,
+                        'is_verified': is_verified,
+                    },
+                )
+                results.append({
+                    'indicator_id': ind_id,
+                    'date': date_val.isoformat() if hasattr(date_val, 'isoformat') else str(date_val),
+                    'value': perf,
                     'target': target,
-                    'is_verified': is_verified,
-                },
-            )
-            results.append({
-                'indicator_id': ind_id,
-                'date': date_val.isoformat() if hasattr(date_val, 'isoformat') else str(date_val),
-                'value': perf,
-                'target': target,
-                'created': created,
-            })
-        except Exception as e:
-            errors.append({'item': item, 'error': str(e)})
+                    'created': created,
+                })
+            except Exception as e:
+                errors.append({'item': item, 'error': str(e)})
 
     response = {
         'results': results, 
@@ -823,47 +810,49 @@ def kpi_daily_bulk_api(request):
     errors = []
     results = []
 
-    for item in updates:
-        serializer = DailyKPIRecordUpdateSerializer(data=item)
-        if not serializer.is_valid():
-            errors.append({'item': item, 'error': serializer.errors})
-            continue
-
-        ind_id = serializer.validated_data.get('indicator_id')
-        date_val = serializer.validated_data.get('date')
-        perf = serializer.validated_data.get('performance', item.get('value'))
-        target = serializer.validated_data.get('target')
-        # Enforce verification logic
-        is_manager = request.user.is_category_manager or request.user.is_superuser
-        req_verified = serializer.validated_data.get('is_verified', True)
-        is_verified = is_manager and req_verified
+    # weekly rollups are refreshed once per touched week at the end
+    with transaction.atomic(), deferred_rollups(), audit.bulk_audit(request.user, label='Daily KPI bulk save'):
+        for item in updates:
+            serializer = DailyKPIRecordUpdateSerializer(data=item)
+            if not serializer.is_valid():
+                errors.append({'item': item, 'error': serializer.errors})
+                continue
 
-        try:
-            indicator = Indicator.objects.get(id=ind_id)
-        except Indicator.DoesNotExist:
-            errors.append({'item': item, 'error': 'Indicator not found.'})
-            continue
+            ind_id = serializer.validated_data.get('indicator_id')
+            date_val = serializer.validated_data.get('date')
+            perf = serializer.validated_data.get('performance', item.get('value'))
+            target = serializer.validated_data.get('target')
+            # Enforce verification logic
+            is_manager = request.user.is_category_manager or request.user.is_superuser
+            req_verified = serializer.validated_data.get('is_verified', True)
+            is_verified = is_manager and req_verified
 
-        try:
-            _, created = KPIRecord.objects.update_or_create(
-                indicator=indicator,
-                record_type='daily',
-                date=date_val,
-                defaults={
-                    'performance': perf,
+            try:
+                indicator = Indicator.objects.get(id=ind_id)
+            except Indicator.DoesNotExist:
+                errors.append({'item': item, 'error': 'Indicator not found.'})
+                continue
+
+            try:
+                _, created = KPIRecord.objects.update_or_create(
+                    indicator=indicator,
+                    record_type='daily',
+                    date=date_val,
+                    defaults={
+                        'performance': perf,
+                        'target': target,
+                        'is_verified': is_verified,
+                    },
+                )
+                results.append({
+                    'indicator_id': ind_id,
+                    'date': date_val.isoformat() if hasattr(date_val, 'isoformat') else str(date_val),
+                    'value': perf,
                     'target': target,
-                    'is_verified': is_verified,
-                },
-            )
-            results.append({
-                'indicator_id': ind_id,
-                'date': date_val.isoformat() if hasattr(date_val, 'isoformat') else str(date_val),
-                'value': perf,
-                'target': target,
-                'created': created,
-            })
-        except Exception as e:
-            errors.append({'item': item, 'error': str(e)})
+                    'created': created,
+                })
+            except Exception as e:
+                errors.append({'item': item, 'error': str(e)})
 
     response = {
         'results': results, 
@@ -976,14 +965,17 @@ def acknowledge_seen_api(request):
     quarter_ids = request.data.get('quarter_ids', [])
     kpi_ids = request.data.get('kpi_ids', [])
 
-    if annual_ids:
-        AnnualData.objects.filter(id__in=annual_ids).update(is_seen=True)
-    if month_ids:
-        MonthData.objects.filter(id__in=month_ids).update(is_seen=True)
-    if quarter_ids:
-        QuarterData.objects.filter(id__in=quarter_ids).update(is_seen=True)
+    for model, ids in ((AnnualData, annual_ids), (MonthData, month_ids), (QuarterData, quarter_ids)):
+        if ids:
+            model.objects.filter(id__in=ids).update(is_seen=True)
+            series.mark_rows_dirty(model.objects.filter(id__in=ids))
     if kpi_ids:
-        KPIRecord.objects.filter(id__in=kpi_ids).update(is_seen=True)
+        records = KPIRecord.objects.filter(id__in=kpi_ids)
+        records.update(is_seen=True)
+        # QuerySet.update sends no post_save
+        touched = set(records.order_by().values_list('record_type', 'indicator_id'))
+        for record_type in latest_values.RECORD_FREQUENCIES:
+            series.mark_dirty({indicator_id for kind, indicator_id in touched if kind == record_type}, record_type)
 
     return Response({'status': 'success'})
 
@@ -1107,3 +1099,21 @@ def climate_indicators_analytics_api(request):
         'result': 'SUCCESS',
         'data': result
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def api_cache_stats(request):
+    """Hit/miss counters of the cached public endpoints."""
+    return Response(api_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status_api(request, token):
+    """Status and progress of a background job, for polling by the user who queued it (or staff)."""
+    # read from the primary: a replica may lag behind the worker's updates
+    job = get_object_or_404(Job.objects.using('default'), token=token)
+    if job.created_by_id != request.user.id and not request.user.is_staff:
+        return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(JobSerializer(job).data)
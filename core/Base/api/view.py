@@ -25,15 +25,18 @@ from Base.serializer import (
     CategoryIndicatorSerializers,
 )
 from django.contrib.auth.decorators import login_required
+from Base.api_cache import cached_api_response
 
 import requests
 
 @login_required(login_url='login')
 @api_view(['GET'])
+# the nested serializers read indicators and their data too, so every tracked model applies
+@cached_api_response('topic_lists_by_user', vary_on_user=True)
 def topic_lists(request):
     if request.method == 'GET':
         topics = Topic.objects.filter(is_initiative = False).annotate(category_count=Count('categories')).select_related()
-        serializer = TopicSerializers(topics, many=True)
+        serializer = TopicSerializers(topics, many=True, context={'request': request})
         return Response(serializer.data)
     
 
@@ -61,7 +64,7 @@ def filter_by_category_with_value(request):
                years = DataPoint.objects.all()
                year_serializer = DataPointSerializers(years, many=True)
 
-               annualData = AnnualData.objects.filter(indicator__in = indicators).select_related()
+               annualData = AnnualData.objects.filter(indicator__in = indicators).select_related().order_by('for_datapoint__year_EC')
                serializer2 = AnnualDataSerializers(annualData, many=True)
 
 
@@ -166,7 +169,7 @@ def filter_indicator_annual_value(request):
       
       
 
-      quarter_data_value =list( QuarterData.objects.filter(indicator__id__in = indicator_list_id_with_children ).values(
+      quarter_data_value =list( QuarterData.objects.filter(indicator__id__in = indicator_list_id_with_children ).order_by('for_datapoint__year_EC', 'for_quarter__number').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -180,7 +183,7 @@ def filter_indicator_annual_value(request):
       ))
 
 
-      month_data_value =list( MonthData.objects.filter(indicator__id__in = indicator_list_id_with_children ).values(
+      month_data_value =list( MonthData.objects.filter(indicator__id__in = indicator_list_id_with_children ).order_by('for_datapoint__year_EC', 'for_month__number').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -193,7 +196,7 @@ def filter_indicator_annual_value(request):
          'target'
       ))
 
-      annual_data_value =list( AnnualData.objects.filter(indicator__id__in = indicator_list_id_with_children ).values(
+      annual_data_value =list( AnnualData.objects.filter(indicator__id__in = indicator_list_id_with_children ).order_by('for_datapoint__year_EC').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -249,7 +252,7 @@ def detail_indicator_with_children(request, id):
       child_list(indicator)
 
 
-      annual_data_value =list(AnnualData.objects.filter(indicator__id__in = indicator_id_with_children ).values(
+      annual_data_value =list(AnnualData.objects.filter(indicator__id__in = indicator_id_with_children ).order_by('for_datapoint__year_EC').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -261,7 +264,7 @@ def detail_indicator_with_children(request, id):
          'target'
       ))
 
-      quarter_data_value =list( QuarterData.objects.filter(indicator__id__in = indicator_id_with_children ).values(
+      quarter_data_value =list( QuarterData.objects.filter(indicator__id__in = indicator_id_with_children ).order_by('for_datapoint__year_EC', 'for_quarter__number').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -274,7 +277,7 @@ def detail_indicator_with_children(request, id):
          'target'
       ))
 
-      month_data_value =list( MonthData.objects.filter(indicator__id__in = indicator_id_with_children ).values(
+      month_data_value =list( MonthData.objects.filter(indicator__id__in = indicator_id_with_children ).order_by('for_datapoint__year_EC', 'for_month__number').values(
          'id',
          'indicator__title_ENG',
          'indicator__title_AMH',
@@ -0,0 +1,170 @@
+"""
+Response and fragment cache for the read-heavy public APIs.
+
+Every cached entry is keyed by the current *version* of the models it is
+built from. Saving or deleting one of those models bumps its version when
+the transaction commits (see Base.signals), so stale entries are simply
+never read again and expire on their own; nothing has to be searched for
+and deleted. Writers that bypass model signals (bulk_create, bulk_update,
+QuerySet.update) call ``invalidate`` themselves.
+
+The versions live in the cache itself, so every worker process must share
+it: production defaults to the file backend (settings.CACHE_BACKEND).
+
+Lifetimes default to settings.CACHES['default']['TIMEOUT'] and can be
+overridden per endpoint with settings.API_CACHE_TTLS.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+PREFIX = 'api-cache'
+
+# Models whose changes invalidate cached payloads
+TRACKED_MODELS = (
+    'Base.Indicator', 'Base.AnnualData', 'Base.QuarterData', 'Base.MonthData', 'Base.KPIRecord',
+    'Base.Topic', 'Base.Category', 'Base.DataPoint', 'Base.Quarter', 'Base.Month',
+    'UserManagement.CategoryAssignment',
+)
+
+# name -> timeout of every cached endpoint/fragment, for the stats view
+registry = {}
+
+_state = threading.local()
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def _version_key(label):
+    return f'{PREFIX}:version:{label}'
+
+
+def versions(labels):
+    """Current version of each model label; missing versions are initialised."""
+    keys = {_version_key(label): label for label in labels}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # never reuse a number an evicted version may have had
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in sorted(keys)]
+
+
+def _flush():
+    labels = getattr(_state, 'pending', set())
+    _state.pending = set()
+    for label in labels:
+        key = _version_key(label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*models):
+    """
+    Bump the version of the given models (classes or 'app.Model' labels)
+    once the current transaction commits, so a reader cannot cache
+    uncommitted data under the new version.
+    """
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        _state.pending = pending = set()
+    pending.update(_label(model) for model in models)
+    # only the first callback of a transaction bumps
+    transaction.on_commit(_flush)
+
+
+def _count(name, outcome):
+    key = f'{PREFIX}:stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def stats():
+    """{name: {'hits': n, 'misses': n, 'timeout': seconds}} for every registered cache."""
+    keys = [f'{PREFIX}:stats:{name}:{outcome}' for name in registry for outcome in ('hit', 'miss')]
+    counts = cache.get_many(keys)
+    return {
+        name: {
+            'hits': counts.get(f'{PREFIX}:stats:{name}:hit', 0),
+            'misses': counts.get(f'{PREFIX}:stats:{name}:miss', 0),
+            'timeout': timeout,
+        }
+        for name, timeout in registry.items()
+    }
+
+
+def timeout_for(name, default=None):
+    ttls = getattr(settings, 'API_CACHE_TTLS', {})
+    if name in ttls:
+        return ttls[name]
+    if default is not None:
+        return default
+    return settings.CACHES['default'].get('TIMEOUT', 300)
+
+
+def get_or_build(name, parts, build, depends_on=TRACKED_MODELS, timeout=None):
+    """
+    Cached value of ``build()`` for the fragment ``name`` and key ``parts``,
+    rebuilt when one of the ``depends_on`` models changed. ``None`` is never
+    cached.
+    """
+    registry.setdefault(name, timeout_for(name, timeout))
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    version = '.'.join(str(v) for v in versions(_label(model) for model in depends_on))
+    key = f'{PREFIX}:{name}:{digest}:{hashlib.md5(version.encode()).hexdigest()}'
+
+    value = cache.get(key)
+    if value is not None:
+        _count(name, 'hit')
+        return value
+    _count(name, 'miss')
+    value = build()
+    if value is not None:
+        cache.set(key, value, timeout_for(name, timeout))
+    return value
+
+
+def cached_api_response(name, depends_on=TRACKED_MODELS, timeout=None, vary_on_user=False):
+    """
+    Cache successful GET responses of a DRF function view, keyed by the full
+    path including the query string (and the user for per-user payloads).
+    Goes below ``@api_view``.
+    """
+    def decorator(view):
+        registry.setdefault(name, timeout_for(name, timeout))
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            uncached = []
+
+            def build():
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK or not hasattr(response, 'data'):
+                    uncached.append(response)
+                    return None
+                return response.data
+
+            parts = (request.get_full_path(), request.user.pk if vary_on_user else None)
+            data = get_or_build(name, parts, build, depends_on, timeout)
+            if uncached:
+                return uncached[0]
+            return Response(data, status=status.HTTP_200_OK)
+        return wrapper
+    return decorator
@@ -0,0 +1,341 @@
+"""
+Audit log entries for bulk writes, and the audit index.
+
+django-auditlog records a LogEntry from post_save, which QuerySet.update()
+and bulk writes never send, and a diffed LogEntry per row is twice the
+writes of a large import. Bulk paths therefore record one aggregate entry
+per batch of rows, with the per-row changes in a compressed AuditBatch
+manifest the audit log screen expands on demand:
+
+- writers that know their rows call ``log_batch`` (or ``log_updates`` for
+  one change applied to many ids);
+- writers that save row by row (imports, bulk-save APIs) run inside
+  ``bulk_audit``, which turns off per-row auditlog entries and collects the
+  saved and deleted rows instead.
+
+Single interactive edits keep their per-row auditlog entries.
+
+Every entry also gets an AuditLogIndex row (``index_entries``) holding the
+actor's role, the model, the indicator and a change summary, so the audit
+log screen pages through one indexed table instead of looking up the
+object of every entry it shows.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from auditlog.registry import auditlog
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+
+BATCH_SIZE = 500
+# rows per aggregate entry
+BATCH_ROWS = 1000
+
+# models registered with auditlog (Base/admin.py) whose rows bulk_audit collects
+AUDITED_MODELS = (
+    'Base.Indicator', 'Base.AnnualData', 'Base.MonthData', 'Base.QuarterData', 'Base.DataPoint', 'Base.KPIRecord',
+    'Base.ProjectInitiatives', 'Base.SubProject',
+)
+
+# models whose rows belong to an indicator
+DATA_MODELS = ('annualdata', 'monthdata', 'quarterdata', 'kpirecord')
+
+
+def action_context(model_name):
+    """Where an action on ``model_name`` happened, for the audit log screen."""
+    if model_name in DATA_MODELS:
+        return "Data Table"
+    elif model_name == 'datasubmission':
+        return "Data Submission"
+    elif model_name == 'indicatorsubmission':
+        return "Indicator Submission"
+    elif model_name == 'indicator':
+        return "Indicator Management"
+    else:
+        return "System"
+
+
+def _changes(log):
+    try:
+        changes = log.changes if isinstance(log.changes, dict) else json.loads(log.changes or '{}')
+    except (TypeError, ValueError):
+        return {}
+    return changes if isinstance(changes, dict) else {}
+
+
+def changes_summary(log):
+    """One line describing the changes of a LogEntry."""
+    if log.action == LogEntry.Action.CREATE:
+        return "New record created"
+    elif log.action == LogEntry.Action.DELETE:
+        return "Record deleted"
+    elif log.action == LogEntry.Action.UPDATE:
+        changed_fields = list(_changes(log))
+        if len(changed_fields) == 1:
+            return f"{changed_fields[0]} updated"
+        elif 1 < len(changed_fields) <= 3:
+            return ", ".join(changed_fields) + " updated"
+        elif changed_fields:
+            return f"{len(changed_fields)} fields updated"
+        return "Record updated"
+    return ""
+
+
+def batch_summary(log, rows):
+    """One line describing an aggregate entry of ``rows`` rows."""
+    verb = {LogEntry.Action.CREATE: 'created', LogEntry.Action.DELETE: 'deleted'}.get(log.action, 'written')
+    return f"{rows} rows {verb}"
+
+
+def _changed_indicator_id(log):
+    # create and delete entries carry every field, the indicator foreign key as an id
+    for value in _changes(log).get('indicator') or ():
+        if value not in (None, 'None', ''):
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def index_entries(entries):
+    """
+    Write the AuditLogIndex rows of the given LogEntry objects, with one
+    lookup query per data model, one for indicator titles and one for the
+    actors' roles; returns the number of rows written.
+    """
+    AuditLogIndex = apps.get_model('Base', 'AuditLogIndex')
+    entries = [entry for entry in entries if entry.pk is not None]
+    if not entries:
+        return 0
+
+    models = {entry.pk: ContentType.objects.get_for_id(entry.content_type_id).model for entry in entries}
+    indicator_ids = {}
+    missing = {}
+    for entry in entries:
+        object_id = entry.object_id or entry.object_pk
+        if models[entry.pk] == 'indicator':
+            indicator_ids[entry.pk] = int(object_id) if str(object_id).isdigit() else None
+        elif models[entry.pk] in DATA_MODELS:
+            indicator_ids[entry.pk] = _changed_indicator_id(entry)
+            if indicator_ids[entry.pk] is None and str(object_id).isdigit():
+                missing.setdefault(models[entry.pk], {})[entry.pk] = int(object_id)
+    for model_name, object_ids in missing.items():
+        model = apps.get_model('Base', model_name)
+        row_indicators = dict(model.objects.filter(id__in=set(object_ids.values())).values_list('id', 'indicator_id'))
+        for entry_pk, object_id in object_ids.items():
+            indicator_ids[entry_pk] = row_indicators.get(object_id)
+
+    titles = dict(
+        apps.get_model('Base', 'Indicator').objects.filter(id__in={i for i in indicator_ids.values() if i})
+        .values_list('id', 'title_ENG')
+    )
+    # the actor is usually already loaded on the entry
+    actors = {
+        entry.actor_id: (entry.actor.is_importer, entry.actor.is_category_manager)
+        for entry in entries if entry.actor_id and LogEntry.actor.is_cached(entry)
+    }
+    uncached = {entry.actor_id for entry in entries if entry.actor_id and entry.actor_id not in actors}
+    if uncached:
+        actors.update(
+            (actor_id, flags) for actor_id, *flags in apps.get_model('UserManagement', 'CustomUser').objects.filter(
+                id__in=uncached
+            ).values_list('id', 'is_importer', 'is_category_manager')
+        )
+    roles = {
+        actor_id: 'importer' if is_importer else 'manager' if is_manager else ''
+        for actor_id, (is_importer, is_manager) in actors.items()
+    }
+
+    rows = []
+    for entry in entries:
+        indicator_id = indicator_ids.get(entry.pk)
+        batch_rows = getattr(entry, 'batch_rows', None)
+        rows.append(AuditLogIndex(
+            log_entry_id=entry.pk,
+            timestamp=entry.timestamp,
+            action=entry.action,
+            actor_id=entry.actor_id,
+            actor_role=roles.get(entry.actor_id, ''),
+            model=models[entry.pk],
+            indicator_id=indicator_id if indicator_id in titles else None,
+            indicator_title=titles.get(indicator_id, ''),
+            change_summary=(batch_summary(entry, batch_rows) if batch_rows else changes_summary(entry))[:255],
+            row_count=batch_rows or 1,
+        ))
+    AuditLogIndex.objects.bulk_create(rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return len(rows)
+
+
+def _row_action(rows):
+    actions = {action for _, action, _ in rows}
+    return actions.pop() if len(actions) == 1 else LogEntry.Action.UPDATE
+
+
+def log_batch(model, rows, actor=None, label='Bulk write', batch_size=BATCH_ROWS):
+    """
+    Record ``rows`` ([object_pk, action, {field: [old, new]}]) of ``model``
+    as one aggregate entry per ``batch_size`` rows; returns the entries.
+    """
+    AuditBatch = apps.get_model('Base', 'AuditBatch')
+    rows = list(rows)
+    if not getattr(actor, 'is_authenticated', False):
+        # e.g. AnonymousUser on an unauthenticated request
+        actor = None
+    content_type = ContentType.objects.get_for_model(model)
+    now = timezone.now()
+    entries, batches = [], []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        entry = LogEntry(
+            content_type=content_type,
+            object_pk='',
+            object_repr=f'{label}: {len(batch)} {model._meta.verbose_name_plural}',
+            action=_row_action(batch),
+            changes={},
+            actor=actor,
+            actor_email=getattr(actor, 'email', None),
+            timestamp=now,
+            additional_data={'batch': {'label': label, 'rows': len(batch)}},
+        )
+        entry.batch_rows = len(batch)
+        entries.append(entry)
+        batches.append(batch)
+    # bulk_create sends no post_save, so the entries are indexed here
+    LogEntry.objects.bulk_create(entries)
+    AuditBatch.objects.bulk_create(
+        AuditBatch(log_entry=entry, row_count=len(batch), manifest=AuditBatch.pack(batch))
+        for entry, batch in zip(entries, batches)
+    )
+    index_entries(entries)
+    return entries
+
+
+def log_updates(model, object_ids, changes, actor=None, label='Bulk update', batch_size=BATCH_ROWS):
+    """
+    Record the same ``changes`` ({field: [old, new]}) for every id in
+    ``object_ids`` as aggregate entries; returns the number of rows recorded.
+    """
+    changes = {field: [str(old), str(new)] for field, (old, new) in changes.items()}
+    rows = [[str(pk), LogEntry.Action.UPDATE, changes] for pk in object_ids]
+    log_batch(model, rows, actor=actor, label=label, batch_size=batch_size)
+    return len(rows)
+
+
+def _value(value):
+    return None if value is None else str(value)
+
+
+def _audited_fields(model):
+    # the automatic timestamps change on every save and are left out
+    return [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key or getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False))
+    ]
+
+
+def row_changes(instance, action, original=None):
+    """
+    {field: [old, new]} of a saved or deleted row. Updates list only the
+    fields that differ from ``original`` (the stored values before the save).
+    """
+    fields = _audited_fields(type(instance))
+    if action == LogEntry.Action.DELETE:
+        return {field.attname: [_value(getattr(instance, field.attname)), None] for field in fields}
+    if action == LogEntry.Action.UPDATE and original is not None:
+        changes = {
+            field.attname: [_value(original.get(field.attname)), _value(getattr(instance, field.attname))]
+            for field in fields
+        }
+        return {name: values for name, values in changes.items() if values[0] != values[1]}
+    return {field.attname: [None, _value(getattr(instance, field.attname))] for field in fields}
+
+
+_state = threading.local()
+
+
+class _Collector:
+    def __init__(self, actor, label, batch_size):
+        self.actor = actor
+        self.label = label
+        self.batch_size = batch_size
+        self.rows = {}
+        # (model, pk) -> stored values before the first save of the row in this batch
+        self.originals = {}
+
+    def remember(self, model, instance):
+        key = (model, str(instance.pk))
+        if key not in self.originals:
+            self.originals[key] = model._base_manager.filter(pk=instance.pk).values(
+                *[field.attname for field in _audited_fields(model)]
+            ).first()
+
+    def add(self, model, instance, action):
+        rows = self.rows.setdefault(model, {})
+        pk = str(instance.pk)
+        if pk not in rows and len(rows) >= self.batch_size:
+            # a full batch is written when the next row arrives, so repeated saves of a row stay together
+            self.flush(model)
+            rows = self.rows.setdefault(model, {})
+        if pk in rows and action != LogEntry.Action.DELETE:
+            # e.g. update_or_create followed by a save: one row, still a create
+            action = rows[pk][1]
+        rows[pk] = [pk, action, row_changes(instance, action, self.originals.get((model, pk)))]
+
+    def flush(self, model=None):
+        for model in [model] if model else list(self.rows):
+            rows = self.rows.pop(model, {})
+            for pk in rows:
+                self.originals.pop((model, pk), None)
+            if rows:
+                log_batch(model, rows.values(), actor=self.actor, label=self.label, batch_size=self.batch_size)
+
+
+@contextmanager
+def bulk_audit(actor=None, label='Bulk write', batch_size=BATCH_ROWS):
+    """
+    Record the rows of audited models saved or deleted inside the block as
+    aggregate entries (see ``log_batch``) instead of one LogEntry per row.
+    Rows still pending are written when the block exits, unless it failed
+    inside a transaction that will roll them back.
+    """
+    if getattr(_state, 'collector', None) is not None:
+        # nested batch: the outermost one writes
+        yield
+        return
+
+    _state.collector = collector = _Collector(actor, label, batch_size)
+    write = True
+    try:
+        with disable_auditlog():
+            yield
+    except BaseException:
+        # rows saved in autocommit mode stay written even though the block failed
+        write = not transaction.get_connection().in_atomic_block
+        raise
+    finally:
+        _state.collector = None
+        if write:
+            collector.flush()
+
+
+def remember(model, instance):
+    """Keep the stored values of a row about to be updated inside a ``bulk_audit`` block."""
+    collector = getattr(_state, 'collector', None)
+    if collector is None or instance._state.adding or instance.pk is None or not auditlog.contains(model):
+        return
+    collector.remember(model, instance)
+
+
+def collect(model, instance, action):
+    """Add a saved or deleted row to the current ``bulk_audit`` block; False outside one."""
+    collector = getattr(_state, 'collector', None)
+    if collector is None or not auditlog.contains(model):
+        return False
+    collector.add(model, instance, action)
+    return True
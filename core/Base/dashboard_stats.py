@@ -0,0 +1,132 @@
+"""
+Statistics of the data management dashboard, kept in one snapshot row.
+
+The dashboard used to run about 30 queries per view, counting every data
+table twice and each month of the current year separately. ``compute``
+gathers the headline counts, the data composition, freshness, the category
+histogram and the monthly coverage with a handful of grouped aggregates,
+and the result is stored in a StatisticsSnapshot so a page view reads one
+row.
+
+Writes to the counted tables mark the snapshot stale once per transaction
+(signals for single saves, ``mark_stale`` from bulk writers); the next view
+or the ``refresh_dashboard_stats`` command recomputes it.
+"""
+import threading
+from datetime import datetime
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from project.db_router import read_from_replicas
+
+
+KEY = 'dashboard'
+
+# tables whose writes change the dashboard statistics
+SOURCE_MODELS = (
+    'Base.Topic', 'Base.Category', 'Base.Indicator', 'Base.AnnualData', 'Base.QuarterData', 'Base.MonthData',
+    'Base.DataPoint', 'Base.Month', 'Base.Document', 'UserManagement.CustomUser',
+)
+
+_state = threading.local()
+
+
+def compute():
+    """The dashboard statistics as a JSON-serializable dict."""
+    model = apps.get_model
+    indicators = model('Base.Indicator').objects.aggregate(
+        total=Count('id'), verified=Count('id', filter=Q(is_verified=True)),
+    )
+    annual = model('Base.AnnualData').objects.aggregate(
+        records=Count('id'), indicators=Count('indicator', distinct=True),
+    )
+    monthly = model('Base.MonthData').objects.aggregate(records=Count('id'), last_entry_at=Max('created_at'))
+
+    categories = model('Base.Category').objects.annotate(
+        indicator_count=Count('indicators')
+    ).order_by('-indicator_count').values_list('name_ENG', 'indicator_count')[:10]
+
+    current_year = model('Base.DataPoint').objects.order_by('-year_EC').values_list('id', 'year_EC').first()
+    month_counts = {}
+    if current_year:
+        month_counts = dict(
+            model('Base.MonthData').objects.filter(for_datapoint_id=current_year[0])
+            .order_by().values('for_month_id').annotate(count=Count('id')).values_list('for_month_id', 'count')
+        )
+    months = list(model('Base.Month').objects.order_by('number').values_list('id', 'month_ENG'))
+
+    return {
+        'total_topics': model('Base.Topic').objects.count(),
+        'total_categories': model('Base.Category').objects.count(),
+        'total_indicators': indicators['total'],
+        'verified_indicators': indicators['verified'],
+        'indicators_with_data': annual['indicators'],
+        'composition': [annual['records'], model('Base.QuarterData').objects.count(), monthly['records']],
+        'last_entry_at': monthly['last_entry_at'].isoformat() if monthly['last_entry_at'] else None,
+        'cat_names': [name for name, _ in categories],
+        'cat_counts': [count for _, count in categories],
+        'current_year': current_year[1] if current_year else None,
+        'months': [label for _, label in months],
+        'monthly_data': [month_counts.get(month_id, 0) for month_id, _ in months],
+        'total_documents': model('Base.Document').objects.count(),
+        'total_users': model('UserManagement.CustomUser').objects.filter(is_active=True).count(),
+    }
+
+
+@read_from_replicas(False)
+def refresh():
+    """Recompute and store the snapshot; returns the StatisticsSnapshot."""
+    StatisticsSnapshot = apps.get_model('Base', 'StatisticsSnapshot')
+    # a write committed while computing leaves changed_at >= computed_at, so it is not lost
+    started = timezone.now()
+    data = compute()
+    snapshot, _ = StatisticsSnapshot.objects.update_or_create(
+        key=KEY, defaults={'data': data, 'computed_at': started},
+    )
+    return snapshot
+
+
+def snapshot():
+    """The current dashboard statistics, recomputed first if the data changed since."""
+    StatisticsSnapshot = apps.get_model('Base', 'StatisticsSnapshot')
+    stored = StatisticsSnapshot.objects.filter(key=KEY).first()
+    if stored is None or stored.is_stale:
+        stored = refresh()
+    return stored.data
+
+
+def _flush():
+    if not getattr(_state, 'pending', False):
+        return
+    _state.pending = False
+    apps.get_model('Base', 'StatisticsSnapshot').objects.filter(key=KEY).update(changed_at=timezone.now())
+
+
+def mark_stale():
+    """Mark the snapshot stale once the current transaction commits."""
+    _state.pending = True
+    # only the first callback of a transaction writes
+    transaction.on_commit(_flush)
+
+
+def freshness(last_entry_at, now=None):
+    """'Today', 'N Days Ago' or 'No Data' for an ISO timestamp of the last data entry."""
+    if not last_entry_at:
+        return "No Data"
+    diff = (now or timezone.now()) - datetime.fromisoformat(last_entry_at)
+    return "Today" if diff.days == 0 else f"{diff.days} Days Ago"
+
+
+def context(stats):
+    """Template context of the statistics, with the derived rates."""
+    total = stats['total_indicators']
+    data_gap_count = total - stats['indicators_with_data']
+    return {
+        **stats,
+        'pending_verifications': total - stats['verified_indicators'],
+        'verification_rate': round(stats['verified_indicators'] / total * 100, 1) if total > 0 else 0,
+        'data_gap_count': data_gap_count,
+        'data_gap_percentage': round(data_gap_count / total * 100, 1) if total > 0 else 0,
+        'freshness': freshness(stats['last_entry_at']),
+    }
@@ -0,0 +1,133 @@
+"""
+Year-over-year change computation for AnnualData, QuarterData and MonthData.
+
+A series is looked up once and every requested lag is computed column-wise
+over it, instead of one ``.get()`` per observation and per lag. NumPy is not
+a dependency of the project, so the column math is done on plain lists.
+"""
+
+DEFAULT_LAGS = (1, 5, 10)
+
+
+def apply_kpi_direction(change, percent, kpi_characteristics):
+    """
+    Round a change and apply the KPI sign rule: for decreasing KPIs a drop is
+    an improvement, so the sign is flipped. Increasing, constant and volatile
+    KPIs keep the raw sign.
+    """
+    if kpi_characteristics == 'dec':
+        return {"change": round(-change, 1), "percent": round(-percent, 1)}
+    return {"change": round(change, 1), "percent": round(percent, 1)}
+
+
+def performance_change(current, previous, kpi_characteristics):
+    """Change between two performance values, or None when it is undefined."""
+    if previous is None or current is None or previous == 0:
+        return None
+    change = current - previous
+    return apply_kpi_direction(change, (change / previous) * 100, kpi_characteristics)
+
+
+def delta_columns(current, previous, kpi_characteristics):
+    """
+    Vectorised form of performance_change(): takes three equal-length columns
+    and returns one delta (or None) per position.
+    """
+    valid = [c is not None and p is not None and p != 0 for c, p in zip(current, previous)]
+    change = [c - p if ok else None for c, p, ok in zip(current, previous, valid)]
+    percent = [d / p * 100 if ok else None for d, p, ok in zip(change, previous, valid)]
+    return [
+        apply_kpi_direction(d, pct, kpi) if ok else None
+        for d, pct, kpi, ok in zip(change, percent, kpi_characteristics, valid)
+    ]
+
+
+def period_field(model):
+    """Name of the period FK column (``for_quarter_id``/``for_month_id``) or None for annual data."""
+    field = getattr(model, 'DELTA_PERIOD_FIELD', None)
+    return f'{field}_id' if field else None
+
+
+def series_key(row, field):
+    if row.for_datapoint is None:
+        return None
+    return (row.indicator_id, int(row.for_datapoint.year_EC), getattr(row, field) if field else None)
+
+
+def build_series(rows, field):
+    """Index already loaded observations as {(indicator_id, year_EC, period_id): performance}."""
+    series = {}
+    for row in rows:
+        key = series_key(row, field)
+        if key is not None:
+            series.setdefault(key, row.performance)
+    return series
+
+
+def load_series(model, rows, lags=DEFAULT_LAGS):
+    """
+    Fetch, in a single query, every observation the given rows will be
+    compared against. Returns the series index and the KPI characteristics of
+    the indicators involved.
+    """
+    field = period_field(model)
+    indicator_ids = set()
+    years = set()
+    for row in rows:
+        if row.for_datapoint_id is None or row.indicator_id is None:
+            continue
+        indicator_ids.add(row.indicator_id)
+        years.update(int(row.for_datapoint.year_EC) - lag for lag in lags)
+
+    if not indicator_ids:
+        return {}, {}
+
+    columns = ['indicator_id', 'for_datapoint__year_EC', 'performance', 'indicator__kpi_characteristics']
+    if field:
+        columns.append(field)
+
+    series = {}
+    kpi_characteristics = {}
+    queryset = model.objects.filter(
+        indicator_id__in=indicator_ids,
+        for_datapoint__year_EC__in=years,
+    ).order_by('id').values_list(*columns)
+    for values in queryset:
+        indicator_id, year, performance, kpi = values[:4]
+        period = values[4] if field else None
+        series.setdefault((indicator_id, year, period), performance)
+        kpi_characteristics[indicator_id] = kpi
+    return series, kpi_characteristics
+
+
+def series_deltas(rows, lags=DEFAULT_LAGS, series=None, kpi_characteristics=None):
+    """
+    Compute the change for every row and every lag in one pass.
+
+    ``rows`` are observations of a single model (one or many indicators).
+    When ``series`` is omitted the comparison values are loaded with one
+    query; pass the index from build_series() when the whole series is
+    already in memory. ``kpi_characteristics`` maps indicator id to its
+    ``kpi_characteristics``.
+
+    Returns ``{lag: [delta or None, ...]}`` aligned with ``rows``.
+    """
+    rows = list(rows)
+    if not rows:
+        return {lag: [] for lag in lags}
+
+    field = period_field(type(rows[0]))
+    if series is None:
+        series, loaded_kpis = load_series(type(rows[0]), rows, lags)
+        kpi_characteristics = {**loaded_kpis, **(kpi_characteristics or {})}
+    kpi_characteristics = kpi_characteristics or {}
+
+    keys = [series_key(row, field) for row in rows]
+    current = [row.performance if key else None for row, key in zip(rows, keys)]
+    kpis = [kpi_characteristics.get(row.indicator_id) for row in rows]
+
+    deltas = {}
+    for lag in lags:
+        previous = [series.get((key[0], key[1] - lag, key[2])) if key else None for key in keys]
+        deltas[lag] = delta_columns(current, previous, kpis)
+    return deltas
@@ -0,0 +1,98 @@
+"""
+Precomputed Ethiopian <-> Gregorian calendar table.
+
+``to_ethiopian(EthDate(...))`` walks the whole conversion arithmetic on every
+call. The rows we render and aggregate only ever use dates from a bounded
+range, so the Ethiopian year/month/day of every Gregorian day in that range
+is computed once, stored in compact arrays indexed by the date ordinal and
+looked up in O(1). Dates outside the table fall back to the library.
+"""
+from array import array
+from datetime import date
+from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, to_gregorian, EthDate
+
+
+FIRST_DATE = date(1900, 1, 1)
+LAST_DATE = date(2099, 12, 31)
+
+_FIRST_ORDINAL = FIRST_DATE.toordinal()
+_table = None
+
+
+def _pagume_length(eth_year):
+    # Pagume has a sixth day in the year before an Ethiopian leap year
+    return 6 if eth_year % 4 == 3 else 5
+
+
+def _build():
+    """Fill the lookup arrays by stepping through the Ethiopian calendar day by day."""
+    years, months, days = array('H'), array('B'), array('B')
+    year_starts = {}
+
+    eth = to_ethiopian(EthDate(FIRST_DATE.day, FIRST_DATE.month, FIRST_DATE.year))
+    year, month, day = eth.year, eth.month, eth.day
+    for ordinal in range(_FIRST_ORDINAL, LAST_DATE.toordinal() + 1):
+        years.append(year)
+        months.append(month)
+        days.append(day)
+        if month == 1 and day == 1:
+            year_starts[year] = ordinal
+
+        day += 1
+        if day > (30 if month < 13 else _pagume_length(year)):
+            day = 1
+            month += 1
+            if month > 13:
+                month = 1
+                year += 1
+    return years, months, days, year_starts
+
+
+def _lookup():
+    global _table
+    if _table is None:
+        _table = _build()
+    return _table
+
+
+def to_ethiopian_date(value):
+    """(eth_year, eth_month, eth_day) of a Gregorian date or datetime."""
+    index = value.toordinal() - _FIRST_ORDINAL
+    years, months, days, _ = _lookup()
+    if 0 <= index < len(years):
+        return years[index], months[index], days[index]
+    eth = to_ethiopian(EthDate(value.day, value.month, value.year))
+    return eth.year, eth.month, eth.day
+
+
+def to_ethiopian_dates(values):
+    """Vectorized ``to_ethiopian_date`` over a column of dates."""
+    years, months, days, _ = _lookup()
+    size = len(years)
+    out = []
+    for value in values:
+        index = value.toordinal() - _FIRST_ORDINAL
+        if 0 <= index < size:
+            out.append((years[index], months[index], days[index]))
+        else:
+            out.append(to_ethiopian_date(value))
+    return out
+
+
+def week_of_month(eth_day, last_week=4):
+    """Seven-day week of an Ethiopian day of month, the tail folded into ``last_week``."""
+    return min(((eth_day - 1) // 7) + 1, last_week)
+
+
+def ethiopian_week(value, last_week=4):
+    """(eth_year, eth_month, week) of a Gregorian date."""
+    year, month, day = to_ethiopian_date(value)
+    return year, month, week_of_month(day, last_week)
+
+
+def to_gregorian_date(eth_year, eth_month, eth_day):
+    """Gregorian date of an Ethiopian date; days past the month end roll over like the library."""
+    start = _lookup()[3].get(eth_year)
+    if start is None:
+        return to_gregorian(EthDate(eth_day, eth_month, eth_year)).date()
+    return date.fromordinal(start + (eth_month - 1) * 30 + eth_day - 1)
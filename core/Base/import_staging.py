@@ -0,0 +1,142 @@
+"""
+Disk-backed staging of parsed uploads between import preview and confirm.
+
+The import views used to keep the whole parsed dataset in the session
+(``Dataset.dict``), so every request that touched the session read and
+wrote a multi-MB blob in django_session. A stage is written once, as a
+gzip-compressed file holding a JSON header line and one JSON array per row,
+and only its opaque token is kept in the session. Confirm reads the rows
+back in chunks of CHUNK_SIZE. Stages older than IMPORT_STAGE_MAX_AGE are
+deleted whenever a new one is written and are never read.
+"""
+import gzip
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from django.conf import settings
+from tablib import Dataset
+
+
+CHUNK_SIZE = 1000
+TOKEN_RE = re.compile(r'[\w-]{16,64}')
+
+
+def staging_dir():
+    path = getattr(settings, 'IMPORT_STAGING_DIR', None) or os.path.join(tempfile.gettempdir(), 'tsms-import-staging')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def max_age():
+    return getattr(settings, 'IMPORT_STAGE_MAX_AGE', 6 * 60 * 60)
+
+
+def _path(token):
+    if not isinstance(token, str) or not TOKEN_RE.fullmatch(token):
+        raise KeyError(token)
+    return os.path.join(staging_dir(), f'{token}.jsonl.gz')
+
+
+def _expired(path, now=None):
+    return (now or time.time()) - os.path.getmtime(path) > max_age()
+
+
+def stage(dataset, kind):
+    """Write ``dataset`` to a new stage and return its token."""
+    purge()
+    token = secrets.token_urlsafe(18)
+    path = _path(token)
+    # written under a temporary name so a half-written stage is never read
+    partial = f'{path}.partial'
+    with gzip.open(partial, 'wt', encoding='utf-8') as file:
+        header = {'kind': kind, 'headers': list(dataset.headers or []), 'rows': len(dataset)}
+        file.write(json.dumps(header) + '\n')
+        for row in dataset:
+            file.write(json.dumps(list(row), default=str) + '\n')
+    os.replace(partial, path)
+    return token
+
+
+class Stage:
+    """A staged dataset: ``kind``, ``headers`` and ``len()`` rows, read lazily."""
+
+    def __init__(self, token):
+        self.token = token
+        self.path = _path(token)
+        if not os.path.exists(self.path) or _expired(self.path):
+            raise KeyError(token)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as file:
+            header = json.loads(file.readline())
+        self.kind = header['kind']
+        self.headers = header['headers']
+        self.row_count = header['rows']
+
+    def __len__(self):
+        return self.row_count
+
+    def rows(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as file:
+            file.readline()
+            for line in file:
+                yield json.loads(line)
+
+    def chunks(self, size=CHUNK_SIZE):
+        """The rows as tablib Datasets of at most ``size`` rows."""
+        chunk = Dataset(headers=self.headers)
+        for row in self.rows():
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = Dataset(headers=self.headers)
+        if len(chunk):
+            yield chunk
+
+
+def load(token):
+    """The stage for ``token``; KeyError if it is unknown or expired."""
+    return Stage(token)
+
+
+def discard(token):
+    try:
+        os.remove(_path(token))
+    except (KeyError, FileNotFoundError):
+        pass
+
+
+def purge():
+    """Delete expired stages (and abandoned partial writes); returns how many."""
+    directory = staging_dir()
+    now = time.time()
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if _expired(path, now):
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def stage_in_session(session, key, dataset, kind):
+    """Stage ``dataset`` and keep only its token under ``session[key]``, replacing an earlier stage."""
+    discard(session.get(key))
+    session[key] = stage(dataset, kind)
+    return session[key]
+
+
+def session_stage(session, key):
+    """The stage whose token is in ``session[key]``, or None."""
+    try:
+        return load(session.get(key))
+    except KeyError:
+        return None
+
+
+def pop_session_stage(session, key):
+    discard(session.pop(key, None))
@@ -0,0 +1,129 @@
+"""
+Database-backed background jobs.
+
+Long-running work (importing approved submissions, large exports) is queued
+as a Job row instead of running inside the HTTP request, and picked up by
+``manage.py run_jobs``. No broker is needed: workers claim jobs with a
+conditional UPDATE, so several workers can share one queue on SQLite or
+PostgreSQL.
+
+Handlers are registered with ``@handler('name')`` in an app's ``jobs``
+module and receive the job and its payload as keyword arguments; they
+report progress with ``job.report_progress(done, total)``, at least once
+every STALE_AFTER, and return a JSON-serialisable result. Handlers open their own transactions and must be
+safe to run again: one that raises is retried with a growing delay until
+``max_attempts`` is reached.
+"""
+import os
+import socket
+from datetime import timedelta
+from django.apps import apps
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+
+RETRY_DELAY = timedelta(seconds=30)
+
+# running jobs that have not reported progress for this long are requeued
+STALE_AFTER = timedelta(hours=1)
+
+# name -> handler
+HANDLERS = {}
+
+
+def handler(name):
+    """Register ``func(job, **payload)`` as the handler of jobs called ``name``."""
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def discover():
+    """Import every installed app's ``jobs`` module so its handlers register."""
+    autodiscover_modules('jobs')
+
+
+def enqueue(name, payload=None, user=None, max_attempts=3):
+    Job = apps.get_model('Base', 'Job')
+    return Job.objects.create(
+        name=name, payload=payload or {}, created_by=user, max_attempts=max_attempts,
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker=None):
+    """Lock the next due job for ``worker`` and return it, or None when the queue is empty."""
+    Job = apps.get_model('Base', 'Job')
+    worker = worker or worker_name()
+    while True:
+        now = timezone.now()
+        job = Job.objects.filter(status='queued', run_after__lte=now).order_by('run_after', 'id').first()
+        if job is None:
+            return None
+        # another worker may have taken it since the read
+        if Job.objects.filter(pk=job.pk, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, attempts=job.attempts + 1,
+        ):
+            job.refresh_from_db()
+            return job
+
+
+def run(job):
+    """Run a claimed job and record its outcome; returns the job."""
+    func = HANDLERS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'No handler registered for job {job.name!r}')
+        # no surrounding transaction, so progress updates are visible while it runs
+        result = func(job, **job.payload)
+    except Exception as e:
+        job.message = str(e)[:255]
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'succeeded'
+        job.result = result
+        job.progress = 100
+        job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=[
+        'status', 'result', 'result_file', 'progress', 'message', 'run_after', 'locked_by', 'locked_at', 'finished_at',
+    ])
+    return job
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """
+    Put back jobs left running by a worker that died (no progress reported
+    for ``older_than``), or fail them when they used all their attempts;
+    returns how many were requeued.
+    """
+    Job = apps.get_model('Base', 'Job')
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - older_than)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', message='The worker stopped responding.', locked_by='', locked_at=None, finished_at=now,
+    )
+    return stale.update(status='queued', locked_by='', locked_at=None)
+
+
+def run_pending(worker=None, limit=None):
+    """Run due jobs until the queue is empty (or ``limit`` jobs ran); returns how many ran."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
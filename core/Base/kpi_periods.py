@@ -0,0 +1,166 @@
+"""
+Catalog of the Ethiopian weeks and days that have KPI records.
+
+The weekly and daily sidebars used to read every distinct KPIRecord date,
+group the dates into Ethiopian weeks in Python and slice out one page, and
+then query each item of the page separately, so every page cost as much as
+the whole history. KPIPeriod keeps one row per (frequency, period) and
+KPIPeriodIndicator the indicators with data in it together with their first
+record, so a page is one keyset query on (frequency, key) plus one query
+for the records of the page.
+
+The catalog of an indicator is refreshed from KPIRecord through the same
+commit-time queue as its latest values (``series.mark_dirty`` with the
+'weekly' or 'daily' frequency). Requests only read it; it is built for
+existing records by ``manage.py rebuild_kpi_periods --if-empty`` on deploy.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from project.db_router import read_from_replicas
+from .ethiopian_calendar import to_ethiopian_date, week_of_month
+
+
+FREQUENCIES = ('weekly', 'daily')
+
+# days 29-30 of a month are week 5 in the sidebars
+LAST_WEEK = 5
+
+
+def period_of(year, month, day, frequency):
+    """(key, eth_year, eth_month, number) of the week or day an Ethiopian date falls in."""
+    number = week_of_month(day, last_week=LAST_WEEK) if frequency == 'weekly' else day
+    return year * 10000 + month * 100 + number, year, month, number
+
+
+@read_from_replicas(False)
+def refresh(indicator_ids, frequency):
+    """Rewrite the catalog entries of the given indicators from their KPI records."""
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+    KPIPeriod = apps.get_model('Base', 'KPIPeriod')
+    KPIPeriodIndicator = apps.get_model('Base', 'KPIPeriodIndicator')
+    indicator_ids = {indicator_id for indicator_id in indicator_ids if indicator_id is not None}
+    if not indicator_ids:
+        return
+
+    # records may point at indicators deleted in the same transaction
+    live = set(apps.get_model('Base', 'Indicator').objects.filter(id__in=indicator_ids).values_list('id', flat=True))
+    periods = {}
+    wanted = {}
+    rows = KPIRecord.objects.filter(record_type=frequency, indicator_id__in=live).order_by('date', 'id')
+    for indicator_id, record_id, day, *eth_date in rows.values_list(
+        'indicator_id', 'id', 'date', 'eth_year', 'eth_month', 'eth_day',
+    ):
+        if eth_date[0] is None:
+            # not backfilled yet
+            eth_date = to_ethiopian_date(day)
+        key, *parts = period_of(*eth_date, frequency)
+        periods.setdefault(key, parts)
+        wanted.setdefault((indicator_id, key), (record_id, day))
+
+    existing = {
+        (entry.indicator_id, entry.period.key): entry
+        for entry in KPIPeriodIndicator.objects.filter(
+            period__frequency=frequency, indicator_id__in=indicator_ids,
+        ).select_related('period')
+    }
+
+    KPIPeriod.objects.bulk_create(
+        [
+            KPIPeriod(frequency=frequency, key=key, eth_year=year, eth_month=month, number=number)
+            for key, (year, month, number) in periods.items()
+        ],
+        ignore_conflicts=True,
+    )
+    period_ids = dict(KPIPeriod.objects.filter(frequency=frequency, key__in=periods).values_list('key', 'id'))
+
+    to_create, to_update = [], []
+    for (indicator_id, key), (record_id, day) in wanted.items():
+        entry = existing.pop((indicator_id, key), None)
+        if entry is None:
+            to_create.append(KPIPeriodIndicator(
+                period_id=period_ids[key], indicator_id=indicator_id, record_id=record_id, date=day,
+            ))
+        elif (entry.record_id, entry.date) != (record_id, day):
+            entry.record_id, entry.date = record_id, day
+            to_update.append(entry)
+    # a concurrent refresh of the same indicator may have inserted the entry
+    KPIPeriodIndicator.objects.bulk_create(to_create, ignore_conflicts=True)
+    KPIPeriodIndicator.objects.bulk_update(to_update, ['record', 'date'])
+
+    if existing:
+        KPIPeriodIndicator.objects.filter(id__in=[entry.id for entry in existing.values()]).delete()
+        KPIPeriod.objects.filter(
+            id__in={entry.period_id for entry in existing.values()}, entries__isnull=True,
+        ).delete()
+
+
+@read_from_replicas(False)
+def rebuild(frequencies=FREQUENCIES, batch_size=500):
+    """Rebuild the whole catalog in one transaction; returns the number of periods."""
+    KPIPeriod = apps.get_model('Base', 'KPIPeriod')
+    indicator_ids = list(apps.get_model('Base', 'Indicator').objects.order_by('id').values_list('id', flat=True))
+    with transaction.atomic():
+        KPIPeriod.objects.filter(frequency__in=frequencies).delete()
+        for frequency in frequencies:
+            for start in range(0, len(indicator_ids), batch_size):
+                refresh(indicator_ids[start:start + batch_size], frequency)
+        return KPIPeriod.objects.filter(frequency__in=frequencies).count()
+
+
+@read_from_replicas(False)
+def ensure_built(frequency, batch_size=500):
+    """
+    Build the catalog of ``frequency`` if it is empty while KPI records exist
+    (right after upgrading); returns whether it was built.
+    """
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+    if apps.get_model('Base', 'KPIPeriod').objects.filter(frequency=frequency).exists():
+        return False
+    if not KPIRecord.objects.filter(record_type=frequency, indicator__isnull=False).exists():
+        return False
+    rebuild([frequency], batch_size)
+    return True
+
+
+def _entries(indicator_ids):
+    entries = apps.get_model('Base', 'KPIPeriodIndicator').objects.filter(
+        indicator__for_category__topic__is_initiative=False,
+    )
+    if indicator_ids:
+        entries = entries.filter(indicator_id__in=indicator_ids)
+    return entries
+
+
+def periods(frequency, indicator_ids=None):
+    """The periods of ``frequency`` with records of the given (or any) non-initiative indicators."""
+    return apps.get_model('Base', 'KPIPeriod').objects.filter(
+        Exists(_entries(indicator_ids).filter(period=OuterRef('pk'))), frequency=frequency,
+    )
+
+
+def page(frequency, indicator_ids=None, after=None, size=10, descending=False, offset=0):
+    """
+    The ``size`` periods after the ``after`` key (oldest first, or newest
+    first when ``descending``), skipping ``offset`` of them, as a list of
+    (KPIPeriod, first KPIRecord of the selected indicators), whether
+    periods precede the page and whether more periods follow.
+    """
+    catalog = periods(frequency, indicator_ids)
+    following = catalog
+    if after is not None:
+        following = catalog.filter(key__lt=after) if descending else catalog.filter(key__gt=after)
+    found = list(following.order_by('-key' if descending else 'key')[offset:offset + size + 1])
+    has_next = len(found) > size
+    found = found[:size]
+
+    # periods were skipped by the offset, or lie before the cursor
+    has_prev = bool(offset) and (bool(found) or following.exists())
+    if not has_prev and after is not None:
+        has_prev = (catalog.filter(key__gte=after) if descending else catalog.filter(key__lte=after)).exists()
+
+    first = {}
+    entries = _entries(indicator_ids).filter(period__in=found, record__isnull=False).select_related('record')
+    for entry in entries.order_by('date', 'record_id'):
+        first.setdefault(entry.period_id, entry.record)
+    return [(period, first[period.id]) for period in found if period.id in first], has_prev, has_next
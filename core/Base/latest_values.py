@@ -0,0 +1,193 @@
+"""
+Latest observation of every indicator, per frequency.
+
+IndicatorLatest keeps, for each indicator and each of the annual, quarterly,
+monthly, weekly and daily frequencies, the newest value, its period and the
+value before it, so overview screens read one small indexed table instead
+of ordering every data table per indicator.
+
+The annual/quarterly/monthly rows are refreshed from the packed series each
+time a series is rebuilt (see Base.series); the weekly/daily rows are
+refreshed from KPIRecord through the same commit-time queue. Requests only
+read the rows; ``rebuild_indicator_series --missing`` (run on every deploy)
+writes the rows of indicators that were never built.
+"""
+from django.apps import apps
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from project.db_router import read_from_replicas
+from .deltas import performance_change
+from .ethiopian_calendar import ethiopian_week, to_ethiopian_date
+
+
+RECORD_FREQUENCIES = ('weekly', 'daily')
+
+
+def latest_records(indicator_ids, record_type, limit):
+    """
+    The ``limit`` most recent KPI records of every indicator, newest first,
+    as {indicator_id: [records]}. One ranked query instead of one per indicator.
+    """
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+    ranked = KPIRecord.objects.filter(
+        indicator_id__in=indicator_ids, record_type=record_type
+    ).annotate(
+        rank=Window(RowNumber(), partition_by=[F('indicator_id')], order_by=F('date').desc())
+    ).filter(rank__lte=limit).order_by('indicator_id', '-date')
+
+    records = {}
+    for record in ranked:
+        records.setdefault(record.indicator_id, []).append(record)
+    return records
+
+
+def _write(frequency, indicator_ids, latest):
+    """Upsert the {indicator_id: field values} rows of a frequency and drop the ones without data."""
+    IndicatorLatest = apps.get_model('Base', 'IndicatorLatest')
+    existing = {
+        row.indicator_id: row
+        for row in IndicatorLatest.objects.filter(indicator_id__in=indicator_ids, frequency=frequency)
+    }
+    IndicatorLatest.objects.filter(
+        frequency=frequency, indicator_id__in=[i for i in existing if i not in latest]
+    ).delete()
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for indicator_id, fields in latest.items():
+        row = existing.get(indicator_id)
+        if row is None:
+            to_create.append(IndicatorLatest(indicator_id=indicator_id, frequency=frequency, **fields))
+        else:
+            for name, value in fields.items():
+                setattr(row, name, value)
+            row.updated_at = now
+            to_update.append(row)
+    IndicatorLatest.objects.bulk_create(to_create, ignore_conflicts=True)
+    IndicatorLatest.objects.bulk_update(to_update, IndicatorLatest.VALUE_FIELDS)
+
+
+def refresh_from_series(built):
+    """Refresh the latest rows from freshly rebuilt Series objects of one frequency."""
+    built = list(built)
+    if not built:
+        return
+    latest = {}
+    for stored in built:
+        points = stored.latest(len(stored))
+        if not points:
+            continue
+        _, year, period, value, *_ = points[0]
+        previous_year = next((p[3] for p in points[1:] if p[1] == year - 1 and p[2] == period), None)
+        latest[stored.indicator_id] = {
+            'year_EC': year,
+            'period': period,
+            'date': None,
+            'value': value,
+            'previous_value': points[1][3] if len(points) > 1 else None,
+            'previous_year_value': previous_year,
+        }
+    _write(built[0].frequency, [stored.indicator_id for stored in built], latest)
+
+
+@read_from_replicas(False)
+def refresh_records(indicator_ids, record_type):
+    """Refresh the weekly or daily latest rows of the given indicators from KPIRecord."""
+    indicator_ids = {indicator_id for indicator_id in indicator_ids if indicator_id is not None}
+    if not indicator_ids:
+        return
+    latest = {}
+    for indicator_id, (record, *previous) in latest_records(indicator_ids, record_type, 2).items():
+        latest[indicator_id] = {
+            'year_EC': None,
+            'period': None,
+            'date': record.date,
+            'value': float(record.performance) if record.performance is not None else None,
+            'previous_value': float(previous[0].performance) if previous and previous[0].performance is not None else None,
+            'previous_year_value': None,
+        }
+    _write(record_type, indicator_ids, latest)
+
+
+def rebuild_records(batch_size=500):
+    """Refresh the weekly and daily latest rows of every indicator."""
+    indicator_ids = list(apps.get_model('Base', 'Indicator').objects.order_by('id').values_list('id', flat=True))
+    for record_type in RECORD_FREQUENCIES:
+        for start in range(0, len(indicator_ids), batch_size):
+            refresh_records(indicator_ids[start:start + batch_size], record_type)
+
+
+def build_missing_records(batch_size=500):
+    """
+    Refresh the weekly and daily latest rows of the indicators that have KPI
+    records but no latest row yet (e.g. right after upgrading).
+    """
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+    IndicatorLatest = apps.get_model('Base', 'IndicatorLatest')
+    for record_type in RECORD_FREQUENCIES:
+        indicator_ids = list(
+            KPIRecord.objects.filter(record_type=record_type, indicator__isnull=False).exclude(
+                indicator_id__in=IndicatorLatest.objects.filter(frequency=record_type).values('indicator_id')
+            ).order_by('indicator_id').values_list('indicator_id', flat=True).distinct()
+        )
+        for start in range(0, len(indicator_ids), batch_size):
+            refresh_records(indicator_ids[start:start + batch_size], record_type)
+
+
+def attach(indicators):
+    """
+    Set ``prefetched_latest`` ({frequency: IndicatorLatest}) on every
+    indicator with one query. A frequency without a row has no data; the
+    rows are written by the series rebuilds, never here.
+    """
+    IndicatorLatest = apps.get_model('Base', 'IndicatorLatest')
+    indicators = [indicator for indicator in indicators if indicator is not None]
+    if not indicators:
+        return
+    by_indicator = {indicator.id: {} for indicator in indicators}
+    for row in IndicatorLatest.objects.filter(indicator_id__in=by_indicator):
+        by_indicator[row.indicator_id][row.frequency] = row
+
+    for indicator in indicators:
+        indicator.prefetched_latest = by_indicator[indicator.id]
+
+
+def for_indicator(indicator):
+    """{frequency: IndicatorLatest} of one indicator, prefetched or loaded."""
+    if not hasattr(indicator, 'prefetched_latest'):
+        attach([indicator])
+    return indicator.prefetched_latest
+
+
+def latest_frequency(indicator, frequencies=('annual', 'quarterly', 'monthly')):
+    """
+    The frequency with the most recent observation; ties go to the earlier
+    frequency in ``frequencies``. Weekly and daily records compare by their
+    Ethiopian (year, month, week/day).
+    """
+    latest = for_indicator(indicator)
+
+    def position(frequency):
+        row = latest.get(frequency)
+        if row is None:
+            return (0, 0, 0)
+        if frequency == 'weekly':
+            return ethiopian_week(row.date)
+        if frequency == 'daily':
+            return to_ethiopian_date(row.date)
+        return (row.year_EC or 0, 0, 0)
+
+    return max([(position(frequency), frequency) for frequency in frequencies], key=lambda x: x[0])[1]
+
+
+def previous_year_change(indicator, year_EC, period=None, frequency='annual'):
+    """
+    Year-over-year change of the indicator's latest observation as
+    performance_change() computes it, or ``False`` when (year_EC, period) is
+    not the latest observation of that frequency.
+    """
+    row = for_indicator(indicator).get(frequency)
+    if row is None or row.year_EC != year_EC or row.period != period:
+        return False
+    return performance_change(row.value, row.previous_year_value, indicator.kpi_characteristics)
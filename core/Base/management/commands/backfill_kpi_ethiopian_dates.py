@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Base.models import KPIRecord
+
+
+class Command(BaseCommand):
+    help = 'Fill the eth_year/eth_month/eth_day/eth_week columns of KPI records in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Recompute every record instead of only the ones without an Ethiopian date.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = KPIRecord.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(eth_year__isnull=True)
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).order_by('id').only('id', 'date', *KPIRecord.ETHIOPIAN_DATE_FIELDS)[:batch_size]
+            )
+            if not batch:
+                break
+            for record in batch:
+                record.set_ethiopian_date()
+            with transaction.atomic():
+                KPIRecord.objects.bulk_update(batch, KPIRecord.ETHIOPIAN_DATE_FIELDS)
+            updated += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} KPI records backfilled.'))
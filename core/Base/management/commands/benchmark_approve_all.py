@@ -0,0 +1,71 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Base.models import AnnualData, Category, DataPoint, Indicator, Topic
+from UserManagement import approvals
+from UserManagement.models import CategoryAssignment, CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Approve N pending AnnualData rows row by row and with the set-based approval. '
+        'Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--years', type=int, default=20, help='Rows per indicator.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                manager = self.create_rows(options['rows'], options['years'])
+                self.stdout.write(f'{options["rows"]} pending rows')
+                self.time('row by row', self.approve_row_by_row, manager)
+                self.time('set-based', approvals.verify_pending_rows, manager)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def time(self, name, approve, manager):
+        with transaction.atomic():
+            start = time.perf_counter()
+            approve(manager)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.stdout.write(f'{name}: {elapsed * 1000:.0f} ms')
+
+    def approve_row_by_row(self, manager):
+        # what the approval loops did: one save (and audit entry) per row
+        for row in AnnualData.objects.filter(approvals.pending_rows_filter(manager)).distinct():
+            row.is_verified = True
+            row.is_seen = True
+            row.save()
+
+    def create_rows(self, rows, years):
+        manager = CustomUser.objects.create(username='benchmark-manager', email='benchmark@example.com', is_category_manager=True)
+        topic = Topic.objects.create(title_ENG='Benchmark')
+        category = Category.objects.create(name_ENG='Benchmark', name_AMH='Benchmark', code='BENCH', topic=topic)
+        CategoryAssignment.objects.create(manager=manager, category=category)
+
+        start = (DataPoint.objects.order_by('-year_EC').values_list('year_EC', flat=True).first() or 1990) + 1
+        datapoints = [DataPoint.objects.create(year_EC=year) for year in range(start, start + years)]
+        indicators = Indicator.objects.bulk_create(
+            Indicator(title_ENG=f'Benchmark {n}', code=f'BENCH-{n}') for n in range((rows + years - 1) // years)
+        )
+        category.indicators.add(*indicators)
+        AnnualData.objects.bulk_create(
+            (
+                AnnualData(indicator=indicator, for_datapoint=datapoint, performance=n, is_verified=False)
+                for n, (indicator, datapoint) in enumerate(
+                    (indicator, datapoint) for indicator in indicators for datapoint in datapoints
+                )
+                if n < rows
+            ),
+            batch_size=1000,
+        )
+        return manager
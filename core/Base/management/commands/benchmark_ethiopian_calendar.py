@@ -0,0 +1,32 @@
+import timeit
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, EthDate
+from Base import ethiopian_calendar
+
+
+class Command(BaseCommand):
+    help = 'Compare the precomputed Ethiopian calendar table with the converter library.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=10000, help='Number of consecutive dates to convert.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        start = date(2015, 1, 1)
+        dates = [start + timedelta(days=n) for n in range(options['days'])]
+
+        def library():
+            return [to_ethiopian(EthDate(d.day, d.month, d.year)) for d in dates]
+
+        def table():
+            return [ethiopian_calendar.to_ethiopian_date(d) for d in dates]
+
+        def column():
+            return ethiopian_calendar.to_ethiopian_dates(dates)
+
+        build = timeit.timeit(ethiopian_calendar._build, number=1)
+        self.stdout.write(f'table build: {build * 1000:.1f} ms')
+        for name, func in (('library', library), ('table', table), ('table (column)', column)):
+            best = min(timeit.repeat(func, number=1, repeat=options['repeat']))
+            self.stdout.write(f'{name}: {best * 1000:.1f} ms for {len(dates)} dates')
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from project.sqlite import pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        'Run one large import transaction against a scratch SQLite file while another connection '
+        'keeps reading, with the default rollback journal and with the tuned WAL settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Rows written by the import transaction.')
+        parser.add_argument('--timeout', type=float, default=5.0, help='Busy timeout of both connections, in seconds.')
+
+    def handle(self, *args, **options):
+        for name, statements in (('rollback journal', ['PRAGMA journal_mode=DELETE']), ('WAL + pragmas', pragmas())):
+            with tempfile.TemporaryDirectory() as directory:
+                reads, failed, slowest, write_time = self.run_once(
+                    os.path.join(directory, 'bench.sqlite3'), statements, options['rows'], options['timeout']
+                )
+            self.stdout.write(
+                f'{name}: import {write_time * 1000:.0f} ms, {reads} reads during the import, '
+                f'{failed} failed, slowest read {slowest * 1000:.1f} ms'
+            )
+
+    def connect(self, path, statements, timeout):
+        db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for statement in statements:
+            db.execute(statement)
+        return db
+
+    def run_once(self, path, statements, rows, timeout):
+        writer = self.connect(path, statements, timeout)
+        writer.execute(
+            'CREATE TABLE data (id INTEGER PRIMARY KEY, indicator_id INTEGER, year INTEGER, performance REAL)'
+        )
+        writer.execute('CREATE INDEX data_indicator ON data (indicator_id)')
+        writer.executemany(
+            'INSERT INTO data (indicator_id, year, performance) VALUES (?, ?, ?)',
+            ((n % 500, 2000 + n % 20, n * 0.5) for n in range(10000)),
+        )
+        reader = self.connect(path, statements, timeout)
+
+        importing = threading.Event()
+        done = threading.Event()
+
+        def import_rows():
+            writer.execute('BEGIN IMMEDIATE')
+            writer.executemany(
+                'INSERT INTO data (indicator_id, year, performance) VALUES (?, ?, ?)',
+                ((n % 500, 2000 + n % 20, n * 0.25) for n in range(rows)),
+            )
+            importing.set()
+            # keep the transaction open while the rows are "validated"
+            time.sleep(0.5)
+            writer.execute('COMMIT')
+            done.set()
+
+        thread = threading.Thread(target=import_rows)
+        started = time.perf_counter()
+        thread.start()
+        importing.wait()
+
+        reads = failed = 0
+        slowest = 0.0
+        while not done.is_set():
+            begin = time.perf_counter()
+            try:
+                reader.execute('SELECT COUNT(*), AVG(performance) FROM data WHERE indicator_id = ?', (reads % 500,)).fetchone()
+                reads += 1
+            except sqlite3.OperationalError:
+                failed += 1
+            slowest = max(slowest, time.perf_counter() - begin)
+        thread.join()
+        write_time = time.perf_counter() - started
+        reader.close()
+        writer.close()
+        return reads, failed, slowest, write_time
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from Base.models import (
+    AnnualData, AuditLogIndex, IndicatorLatest, IndicatorSeries, KPIPeriod, MonthData, QuarterData, StatisticsSnapshot,
+)
+
+
+# unique keys added to the observation tables; run this command before migrating them
+UNIQUE_KEYS = {
+    AnnualData: ('indicator_id', 'for_datapoint_id'),
+    QuarterData: ('indicator_id', 'for_datapoint_id', 'for_quarter_id'),
+    MonthData: ('indicator_id', 'for_datapoint_id', 'for_month_id'),
+}
+
+# tables the delete signals write to; they are created by the same migration
+DERIVED = (AuditLogIndex, IndicatorLatest, IndicatorSeries, KPIPeriod, StatisticsSnapshot)
+
+
+def duplicate_ids(rows):
+    """
+    Ids to delete from (key, id) rows sorted newest first within each key:
+    every row after the first one of its key. Keys with a NULL part are never
+    duplicates for the database, so they are left alone.
+    """
+    seen = set()
+    duplicates = []
+    for key, row_id in rows:
+        if None in key:
+            continue
+        if key in seen:
+            duplicates.append(row_id)
+        else:
+            seen.add(key)
+    return duplicates
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete duplicate annual/quarterly/monthly rows, keeping the most recently '
+        'written row of each (indicator, year[, quarter|month]).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the duplicates.')
+
+    def handle(self, *args, **options):
+        tables = set(connection.introspection.table_names())
+        # before migrating, the derived tables do not exist yet and are built after it
+        migrated = all(model._meta.db_table in tables for model in DERIVED)
+        with transaction.atomic():
+            for model, fields in UNIQUE_KEYS.items():
+                rows = (
+                    model.objects.order_by(*fields, '-created_at', '-id')
+                    .values_list(*fields, 'created_at', 'id')
+                )
+                ids = duplicate_ids((row[:len(fields)], row[-1]) for row in rows.iterator())
+                if ids and not options['dry_run']:
+                    for start in range(0, len(ids), 500):
+                        chunk = model.objects.filter(id__in=ids[start:start + 500])
+                        if migrated:
+                            # model deletes keep the audit log and the packed series in sync
+                            chunk.delete()
+                        else:
+                            chunk._raw_delete(chunk.db)
+                verb = 'found' if options['dry_run'] else 'deleted'
+                self.stdout.write(f'{model.__name__}: {len(ids)} duplicates {verb}')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,50 @@
+import timeit
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from Base.models import AnnualData, MonthData, QuarterData
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the query plan and timing of the hot observation-table queries, unordered and '
+        'in chronological order (which joins the year and period tables). Run it before and '
+        'after migrating the unique/review indexes to compare the plans.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def queries(self, model):
+        busiest = (
+            model.objects.exclude(indicator=None).exclude(for_datapoint=None).order_by()
+            .values('indicator_id').annotate(rows=Count('id')).order_by('-rows').first()
+        )
+        if busiest is None:
+            return []
+        sample = model.objects.filter(indicator_id=busiest['indicator_id']).exclude(for_datapoint=None).order_by('id').first()
+        key = {'indicator_id': sample.indicator_id, 'for_datapoint_id': sample.for_datapoint_id}
+        period = getattr(model, 'DELTA_PERIOD_FIELD', None)
+        if period:
+            key[f'{period}_id'] = getattr(sample, f'{period}_id')
+        return [
+            ('key lookup', model.objects.filter(**key)),
+            ('review queue', model.objects.filter(is_verified=False, indicator_id=sample.indicator_id)),
+            ('indicator rows', model.objects.filter(indicator_id=sample.indicator_id)),
+        ]
+
+    def chronological(self, model):
+        period = getattr(model, 'DELTA_PERIOD_FIELD', None)
+        return ['for_datapoint__year_EC'] + ([f'{period}__number'] if period else [])
+
+    def handle(self, *args, **options):
+        for model in (AnnualData, QuarterData, MonthData):
+            self.stdout.write(self.style.MIGRATE_HEADING(model.__name__))
+            queries = self.queries(model)
+            if not queries:
+                self.stdout.write('  no data')
+            for name, queryset in queries:
+                for label, qs in (('unordered', queryset), ('chronological', queryset.order_by(*self.chronological(model)))):
+                    best = min(timeit.repeat(lambda: list(qs.values_list('id', 'performance')), number=1, repeat=options['repeat']))
+                    self.stdout.write(f'  {name}, {label}: {best * 1000:.2f} ms')
+                    for line in qs.values_list('id', 'performance').explain().splitlines():
+                        self.stdout.write(f'    {line}')
@@ -0,0 +1,32 @@
+from auditlog.models import LogEntry
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from Base import audit
+from Base.models import AuditLogIndex
+
+
+class Command(BaseCommand):
+    help = 'Index the audit log entries that have no AuditLogIndex row yet (e.g. written before the index existed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--rebuild', action='store_true', help='Drop and rewrite the whole index.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            AuditLogIndex.objects.all().delete()
+        written = 0
+        last_id = 0
+        while True:
+            batch = list(
+                LogEntry.objects.filter(id__gt=last_id, audit_index__isnull=True)
+                # aggregate entries are indexed with their row count
+                .annotate(batch_rows=F('audit_batch__row_count'))
+                .order_by('id')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            written += audit.index_entries(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f'{written} entries indexed')
+        self.stdout.write(self.style.SUCCESS(f'{written} entries indexed.'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Base import latest_values, series
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the packed annual/quarterly/monthly series and the latest values '
+        'of every indicator from the data tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency', choices=series.FREQUENCIES, action='append', dest='frequencies',
+            help='Only rebuild this frequency (can be repeated).',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Indicators rebuilt per query.')
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only build the series and latest values that were never built (run on every deploy).',
+        )
+
+    def handle(self, *args, **options):
+        frequencies = options['frequencies'] or series.FREQUENCIES
+        if options['missing']:
+            with transaction.atomic():
+                written = series.build_missing(frequencies, options['batch_size'])
+                if not options['frequencies']:
+                    latest_values.build_missing_records(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{written} missing series built.'))
+            return
+        with transaction.atomic():
+            written = series.rebuild_all(frequencies, options['batch_size'])
+            if not options['frequencies']:
+                latest_values.rebuild_records(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{written} series rebuilt.'))
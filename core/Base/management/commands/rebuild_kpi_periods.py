@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Base import kpi_periods
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog of weekly and daily KPI periods used by the sidebars from the KPI records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency', choices=kpi_periods.FREQUENCIES, action='append', dest='frequencies',
+            help='Only rebuild this frequency (can be repeated).',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Indicators refreshed per query.')
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help='Only build the frequencies whose catalog is still empty (run on every deploy).',
+        )
+
+    def handle(self, *args, **options):
+        frequencies = options['frequencies'] or kpi_periods.FREQUENCIES
+        if options['if_empty']:
+            built = [frequency for frequency in frequencies if kpi_periods.ensure_built(frequency, options['batch_size'])]
+            self.stdout.write(self.style.SUCCESS(f'Built: {", ".join(built) or "nothing to build"}.'))
+            return
+        with transaction.atomic():
+            written = kpi_periods.rebuild(frequencies, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{written} periods rebuilt.'))
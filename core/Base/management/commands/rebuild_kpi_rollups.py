@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from Base import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the weekly KPI records from the daily records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicator', type=int, action='append', dest='indicators',
+            help='Only rebuild this indicator id (can be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rollups.rebuild(options['indicators'])
+        self.stdout.write(self.style.SUCCESS(f'{written} weekly records rebuilt.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from Base import dashboard_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the data management dashboard statistics snapshot (for cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true', help='Only recompute when the data changed since.')
+
+    def handle(self, *args, **options):
+        if options['if_stale']:
+            dashboard_stats.snapshot()
+        else:
+            dashboard_stats.refresh()
+        self.stdout.write(self.style.SUCCESS('Dashboard statistics refreshed.'))
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from Base import job_queue
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (submission imports, exports). Keeps polling unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due, then exit.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after running this many jobs.')
+        parser.add_argument(
+            '--stale-after', type=int, default=int(job_queue.STALE_AFTER.total_seconds()),
+            help='Requeue running jobs locked longer than this many seconds (their worker died).',
+        )
+
+    def handle(self, *args, **options):
+        job_queue.discover()
+        worker = job_queue.worker_name()
+        stale_after = timedelta(seconds=options['stale_after'])
+        ran = 0
+        self.stdout.write(f'worker {worker} started')
+        while options['max_jobs'] is None or ran < options['max_jobs']:
+            requeued = job_queue.requeue_stale(stale_after)
+            if requeued:
+                self.stdout.write(f'requeued {requeued} stale job(s)')
+            job = job_queue.claim(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            job_queue.run(job)
+            ran += 1
+            self.stdout.write(f'{job}: {job.message or "ok"}')
+        self.stdout.write(f'worker {worker} ran {ran} job(s)')
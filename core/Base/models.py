@@ -1,4 +1,7 @@
 from django.db import models
+from django.utils import timezone
+import uuid
+import zlib
 from fontawesome_5.fields import IconField
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
@@ -6,6 +9,9 @@ import json
 from UserManagement.models import ResponsibleEntity
 from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, to_gregorian, EthDate
 from datetime import date
+from django.utils.functional import cached_property
+from .deltas import DEFAULT_LAGS, series_deltas
+from . import ethiopian_calendar, rollups
 
 from ckeditor.fields import RichTextField
 
@@ -288,7 +294,21 @@ class Month(models.Model):
     def __str__(self):
         return self.month_AMH + " : " + self.month_ENG + " ==> " + str(self.number)   
 
-class MonthData(models.Model):
+class PerformanceDeltaMixin:
+    """
+    Change-over-time helpers shared by AnnualData, QuarterData and MonthData.
+    Every lag of a row is computed by Base.deltas from a single query.
+    """
+    DELTA_PERIOD_FIELD = None
+
+    @cached_property
+    def performance_deltas(self):
+        if not self.for_datapoint:
+            return {lag: None for lag in DEFAULT_LAGS}
+        deltas = series_deltas([self], DEFAULT_LAGS)
+        return {lag: values[0] for lag, values in deltas.items()}
+
+class MonthData(PerformanceDeltaMixin, models.Model):
     indicator = models.ForeignKey(Indicator, on_delete=models.SET_NULL, blank=True ,null=True , related_name='month_data')
     for_month = models.ForeignKey(Month, on_delete=models.SET_NULL, blank=True ,null=True)
     for_datapoint = models.ForeignKey(DataPoint, on_delete=models.SET_NULL, blank=True, null=True)
@@ -304,145 +324,26 @@ class MonthData(models.Model):
             return self.indicator.title_ENG + " " + self.for_month.month_AMH
     
     class Meta:
-        ordering = ['for_datapoint__year_EC' , 'for_month__number']
+        unique_together = ("indicator", "for_datapoint", "for_month")
+        indexes = [
+            models.Index(fields=['is_verified', 'indicator']),
+        ]
+
+    DELTA_PERIOD_FIELD = 'for_month'
     
-      
     def get_previous_year_performance(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 1
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = MonthData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_month = self.for_month,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except MonthData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to the previous year
+        return self.performance_deltas[1]
 
-        
     def get_indicator_value_5_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 5
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = MonthData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_month = self.for_month,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except MonthData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to 5 years ago
+        return self.performance_deltas[5]
 
     def get_indicator_value_10_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 10
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = MonthData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_month = self.for_month,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except MonthData.DoesNotExist:
-                return None
-        return None
+        # Change in performance compared to 10 years ago
+        return self.performance_deltas[10]
     
-class QuarterData(models.Model):
+class QuarterData(PerformanceDeltaMixin, models.Model):
     indicator = models.ForeignKey(Indicator, on_delete=models.SET_NULL, blank=True ,null=True , related_name='quarter_data')
     for_quarter = models.ForeignKey(Quarter, on_delete=models.SET_NULL, blank=True ,null=True)
     for_datapoint = models.ForeignKey(DataPoint, on_delete=models.SET_NULL, blank=True, null=True)
@@ -459,144 +360,26 @@ class QuarterData(models.Model):
         
     
     class Meta:
-        ordering = ['for_datapoint__year_EC' , 'for_quarter__number']
         unique_together = ("indicator", "for_datapoint", "for_quarter")
+        indexes = [
+            models.Index(fields=['is_verified', 'indicator']),
+        ]
+
+    DELTA_PERIOD_FIELD = 'for_quarter'
     
     def get_previous_year_performance(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 1
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = QuarterData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_quarter = self.for_quarter,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except QuarterData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to the previous year
+        return self.performance_deltas[1]
 
     def get_performance_value_5_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 5
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = QuarterData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_quarter = self.for_quarter,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except QuarterData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to 5 years ago
+        return self.performance_deltas[5]
+
     def get_performance_value_10_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 10
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = QuarterData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    for_quarter = self.for_quarter,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except QuarterData.DoesNotExist:
-                return None
-        return None
+        # Change in performance compared to 10 years ago
+        return self.performance_deltas[10]
     
-class AnnualData(models.Model):
+class AnnualData(PerformanceDeltaMixin, models.Model):
     indicator = models.ForeignKey(Indicator, on_delete=models.SET_NULL, related_name='annual_data' ,blank=True ,null=True)
     for_datapoint = models.ForeignKey(DataPoint, on_delete=models.SET_NULL, blank=True, null=True)
     performance = models.FloatField(blank=True ,null=True)
@@ -624,137 +407,86 @@ class AnnualData(models.Model):
             return str(self.performance)
     
     class Meta:
-        ordering = ['for_datapoint__year_EC']
-        #unique_together = ('indicator', 'for_datapoint')
+        unique_together = ('indicator', 'for_datapoint')
+        indexes = [
+            models.Index(fields=['is_verified', 'indicator']),
+        ]
     
     def get_previous_year_performance(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 1
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = AnnualData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except AnnualData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to the previous year
+        return self.performance_deltas[1]
+
     def get_performance_value_5_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 5
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = AnnualData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except AnnualData.DoesNotExist:
-                return None
-        return None
-    
+        # Change in performance compared to 5 years ago
+        return self.performance_deltas[5]
+
     def get_performance_value_10_years_ago(self):
-        # Calculate and return the change in performance compared to the previous year
-        if self.for_datapoint:
-            previous_year = int (self.for_datapoint.year_EC) - 10
-            previous_year = str(previous_year)
-            try:
-                
-                previous_year_plan = AnnualData.objects.get(
-                    for_datapoint__year_EC=previous_year,
-                    indicator=self.indicator,
-                )
-                
-                if previous_year_plan.performance is not None and self.performance is not None and previous_year_plan.performance != 0:
-                    performance_change = self.performance - previous_year_plan.performance
-
-
-                    performance_change_percent = (
-                        (self.performance - previous_year_plan.performance)/previous_year_plan.performance) * 100
-
-                    if self.indicator.kpi_characteristics == 'inc':
-                        # For increasing KPIs, positive change is good, and negative change is bad
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" :round(performance_change_percent,1)
-                            }
-                    elif self.indicator.kpi_characteristics == 'dec':
-                        # For decreasing KPIs, negative change is good, and positive change is bad
-                        return {
-                            "change" : round(-performance_change, 1), 
-                            "percent" :round(-performance_change_percent,1)
-                            }
-                    else:
-                        # For constant KPIs, return the change without modifying its sign
-                        return {
-                            "change" : round(performance_change, 1), 
-                            "percent" : round(performance_change_percent,1)
-                        }
-                else:
-                    return None
-            except AnnualData.DoesNotExist:
-                return None
-        return None
+        # Change in performance compared to 10 years ago
+        return self.performance_deltas[10]
+
+class IndicatorSeries(models.Model):
+    """
+    Dense copy of one indicator's annual, quarterly or monthly observations,
+    stored as packed columns sorted by (year, period). Rebuilt from the row
+    tables whenever they change; see Base.series.
+    """
+    FREQUENCY_CHOICES = [
+        ('annual', 'Annual'),
+        ('quarterly', 'Quarterly'),
+        ('monthly', 'Monthly'),
+    ]
+
+    indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='series')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    length = models.PositiveIntegerField(default=0)
+    row_ids = models.BinaryField(default=b'', help_text="int64 id of each source row")
+    years = models.BinaryField(default=b'', help_text="int32 year_EC, 0 when the row has no data point")
+    periods = models.BinaryField(default=b'', help_text="uint8 quarter/month number, 0 for annual rows")
+    values = models.BinaryField(default=b'', help_text="float64 performance")
+    targets = models.BinaryField(default=b'', help_text="float64 target")
+    value_nulls = models.BinaryField(default=b'', help_text="Bitmap of null performance values")
+    target_nulls = models.BinaryField(default=b'', help_text="Bitmap of null targets")
+    verified = models.BinaryField(default=b'', help_text="Bitmap of verified rows")
+    seen = models.BinaryField(default=b'', help_text="Bitmap of seen rows")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('indicator', 'frequency')
+        verbose_name_plural = "Indicator series"
+
+    def __str__(self):
+        return f"{self.indicator} ({self.frequency}, {self.length} points)"
+
+class IndicatorLatest(models.Model):
+    """
+    Latest observation of an indicator for one frequency, maintained by
+    Base.latest_values whenever the underlying data changes.
+    """
+    FREQUENCY_CHOICES = IndicatorSeries.FREQUENCY_CHOICES + [
+        ('weekly', 'Weekly'),
+        ('daily', 'Daily'),
+    ]
+
+    indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='latest_values')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    year_EC = models.IntegerField(null=True, blank=True, help_text="Year of annual/quarterly/monthly values")
+    period = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Quarter or month number")
+    date = models.DateField(null=True, blank=True, help_text="Date of weekly/daily values")
+    value = models.FloatField(null=True, blank=True)
+    previous_value = models.FloatField(null=True, blank=True, help_text="The observation before the latest one")
+    previous_year_value = models.FloatField(
+        null=True, blank=True, help_text="Same period one year earlier (annual/quarterly/monthly)"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    VALUE_FIELDS = ['year_EC', 'period', 'date', 'value', 'previous_value', 'previous_year_value', 'updated_at']
+
+    class Meta:
+        unique_together = ('indicator', 'frequency')
+        verbose_name_plural = "Indicator latest values"
+
+    def __str__(self):
+        return f"{self.indicator} ({self.frequency}): {self.value}"
 
 class KPIRecord(models.Model):
     """
@@ -790,11 +522,23 @@ class KPIRecord(models.Model):
     is_seen = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    # Ethiopian calendar copy of `date`, kept in sync by set_ethiopian_date()
+    eth_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    eth_month = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    eth_day = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    eth_week = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False,
+        help_text="Week of the Ethiopian month (1-4, days 22-30 are week 4)"
+    )
+
+    ETHIOPIAN_DATE_FIELDS = ('eth_year', 'eth_month', 'eth_day', 'eth_week')
+
     class Meta:
         indexes = [
             models.Index(fields=['indicator', 'date']),
             models.Index(fields=['date']),
             models.Index(fields=['record_type']),
+            models.Index(fields=['indicator', 'record_type', 'eth_year', 'eth_month', 'eth_week']),
         ]
         ordering = ['-date']
         verbose_name = "KPI Record"
@@ -811,71 +555,96 @@ class KPIRecord(models.Model):
         """
       
 
-        gregorian_date = EthDate(self.date.day, self.date.month, self.date.year)
-        eth_date = to_ethiopian(gregorian_date)
+        eth_year, eth_month, eth_day = self.ethiopian_date()
 
         freq = getattr(self, 'record_type', 'daily')
       
 
         if  freq == 'weekly':
-            eth_year = eth_date.year
-            eth_month = eth_date.month 
-            week = ((eth_date.day  - 1) // 7) + 1
-            week = min(week , 4)
+            week = self.ethiopian_week()[2]
             return f"{eth_year}-{eth_month}-{week}"
         elif freq in ('daily'):
-            return f"{eth_date.year}-{eth_date.month:02d}-{eth_date.day:02d}"
+            return f"{eth_year}-{eth_month:02d}-{eth_day:02d}"
         else:
-            return f"{eth_date.year}-{eth_date.month:02d}-{eth_date.day:02d}"
+            return f"{eth_year}-{eth_month:02d}-{eth_day:02d}"
     
     @staticmethod
     def create_aggregate_data(indicator):
-        daily = KPIRecord.objects.filter(
-            indicator=indicator,
-            record_type='daily'
-        )
+        # Rebuild every weekly rollup of the indicator; see Base.rollups
+        return rollups.rebuild([indicator.id])
+
+    def ethiopian_date(self):
+        """(eth_year, eth_month, eth_day) from the stored columns, or from `date` when they are not filled yet."""
+        if self.eth_year is None:
+            return ethiopian_calendar.to_ethiopian_date(self.date)
+        return self.eth_year, self.eth_month, self.eth_day
+
+    def ethiopian_week(self):
+        """(eth_year, eth_month, eth_week) of the record, see ethiopian_date()."""
+        if self.eth_year is None:
+            return ethiopian_calendar.ethiopian_week(self.date)
+        return self.eth_year, self.eth_month, self.eth_week
+
+    def set_ethiopian_date(self):
+        """
+        Fill the eth_* columns from `date`. Called by save(); bulk_create and
+        bulk_update callers must call it themselves.
+        """
+        self.date = self._meta.get_field('date').to_python(self.date)
+        if self.date is None:
+            self.eth_year = self.eth_month = self.eth_day = self.eth_week = None
+            return
+        self.eth_year, self.eth_month, self.eth_day = ethiopian_calendar.to_ethiopian_date(self.date)
+        self.eth_week = ethiopian_calendar.week_of_month(self.eth_day)
+
+    def save(self, *args, **kwargs):
+        self.set_ethiopian_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(self.ETHIOPIAN_DATE_FIELDS)
+        super().save(*args, **kwargs)
 
-        groups = {}
+        if self.record_type == 'daily' and self.indicator_id:
+            rollups.schedule(self.indicator_id, self.date)
+        
+    
+    def __str__(self):
+        return f"{self.indicator} ({self.date}) - Target: {self.target}, Perf: {self.performance}"
 
-        for r in daily:
-            # Convert Gregorian -> Ethiopian using your method
-            eth = to_ethiopian(EthDate(r.date.day, r.date.month, r.date.year))
 
-            week = min(((eth.day - 1) // 7) + 1, 4)
-            key = (eth.year, eth.month, week)
+class KPIPeriod(models.Model):
+    """
+    One Ethiopian week or day that has weekly or daily KPI records, maintained
+    by Base.kpi_periods. ``key`` (YYYYMMNN of the Ethiopian date) orders the
+    periods and is the keyset cursor of the sidebar APIs.
+    """
+    frequency = models.CharField(max_length=10, choices=KPIRecord.RECORD_TYPE_CHOICES)
+    key = models.PositiveIntegerField()
+    eth_year = models.PositiveSmallIntegerField()
+    eth_month = models.PositiveSmallIntegerField()
+    number = models.PositiveSmallIntegerField(help_text="Week of the month (1-5) or day of the month")
+    indicators = models.ManyToManyField(Indicator, through='KPIPeriodIndicator', related_name='kpi_periods')
 
-            groups.setdefault(key, []).append(r)
+    class Meta:
+        unique_together = ('frequency', 'key')
 
-        # Aggregate
-        for key, items in groups.items():
-            if len(items) < 5:
-                continue
+    def __str__(self):
+        return f"{self.frequency} {self.eth_year}-{self.eth_month}-{self.number}"
 
-            tot_perf = sum(i.performance or 0 for i in items)
-            tot_target = sum(i.target or 0 for i in items)
 
-            first_date = items[0].date
+class KPIPeriodIndicator(models.Model):
+    """An indicator with data in a KPIPeriod, and its first record of the period."""
+    period = models.ForeignKey(KPIPeriod, on_delete=models.CASCADE, related_name='entries')
+    indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='kpi_period_entries')
+    # cleared when the record is deleted, until the catalog of the indicator is refreshed on commit
+    record = models.ForeignKey(KPIRecord, null=True, on_delete=models.SET_NULL, related_name='+')
+    date = models.DateField(help_text="Date of the first record of the indicator in the period")
 
-            KPIRecord.objects.update_or_create(
-                indicator=indicator,
-                record_type='weekly',
-                date=first_date,
-                defaults={
-                    'performance': tot_perf,
-                    'target': tot_target,
-                }
-            )
+    class Meta:
+        unique_together = ('period', 'indicator')
+        indexes = [models.Index(fields=['indicator', 'period'])]
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
 
-        if self.record_type == 'daily':
-            KPIRecord.create_aggregate_data(self.indicator)
-        
-    
-    def __str__(self):
-        return f"{self.indicator} ({self.date}) - Target: {self.target}, Perf: {self.performance}"
-    
 class ProjectInitiatives(models.Model):
     title_ENG = models.CharField(max_length=50)
     title_AMH = models.CharField(max_length=50)
@@ -951,6 +720,141 @@ class TrendingIndicator(models.Model):
         return f"{self.indicator.title_ENG} ({self.performance}) {self.direction}"
 
 
+class Job(models.Model):
+    """
+    A unit of background work (a submission import, a large export) run by
+    the ``run_jobs`` worker; see Base.job_queue.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, help_text="Public id used by the status API")
+    name = models.CharField(max_length=100, help_text="Registered job handler")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent done")
+    message = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey('UserManagement.CustomUser', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status}, {self.progress}%)"
+
+    def report_progress(self, done, total, message=None):
+        """
+        Store the percentage of ``done`` out of ``total``, without touching
+        other fields. Also refreshes ``locked_at``, the heartbeat that keeps a
+        running job from being requeued as stale.
+        """
+        self.progress = min(100, int(done * 100 / total)) if total else 100
+        self.locked_at = timezone.now()
+        fields = {'progress': self.progress, 'locked_at': self.locked_at}
+        if message is not None:
+            self.message = fields['message'] = message[:255]
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+
+class StatisticsSnapshot(models.Model):
+    """
+    Precomputed statistics of a screen (the data management dashboard),
+    rebuilt by Base.dashboard_stats when the data changed after
+    ``computed_at``.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(help_text="When the computation started")
+    changed_at = models.DateTimeField(null=True, blank=True, help_text="Last write to the underlying data")
+
+    def __str__(self):
+        return f"{self.key} ({self.computed_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def is_stale(self):
+        return self.changed_at is not None and self.changed_at >= self.computed_at
+
+
+class AuditLogIndex(models.Model):
+    """
+    Denormalized row per auditlog LogEntry with what the audit log screen
+    filters and shows (actor role, model, indicator, change summary),
+    written by Base.audit when the entry is created.
+    """
+    ROLE_CHOICES = [
+        ('importer', 'Data Importer'),
+        ('manager', 'Category Manager'),
+    ]
+
+    log_entry = models.OneToOneField('auditlog.LogEntry', on_delete=models.CASCADE, related_name='audit_index')
+    timestamp = models.DateTimeField(db_index=True)
+    action = models.PositiveSmallIntegerField()
+    actor = models.ForeignKey(
+        'UserManagement.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    actor_role = models.CharField(max_length=10, choices=ROLE_CHOICES, blank=True, default='', help_text="Role when the entry was written")
+    model = models.CharField(max_length=100, help_text="content_type.model of the entry")
+    indicator = models.ForeignKey(Indicator, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    indicator_title = models.CharField(max_length=300, blank=True, default='')
+    change_summary = models.CharField(max_length=255, blank=True, default='')
+    row_count = models.PositiveIntegerField(default=1, help_text="Rows covered; more than one for a batch entry")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['actor_role', '-timestamp']),
+            models.Index(fields=['actor_role', 'model', '-timestamp']),
+            models.Index(fields=['actor', '-timestamp']),
+        ]
+        verbose_name_plural = "Audit log index"
+
+    def __str__(self):
+        return f"{self.model} {self.get_actor_role_display() or 'other'} ({self.timestamp:%Y-%m-%d %H:%M})"
+
+    @property
+    def related_object(self):
+        if not self.indicator_title:
+            return None
+        if self.model == 'indicator':
+            return self.indicator_title
+        return f"Indicator: {self.indicator_title}"
+
+
+class AuditBatch(models.Model):
+    """
+    Per-row manifest of an aggregate audit entry, which Base.audit writes
+    for a batch of bulk-written rows instead of one LogEntry per row.
+    """
+    log_entry = models.OneToOneField('auditlog.LogEntry', on_delete=models.CASCADE, related_name='audit_batch')
+    row_count = models.PositiveIntegerField()
+    manifest = models.BinaryField(help_text="zlib-compressed JSON list of [object_pk, action, {field: [old, new]}]")
+
+    class Meta:
+        verbose_name_plural = "Audit batches"
+
+    def __str__(self):
+        return f"{self.log_entry} ({self.row_count} rows)"
+
+    @staticmethod
+    def pack(rows):
+        return zlib.compress(json.dumps(rows, separators=(',', ':'), default=str).encode())
+
+    def rows(self):
+        return json.loads(zlib.decompress(bytes(self.manifest)))
+
+
 
 
 
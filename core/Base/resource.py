@@ -3,8 +3,13 @@ from import_export.formats.base_formats import XLS
 import tablib
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 from import_export.results import RowResult, Result
-from django.db.utils import OperationalError, ProgrammingError
+from django.db import transaction
+from django.db.models import Count, Max, QuerySet
 from .models import *
+from .import_staging import CHUNK_SIZE
+from .rollups import deferred_rollups
+from . import audit
+from auditlog.context import disable_auditlog
 from tablib import Dataset
 from datetime import datetime
 #############Import export Model Resources################
@@ -552,68 +557,70 @@ class DayKPIRecordResource(resources.ModelResource):
         new_count = 0
         updated_count = 0
         
-        for row_number, row in enumerate(dataset.dict, start=1):
-            code = row.get('code')
+        # weekly rollups are refreshed once per touched week at the end
+        with deferred_rollups():
+            for row_number, row in enumerate(dataset.dict, start=1):
+                code = row.get('code')
             
-            if not code:
-                continue
+                if not code:
+                    continue
 
         
-            for year, value in row.items():
-                if str(year).lower() in ['code', 'indicator'] or value in [None, '']:
-                    continue
+                for year, value in row.items():
+                    if str(year).lower() in ['code', 'indicator'] or value in [None, '']:
+                        continue
                 
-                try:
-                    val = float(value)
-                except ValueError:
-                    continue
+                    try:
+                        val = float(value)
+                    except ValueError:
+                        continue
 
-                try:
-                    kpi = Indicator.objects.get(code = code)
-                except Indicator.DoesNotExist:
-                    continue
+                    try:
+                        kpi = Indicator.objects.get(code = code)
+                    except Indicator.DoesNotExist:
+                        continue
 
-                dt = datetime.strptime(str(year), "%Y-%m-%d %H:%M:%S")
-                year = dt.year
-                month = dt.month
-                day = dt.day
+                    dt = datetime.strptime(str(year), "%Y-%m-%d %H:%M:%S")
+                    year = dt.year
+                    month = dt.month
+                    day = dt.day
 
 
                              
-                ethiopia_date_start = EthDate(day, month, year)
-                greg_start = to_gregorian(ethiopia_date_start)
+                    ethiopia_date_start = EthDate(day, month, year)
+                    greg_start = to_gregorian(ethiopia_date_start)
 
 
                 
-                result_dataset.append([
-                    code, 
-                    record_type,
-                    None,
-                    val ,
-                    greg_start
-                ])
-
-
-                if not dry_run:
-                    update_fields = {
-                        'indicator': kpi,
-                        'record_type': record_type,
-                        'date': greg_start,
-                        'performance' : val
-                    }
+                    result_dataset.append([
+                        code, 
+                        record_type,
+                        None,
+                        val ,
+                        greg_start
+                    ])
+
+
+                    if not dry_run:
+                        update_fields = {
+                            'indicator': kpi,
+                            'record_type': record_type,
+                            'date': greg_start,
+                            'performance' : val
+                        }
 
                     
-                    obj, created = KPIRecord.objects.update_or_create(
-                        indicator__code=code,
-                        date = greg_start ,
-                        record_type = record_type,
-                        defaults=update_fields,
-                    )
-
-                    if created:
-                        new_count += 1
-                    else:
-                        updated_count += 1
+                        obj, created = KPIRecord.objects.update_or_create(
+                            indicator__code=code,
+                            date = greg_start ,
+                            record_type = record_type,
+                            defaults=update_fields,
+                        )
+
+                        if created:
+                            new_count += 1
+                        else:
+                            updated_count += 1
         
         if dry_run:
             return super().import_data(result_dataset, dry_run=True, raise_errors=raise_errors, **kwargs)
@@ -762,41 +769,152 @@ def handle_uploaded_Month_file(file):
     
 
 ############# Handle uploaded excel files and take action ################
-def confirm_file(imported_data, type):
+def import_resource(type):
+    if type == 'topic':
+        return TopicResource()
+    elif type == 'category':
+        return CategoryResource()
+    elif type == 'indicator':
+        return IndicatorResource()
+    elif type == 'yearly':
+        return AnnualDataResource()
+    elif type == 'quarterly':
+        return QuarterDataResource()
+    elif type == 'monthly':
+        return MonthDataResource()
+
+
+def confirm_file(imported_data, type, actor=None):
     try:
-        if type == 'topic':
-            resource  = TopicResource()
-        elif type == 'category':
-            resource = CategoryResource()
-        elif type == 'indicator':
-            resource = IndicatorResource()
-        elif type == 'yearly':
-            resource = AnnualDataResource()
-        elif type == 'quarterly':
-            resource = QuarterDataResource()
-        elif type == 'monthly':
-            resource = MonthDataResource()
-        result = resource.import_data(imported_data, dry_run=True, collect_failed_rows = True)
+        resource = import_resource(type)
+        # the dry run is rolled back, so its rows are not audited
+        with disable_auditlog():
+            result = resource.import_data(imported_data, dry_run=True, collect_failed_rows = True)
         
         if not result.has_errors():
-            resource.import_data(imported_data, dry_run=False)  # Actually import now
+            with audit.bulk_audit(actor, label=f'{type.title()} import'):
+                resource.import_data(imported_data, dry_run=False)  # Actually import now
             return True, f"Data imported successfully: {len(imported_data)} records imported."
         else:
             return False, f"Error importing data: Please review your Document."
     except Exception as e:
          return False, f"Error importing data: Please review your Document."
-    
 
 
+def confirm_stage(stage, actor=None, chunk_size=CHUNK_SIZE):
+    """
+    confirm_file for a staged upload (Base.import_staging), read chunk by
+    chunk so memory is bounded by the chunk size rather than the file.
 
+    The check imports every chunk in one transaction that is rolled back,
+    so later chunks see the rows earlier ones create, and the import itself
+    runs in one transaction: a failing chunk leaves nothing written and the
+    stage can be confirmed again. The imported rows are audited in batches
+    (Base.audit.bulk_audit).
+    """
+    try:
+        resource = import_resource(stage.kind)
+        with transaction.atomic(), disable_auditlog():
+            valid = all(
+                not resource.import_data(chunk, dry_run=False, collect_failed_rows = True).has_errors()
+                for chunk in stage.chunks(chunk_size)
+            )
+            transaction.set_rollback(True)
+        if not valid:
+            return False, f"Error importing data: Please review your Document."
+        with transaction.atomic(), audit.bulk_audit(actor, label=f'{stage.kind.title()} import'):
+            for chunk in stage.chunks(chunk_size):
+                resource.import_data(chunk, dry_run=False, raise_errors=True)
+        return True, f"Data imported successfully: {len(stage)} records imported."
+    except Exception as e:
+         return False, f"Error importing data: Please review your Document."
 
-def create_aggregate_data_resource():
-    YEARS = list(DataPoint.objects.order_by('year_EC').values_list('year_EC', flat=True).distinct())
 
-    attrs = {
-        'topic_name': fields.Field(column_name='Topic'),
-        'category_name': fields.Field(column_name='Category'),
-    }
+
+
+INDICATOR_EXPORT_FIELDS = (
+    'topic_name',
+    'category_name',
+    'title_ENG',
+    'code',
+    'description',
+    'measurement_units',
+    'frequency',
+    'source',
+    'methodology',
+    'disaggregation_dimensions',
+    'status',
+    'version',
+    'parent',
+    'kpi_characteristics',
+)
+
+
+class IndicatorWideResource(resources.ModelResource):
+    """
+    Indicators with one column per year (or year and quarter/month).
+
+    Indicators are read in chunks; the observations of every chunk are
+    pivoted into ``self.values`` ({(indicator_id, year_EC, period):
+    performance}) with one query before its rows are written, and categories
+    and topics are prefetched per chunk, so a row costs no queries of its own
+    and memory does not grow with the size of the export.
+    """
+    topic_name = fields.Field(column_name='Topic')
+    category_name = fields.Field(column_name='Category')
+
+    # row model and period number lookup of the pivoted observations
+    data_model = AnnualData
+    period_lookup = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.values = {}
+        self.loaded = set()
+
+    def load_values(self, indicator_ids):
+        indicator_ids = set(indicator_ids) - self.loaded
+        if not indicator_ids:
+            return
+        columns = ['indicator_id', 'for_datapoint__year_EC']
+        if self.period_lookup:
+            columns.append(self.period_lookup)
+        rows = self.data_model.objects.filter(indicator_id__in=indicator_ids).order_by('id').values_list(
+            *columns, 'performance'
+        )
+        for *key, performance in rows:
+            if not self.period_lookup:
+                key.append(None)
+            # first row wins, as .first() did
+            self.values.setdefault(tuple(key), performance)
+        self.loaded |= indicator_ids
+
+    def value(self, indicator, year, period=None):
+        self.load_values([indicator.id])
+        return self.values.get((indicator.id, year, period), '')
+
+    def filter_export(self, queryset, **kwargs):
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.select_related('parent').prefetch_related('for_category__topic')
+        return super().filter_export(queryset, **kwargs)
+
+    def iter_queryset(self, queryset):
+        if isinstance(queryset, QuerySet):
+            # prefetches per chunk, over a server-side cursor where supported
+            queryset = queryset.iterator(chunk_size=self.get_chunk_size())
+        chunk = []
+        for indicator in queryset:
+            chunk.append(indicator)
+            if len(chunk) == self.get_chunk_size():
+                yield from self.pivot(chunk)
+                chunk = []
+        yield from self.pivot(chunk)
+
+    def pivot(self, indicators):
+        self.values.clear()
+        self.loaded.clear()
+        self.load_values(indicator.id for indicator in indicators)
+        return indicators
 
     def dehydrate_topic_name(self, indicator):
         topics = set()
@@ -804,189 +922,115 @@ def create_aggregate_data_resource():
             if category.topic:
                 topics.add(category.topic.title_ENG)
         return ", ".join(sorted(topics)) if topics else ''
-    attrs['dehydrate_topic_name'] = dehydrate_topic_name
 
     def dehydrate_category_name(self, indicator):
         categories = [cat.name_ENG for cat in indicator.for_category.all()]
         return ", ".join(categories) if categories else ''
-    attrs['dehydrate_category_name'] = dehydrate_category_name
 
     def dehydrate_parent(self, indicator):
         return indicator.parent.code if indicator.parent else ''
-    attrs['dehydrate_parent'] = dehydrate_parent
 
-    def make_dehydrate_year(year):
-        def f(self, indicator):
-            annual_value = indicator.annual_data.filter(for_datapoint__year_EC=year).first()
-            return annual_value.performance if annual_value else ''
-        return f
 
-    for year in YEARS:
-        attrs[f'year_{year}'] = fields.Field(column_name=str(year))
-        attrs[f'dehydrate_year_{year}'] = make_dehydrate_year(year)
+def _wide_resource(name, base, columns):
+    """
+    Subclass of ``base`` with a field per (field name, column name, year,
+    period) in ``columns``.
+    """
+    attrs = {}
+    for field_name, column_name, year, period in columns:
+        attrs[field_name] = fields.Field(column_name=column_name)
+        attrs[f'dehydrate_{field_name}'] = lambda self, indicator, year=year, period=period: self.value(indicator, year, period)
 
     class Meta:
         model = Indicator
-        fields = (
-            'topic_name',
-            'category_name',
-            'title_ENG',
-            'code',
-            'description',
-            'measurement_units',
-            'frequency',
-            'source',
-            'methodology',
-            'disaggregation_dimensions',
-            'status',
-            'version',
-            'parent',
-            'kpi_characteristics',
-            *[f'year_{year}' for year in YEARS],
-        )
+        fields = (*INDICATOR_EXPORT_FIELDS, *[column[0] for column in columns])
         export_order = fields
 
     attrs['Meta'] = Meta
-    return type('AnnualDataResource', (resources.ModelResource,), attrs)
+    return type(name, (base,), attrs)
 
-try:
-    AnnualDataResource = create_aggregate_data_resource()
-except (OperationalError, ProgrammingError):
-    AnnualDataResource = None  # DataPoint table not yet migrated
 
-def create_quarter_aggregate_resource():
-    YEARS = list(DataPoint.objects.order_by('year_EC').values_list('year_EC', flat=True).distinct())
-    QUARTERS = list(Quarter.objects.order_by('number').values_list('number', flat=True).distinct())
+class QuarterWideResource(IndicatorWideResource):
+    data_model = QuarterData
+    period_lookup = 'for_quarter__number'
 
-    attrs = {
-        'topic_name': fields.Field(column_name='Topic'),
-        'category_name': fields.Field(column_name='Category'),
-    }
-
-    def dehydrate_topic_name(self, indicator):
-        topics = set()
-        for category in indicator.for_category.all():
-            if category.topic:
-                topics.add(category.topic.title_ENG)
-        return ", ".join(sorted(topics)) if topics else ''
-    attrs['dehydrate_topic_name'] = dehydrate_topic_name
 
-    def dehydrate_category_name(self, indicator):
-        categories = [cat.name_ENG for cat in indicator.for_category.all()]
-        return ", ".join(categories) if categories else ''
-    attrs['dehydrate_category_name'] = dehydrate_category_name
+class MonthWideResource(IndicatorWideResource):
+    data_model = MonthData
+    period_lookup = 'for_month__number'
 
-    def dehydrate_parent(self, indicator):
-        return indicator.parent.code if indicator.parent else ''
-    attrs['dehydrate_parent'] = dehydrate_parent
 
-    # Dynamic quarter fields per year
-    def make_dehydrate_quarter(year, quarter_number):
-        def f(self, indicator):
-            qdata = indicator.quarter_data.filter(for_datapoint__year_EC=year, for_quarter__number=quarter_number).first()
-            return qdata.performance if qdata else ''
-        return f
+def create_aggregate_data_resource():
+    YEARS = list(DataPoint.objects.order_by('year_EC').values_list('year_EC', flat=True).distinct())
+    columns = [(f'year_{year}', str(year), year, None) for year in YEARS]
+    return _wide_resource('AnnualDataResource', IndicatorWideResource, columns)
 
-    for year in YEARS:
-        for q_num in QUARTERS:
-            q_name = Quarter.objects.get(number=q_num).title_ENG
-            attrs[f'Q{q_num}_{year}'] = fields.Field(column_name=f'{q_name} {year}')
-            attrs[f'dehydrate_Q{q_num}_{year}'] = make_dehydrate_quarter(year, q_num)
 
-    class Meta:
-        model = Indicator
-        fields = (
-            'topic_name',
-            'category_name',
-            'title_ENG',
-            'code',
-            'description',
-            'measurement_units',
-            'frequency',
-            'source',
-            'methodology',
-            'disaggregation_dimensions',
-            'status',
-            'version',
-            'parent',
-            'kpi_characteristics',
-            *[f'Q{q_num}_{year}' for year in YEARS for q_num in QUARTERS],
-        )
-        export_order = fields
-
-    attrs['Meta'] = Meta
-    return type('QuarterDataWideResource', (resources.ModelResource,), attrs)
+def create_quarter_aggregate_resource():
+    YEARS = list(DataPoint.objects.order_by('year_EC').values_list('year_EC', flat=True).distinct())
+    QUARTERS = list(Quarter.objects.order_by('number').values_list('number', flat=True).distinct())
+    quarter_names = dict(Quarter.objects.values_list('number', 'title_ENG'))
+    columns = [
+        (f'Q{q_num}_{year}', f'{quarter_names[q_num]} {year}', year, q_num)
+        for year in YEARS for q_num in QUARTERS
+    ]
+    return _wide_resource('QuarterDataWideResource', QuarterWideResource, columns)
 
 
 def create_month_aggregate_resource():
     YEARS = list(DataPoint.objects.order_by('year_EC').values_list('year_EC', flat=True).distinct())
     MONTHS = list(Month.objects.order_by('number').values_list('number', flat=True).distinct())
+    month_names = dict(Month.objects.values_list('number', 'month_AMH'))
+    columns = [
+        (f'M{m_num}_{year}', f'{month_names[m_num]} {year}', year, m_num)
+        for year in YEARS for m_num in MONTHS
+    ]
+    return _wide_resource('MonthDataWideResource', MonthWideResource, columns)
+
+
+# The wide resources have one column per year/period, so they are built on
+# first use and rebuilt whenever DataPoint, Quarter or Month change instead of
+# querying those tables at import time.
+_wide_resources = {}
+
+WIDE_RESOURCE_FACTORIES = {
+    'AnnualAggregateResource': create_aggregate_data_resource,
+    'QuarterDataWideResource': create_quarter_aggregate_resource,
+    'MonthDataWideResource': create_month_aggregate_resource,
+}
+
+
+def wide_resource_version():
+    """Row count, last id and last change of DataPoint, Quarter and Month."""
+    return tuple(
+        tuple(model.objects.aggregate(Count('id'), Max('id'), Max('created_at')).values())
+        for model in (DataPoint, Quarter, Month)
+    )
 
-    attrs = {
-        'topic_name': fields.Field(column_name='Topic'),
-        'category_name': fields.Field(column_name='Category'),
-    }
 
-    def dehydrate_topic_name(self, indicator):
-        topics = set()
-        for category in indicator.for_category.all():
-            if category.topic:
-                topics.add(category.topic.title_ENG)
-        return ", ".join(sorted(topics)) if topics else ''
-    attrs['dehydrate_topic_name'] = dehydrate_topic_name
-
-    def dehydrate_category_name(self, indicator):
-        categories = [cat.name_ENG for cat in indicator.for_category.all()]
-        return ", ".join(categories) if categories else ''
-    attrs['dehydrate_category_name'] = dehydrate_category_name
+def wide_resource(name):
+    """The wide resource class ``name``, rebuilt when the period tables changed."""
+    version = wide_resource_version()
+    cached = _wide_resources.get(name)
+    if cached is None or cached[0] != version:
+        cached = _wide_resources[name] = (version, WIDE_RESOURCE_FACTORIES[name]())
+    return cached[1]
 
-    def dehydrate_parent(self, indicator):
-        return indicator.parent.code if indicator.parent else ''
-    attrs['dehydrate_parent'] = dehydrate_parent
 
-    # Dynamic month fields per year
-    def make_dehydrate_month(year, month_number):
-        def f(self, indicator):
-            mdata = indicator.month_data.filter(for_datapoint__year_EC=year, for_month__number=month_number).first()
-            return mdata.performance if mdata else ''
-        return f
+def annual_aggregate_resource():
+    return wide_resource('AnnualAggregateResource')
 
-    for year in YEARS:
-        for m_num in MONTHS:
-            m_name = Month.objects.get(number=m_num).month_AMH
-            attrs[f'M{m_num}_{year}'] = fields.Field(column_name=f'{m_name} {year}')
-            attrs[f'dehydrate_M{m_num}_{year}'] = make_dehydrate_month(year, m_num)
 
-    class Meta:
-        model = Indicator
-        fields = (
-            'topic_name',
-            'category_name',
-            'title_ENG',
-            'code',
-            'description',
-            'measurement_units',
-            'frequency',
-            'source',
-            'methodology',
-            'disaggregation_dimensions',
-            'status',
-            'version',
-            'parent',
-            'kpi_characteristics',
-            *[f'M{m_num}_{year}' for year in YEARS for m_num in MONTHS],
-        )
-        export_order = fields
+def quarter_aggregate_resource():
+    return wide_resource('QuarterDataWideResource')
 
-    attrs['Meta'] = Meta
-    return type('MonthDataWideResource', (resources.ModelResource,), attrs)
 
+def month_aggregate_resource():
+    return wide_resource('MonthDataWideResource')
 
 
-# Usage
-try:
-    QuarterDataWideResource = create_quarter_aggregate_resource()
-    MonthDataWideResource = create_month_aggregate_resource()
-except (OperationalError, ProgrammingError):
-    QuarterDataWideResource = None  # DataPoint table not yet migrated
-    MonthDataWideResource = None
\ No newline at end of file
+def __getattr__(name):
+    # QuarterDataWideResource / MonthDataWideResource used to be module attributes
+    if name in ('QuarterDataWideResource', 'MonthDataWideResource'):
+        return wide_resource(name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
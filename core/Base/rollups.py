@@ -0,0 +1,142 @@
+"""
+Weekly KPI rollups.
+
+A weekly KPIRecord is the sum of the daily records of one Ethiopian week
+(days 1-7, 8-14, 15-21 and 22-30 of a month; Pagume is a single week) once
+the week has at least five daily records. It is dated with the latest daily
+date of the week.
+
+Saving a daily record only recomputes the week it falls in. Bulk writers
+wrap their loop in ``deferred_rollups()`` so each touched week is recomputed
+once, in a fixed number of queries, when the batch ends.
+"""
+import threading
+from contextlib import contextmanager
+from django.apps import apps
+from django.db.models import Q
+from . import api_cache, series
+from .ethiopian_calendar import ethiopian_week
+
+
+MIN_DAYS_PER_WEEK = 5
+
+_state = threading.local()
+
+
+def week_key(day):
+    """(eth_year, eth_month, week) of a Gregorian date."""
+    return ethiopian_week(day)
+
+
+def _write_rollups(daily, weeks=None):
+    """
+    Aggregate the given daily queryset per (indicator, week) and upsert the
+    weekly records. ``weeks`` restricts the write to a set of
+    (indicator_id, week key) pairs. Returns the number of weekly records
+    written.
+    """
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+
+    groups = {}
+    rows = daily.order_by('indicator_id', '-date').values_list(
+        'indicator_id', 'date', 'performance', 'target', 'eth_year', 'eth_month', 'eth_week',
+    )
+    for indicator_id, day, performance, target, *week in rows:
+        # the stored week, computed for records the backfill has not reached yet
+        key = (indicator_id, tuple(week) if week[0] is not None else week_key(day))
+        if weeks is not None and key not in weeks:
+            continue
+        groups.setdefault(key, []).append((day, performance, target))
+
+    totals = {}
+    for (indicator_id, _), items in groups.items():
+        if len(items) < MIN_DAYS_PER_WEEK:
+            continue
+        totals[(indicator_id, items[0][0])] = (
+            sum(performance or 0 for _, performance, _ in items),
+            sum(target or 0 for _, _, target in items),
+        )
+    if not totals:
+        return 0
+
+    existing = {}
+    weekly = KPIRecord.objects.filter(
+        record_type='weekly',
+        indicator_id__in={indicator_id for indicator_id, _ in totals},
+        date__in={day for _, day in totals},
+    )
+    for record in weekly.order_by('id'):
+        existing.setdefault((record.indicator_id, record.date), record)
+
+    to_create = []
+    to_update = []
+    for (indicator_id, day), (performance, target) in totals.items():
+        record = existing.get((indicator_id, day))
+        if record is None:
+            record = KPIRecord(
+                indicator_id=indicator_id, record_type='weekly', date=day, performance=performance, target=target,
+            )
+            record.set_ethiopian_date()
+            to_create.append(record)
+        else:
+            record.performance = performance
+            record.target = target
+            to_update.append(record)
+
+    KPIRecord.objects.bulk_create(to_create)
+    KPIRecord.objects.bulk_update(to_update, ['performance', 'target'])
+    api_cache.invalidate(KPIRecord)
+    series.mark_dirty({indicator_id for indicator_id, _ in totals}, 'weekly')
+    return len(totals)
+
+
+def refresh_weeks(weeks):
+    """Recompute the weekly records of the given (indicator_id, week key) pairs."""
+    weeks = set(weeks)
+    if not weeks:
+        return 0
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+
+    # one indexed (indicator, record_type, eth_year, eth_month, eth_week) range per week
+    in_weeks = Q()
+    for year, month, week in {key for _, key in weeks}:
+        in_weeks |= Q(eth_year=year, eth_month=month, eth_week=week)
+    daily = KPIRecord.objects.filter(
+        in_weeks, record_type='daily', indicator_id__in={indicator_id for indicator_id, _ in weeks},
+    )
+    return _write_rollups(daily, weeks)
+
+
+def rebuild(indicator_ids=None):
+    """Recompute every weekly rollup, optionally only for some indicators."""
+    KPIRecord = apps.get_model('Base', 'KPIRecord')
+
+    daily = KPIRecord.objects.filter(record_type='daily', indicator__isnull=False)
+    if indicator_ids is not None:
+        daily = daily.filter(indicator_id__in=indicator_ids)
+    return _write_rollups(daily)
+
+
+def schedule(indicator_id, day):
+    """Refresh the week of a saved daily record now, or at the end of the current deferred batch."""
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        refresh_weeks([(indicator_id, week_key(day))])
+    else:
+        pending.add((indicator_id, week_key(day)))
+
+
+@contextmanager
+def deferred_rollups():
+    """Collect the weeks touched by daily saves and refresh each of them once on exit."""
+    if getattr(_state, 'pending', None) is not None:
+        # nested batch: the outermost one refreshes
+        yield
+        return
+
+    _state.pending = pending = set()
+    try:
+        yield
+    finally:
+        _state.pending = None
+    refresh_weeks(pending)
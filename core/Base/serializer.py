@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from rest_framework import serializers
-from .models import Indicator, AnnualData, QuarterData, KPIRecord, DataPoint
+from django.utils.functional import cached_property
+from django.urls import reverse
+from .models import Indicator, AnnualData, QuarterData, KPIRecord, DataPoint, Job
 
 
 from .models import (
@@ -42,16 +44,19 @@ class IndicatorSerializers(serializers.ModelSerializer):
             'data_points'
         ]
 
+    @cached_property
+    def current_year(self):
+        # one lookup per serializer (shared by every item of a list), not per indicator and field
+        return DataPoint.objects.last()
+
     # --- Annual Data ---
     def get_annual_data(self, obj):
-        current_year = DataPoint.objects.last()
-        recent_data = obj.annual_data.filter(for_datapoint=current_year)
+        recent_data = obj.annual_data.filter(for_datapoint=self.current_year)
         return AnnualDataSerializers(recent_data, many=True).data
 
     # --- Quarterly Data ---
     def get_quarter_data(self, obj):
-        current_year = DataPoint.objects.last()
-        recent_quarterly_data = obj.quarter_data.filter(for_datapoint=current_year)
+        recent_quarterly_data = obj.quarter_data.filter(for_datapoint=self.current_year).order_by('for_quarter__number')
         return QuarterDataSerializers(recent_quarterly_data, many=True).data
 
     # --- Weekly Data (last 7 days) ---
@@ -248,3 +253,21 @@ class DailyKPIRecordUpdateSerializer(serializers.Serializer):
     target = serializers.FloatField(required=False, allow_null=True)
     is_verified = serializers.BooleanField(required=False)
 
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'token', 'name', 'status', 'progress', 'message', 'result', 'attempts',
+            'created_at', 'finished_at', 'status_url', 'download_url',
+        ]
+
+    def get_status_url(self, obj):
+        return reverse('job_status_api', args=[obj.token])
+
+    def get_download_url(self, obj):
+        return obj.result_file.url if obj.result_file else None
@@ -0,0 +1,319 @@
+"""
+Dense per-indicator time series.
+
+Every (indicator, frequency) pair has one IndicatorSeries row holding the
+indicator's annual, quarterly or monthly observations as packed columns:
+int64 row ids, int32 year_EC, uint8 quarter/month number, float64
+performance and target, and bitmaps for null values and the verified/seen
+flags. Readers fetch a whole series with a single row read instead of
+joining and ordering the observation tables.
+
+Series are rebuilt from the row tables, one series at a time, whenever a
+row changes, together with the indicator's latest values (Base.latest_values)
+and, for KPI records, its weekly/daily periods (Base.kpi_periods).
+Rebuilds are collected and run once per series when the surrounding
+transaction commits. Writers that bypass model signals
+(bulk_create, bulk_update, QuerySet.update) call ``mark_dirty`` themselves.
+Rebuilds read from the primary database, also inside read-only requests
+routed to the replicas. Reads never write: series that were never built are
+read from the row tables until ``rebuild_indicator_series --missing`` (run
+on every deploy) stores them.
+"""
+import math
+import threading
+import weakref
+from array import array
+from django.apps import apps
+from django.db import transaction
+from django.db.models import IntegerField, Value
+from django.utils import timezone
+from project.db_router import read_from_replicas
+from . import kpi_periods, latest_values
+
+
+FREQUENCIES = ('annual', 'quarterly', 'monthly')
+
+# frequency -> (row model, period number lookup)
+SOURCES = {
+    'annual': ('AnnualData', None),
+    'quarterly': ('QuarterData', 'for_quarter__number'),
+    'monthly': ('MonthData', 'for_month__number'),
+}
+
+STORED_FIELDS = [
+    'length', 'row_ids', 'years', 'periods', 'values', 'targets', 'value_nulls', 'target_nulls', 'verified', 'seen',
+]
+
+_state = threading.local()
+
+
+def _pack_bits(flags):
+    bits = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def _unpack_bits(data, length):
+    data = bytes(data)
+    return [bool(data[index >> 3] & (1 << (index & 7))) for index in range(length)]
+
+
+def _unpack(typecode, data):
+    column = array(typecode)
+    column.frombytes(bytes(data))
+    return column
+
+
+class Series:
+    """Decoded columns of one IndicatorSeries, sorted by (year, period, row id)."""
+
+    def __init__(self, indicator_id, frequency, row_ids=(), years=(), periods=(), values=(), targets=(),
+                 verified=(), seen=()):
+        self.indicator_id = indicator_id
+        self.frequency = frequency
+        self.row_ids = list(row_ids)
+        self.years = list(years)
+        self.periods = list(periods)
+        self.values = list(values)
+        self.targets = list(targets)
+        self.verified = list(verified)
+        self.seen = list(seen)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @classmethod
+    def from_rows(cls, indicator_id, frequency, rows):
+        """Build from (id, year_EC, period number, performance, target, is_verified, is_seen) tuples."""
+        rows = sorted(rows, key=lambda row: (row[1] or 0, row[2] or 0, row[0]))
+        return cls(indicator_id, frequency, *zip(*rows)) if rows else cls(indicator_id, frequency)
+
+    @classmethod
+    def from_model(cls, stored):
+        length = stored.length
+        values = _unpack('d', stored.values)
+        targets = _unpack('d', stored.targets)
+        value_nulls = _unpack_bits(stored.value_nulls, length)
+        target_nulls = _unpack_bits(stored.target_nulls, length)
+        return cls(
+            stored.indicator_id,
+            stored.frequency,
+            row_ids=_unpack('q', stored.row_ids),
+            years=[year or None for year in _unpack('i', stored.years)],
+            periods=[period or None for period in _unpack('B', stored.periods)],
+            values=[None if null else value for value, null in zip(values, value_nulls)],
+            targets=[None if null else target for target, null in zip(targets, target_nulls)],
+            verified=_unpack_bits(stored.verified, length),
+            seen=_unpack_bits(stored.seen, length),
+        )
+
+    def to_model_fields(self):
+        return {
+            'length': len(self),
+            'row_ids': array('q', self.row_ids).tobytes(),
+            'years': array('i', [year or 0 for year in self.years]).tobytes(),
+            'periods': array('B', [period or 0 for period in self.periods]).tobytes(),
+            'values': array('d', [math.nan if value is None else value for value in self.values]).tobytes(),
+            'targets': array('d', [math.nan if target is None else target for target in self.targets]).tobytes(),
+            'value_nulls': _pack_bits([value is None for value in self.values]),
+            'target_nulls': _pack_bits([target is None for target in self.targets]),
+            'verified': _pack_bits(self.verified),
+            'seen': _pack_bits(self.seen),
+        }
+
+    def points(self):
+        """(row id, year_EC, period, performance, target, is_verified, is_seen) per observation."""
+        return zip(self.row_ids, self.years, self.periods, self.values, self.targets, self.verified, self.seen)
+
+    def latest(self, count):
+        """The last ``count`` observations that have a year, newest first."""
+        dated = [point for point in self.points() if point[1] is not None]
+        return dated[::-1][:count]
+
+
+def _read_rows(indicator_ids, frequency):
+    model_name, period_field = SOURCES[frequency]
+    model = apps.get_model('Base', model_name)
+    rows = model.objects.filter(indicator_id__in=indicator_ids).order_by()
+    if period_field is None:
+        rows = rows.annotate(period=Value(None, output_field=IntegerField()))
+        period_field = 'period'
+    grouped = {indicator_id: [] for indicator_id in indicator_ids}
+    for indicator_id, *row in rows.values_list(
+        'indicator_id', 'id', 'for_datapoint__year_EC', period_field, 'performance', 'target', 'is_verified', 'is_seen',
+    ):
+        grouped[indicator_id].append(row)
+    return {
+        indicator_id: Series.from_rows(indicator_id, frequency, rows)
+        for indicator_id, rows in grouped.items()
+    }
+
+
+@read_from_replicas(False)
+def rebuild(indicator_ids, frequency):
+    """Rebuild and store the series of the given indicators; returns {indicator_id: Series}."""
+    IndicatorSeries = apps.get_model('Base', 'IndicatorSeries')
+    indicator_ids = {indicator_id for indicator_id in indicator_ids if indicator_id is not None}
+    if not indicator_ids:
+        return {}
+
+    # rows may point at indicators deleted in the same transaction
+    live = set(apps.get_model('Base', 'Indicator').objects.filter(id__in=indicator_ids).values_list('id', flat=True))
+    built = _read_rows(live, frequency)
+    existing = {
+        stored.indicator_id: stored
+        for stored in IndicatorSeries.objects.filter(indicator_id__in=live, frequency=frequency)
+    }
+    now = timezone.now()
+    to_create, to_update = [], []
+    for indicator_id, series in built.items():
+        fields = series.to_model_fields()
+        stored = existing.get(indicator_id)
+        if stored is None:
+            to_create.append(IndicatorSeries(indicator_id=indicator_id, frequency=frequency, **fields))
+        else:
+            for name, value in fields.items():
+                setattr(stored, name, value)
+            stored.updated_at = now
+            to_update.append(stored)
+    IndicatorSeries.objects.bulk_create(to_create, ignore_conflicts=True)
+    IndicatorSeries.objects.bulk_update(to_update, STORED_FIELDS + ['updated_at'])
+    latest_values.refresh_from_series(built.values())
+    return built
+
+
+def rebuild_all(frequencies=FREQUENCIES, batch_size=500):
+    """Rebuild every series; returns the number of series written."""
+    indicator_ids = list(apps.get_model('Base', 'Indicator').objects.order_by('id').values_list('id', flat=True))
+    written = 0
+    for frequency in frequencies:
+        for start in range(0, len(indicator_ids), batch_size):
+            written += len(rebuild(indicator_ids[start:start + batch_size], frequency))
+    return written
+
+
+def build_missing(frequencies=FREQUENCIES, batch_size=500):
+    """
+    Build the series that were never built (e.g. right after upgrading);
+    returns the number of series written.
+    """
+    IndicatorSeries = apps.get_model('Base', 'IndicatorSeries')
+    written = 0
+    for frequency in frequencies:
+        indicator_ids = list(
+            apps.get_model('Base', 'Indicator').objects.exclude(
+                id__in=IndicatorSeries.objects.filter(frequency=frequency).values('indicator_id')
+            ).order_by('id').values_list('id', flat=True)
+        )
+        for start in range(0, len(indicator_ids), batch_size):
+            written += len(rebuild(indicator_ids[start:start + batch_size], frequency))
+    return written
+
+
+def load(indicator_ids, frequency):
+    """
+    {indicator_id: Series} in one query. Series that were never built are
+    read from the row tables without storing them (see build_missing).
+    """
+    IndicatorSeries = apps.get_model('Base', 'IndicatorSeries')
+    indicator_ids = set(indicator_ids)
+    if not indicator_ids:
+        return {}
+    found = {
+        stored.indicator_id: Series.from_model(stored)
+        for stored in IndicatorSeries.objects.filter(indicator_id__in=indicator_ids, frequency=frequency)
+    }
+    missing = indicator_ids - set(found)
+    if missing:
+        found.update(_read_rows(missing, frequency))
+    return found
+
+
+def load_all(indicator_id, frequencies=FREQUENCIES):
+    """{frequency: Series} of one indicator in one query, read like ``load``."""
+    IndicatorSeries = apps.get_model('Base', 'IndicatorSeries')
+    found = {
+        stored.frequency: Series.from_model(stored)
+        for stored in IndicatorSeries.objects.filter(indicator_id=indicator_id, frequency__in=frequencies)
+    }
+    for frequency in frequencies:
+        if frequency not in found:
+            found[frequency] = _read_rows([indicator_id], frequency)[indicator_id]
+    return found
+
+
+@read_from_replicas(False)
+def _flush():
+    pending = getattr(_state, 'pending', None)
+    _state.pending = set()
+    _state.scheduled = None
+    if not pending:
+        return
+    by_frequency = {}
+    for indicator_id, frequency in pending:
+        by_frequency.setdefault(frequency, set()).add(indicator_id)
+    with transaction.atomic():
+        for frequency, indicator_ids in by_frequency.items():
+            if frequency in latest_values.RECORD_FREQUENCIES:
+                latest_values.refresh_records(indicator_ids, frequency)
+                kpi_periods.refresh(indicator_ids, frequency)
+            else:
+                rebuild(indicator_ids, frequency)
+
+
+def mark_dirty(indicator_ids, frequency):
+    """
+    Rebuild the series of the given indicators once the current transaction
+    commits. ``frequency`` may also be 'weekly' or 'daily', which only
+    refreshes the KPI latest values and period catalog.
+    """
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        _state.pending = pending = set()
+    was_empty = not pending
+    added = False
+    for indicator_id in indicator_ids:
+        if indicator_id is not None:
+            pending.add((indicator_id, frequency))
+            added = True
+    if added and (was_empty or not _flush_scheduled()):
+        # pairs left over from a rolled back transaction are simply rebuilt with the next batch
+        callback = _FlushCallback()
+        _state.scheduled = weakref.ref(callback)
+        transaction.on_commit(callback)
+
+
+class _FlushCallback:
+    """
+    The registered flush. Only the transaction holds a reference to it, so a
+    rollback that drops the callback also clears the flag kept by mark_dirty.
+    """
+
+    def __call__(self):
+        _flush()
+
+
+def _flush_scheduled():
+    """Whether a flush is registered and neither ran nor was rolled back since, so a transaction registers one."""
+    scheduled = getattr(_state, 'scheduled', None)
+    return scheduled is not None and scheduled() is not None
+
+
+def mark_rows_dirty(queryset):
+    """
+    ``mark_dirty`` for the indicators of a row queryset. Inside a transaction
+    it can be called before a QuerySet.update that changes the filtered
+    columns; in autocommit mode call it after the update.
+    """
+    indicator_ids = queryset.order_by().values_list('indicator_id', flat=True).distinct()
+    mark_dirty(set(indicator_ids), frequency_of(queryset.model))
+
+
+def frequency_of(model):
+    """Series frequency of a row model, or None."""
+    for frequency, (model_name, _) in SOURCES.items():
+        if model._meta.label == f'Base.{model_name}':
+            return frequency
+    return None
@@ -1,5 +1,8 @@
-from django.db.models.signals import post_save
+from auditlog.models import LogEntry
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
+from . import api_cache, audit, dashboard_stats, latest_values, series
 from .models import Indicator
 
 
@@ -7,4 +10,93 @@ from .models import Indicator
 def generate_code_on_create(sender, instance, created, **kwargs):
     if created and not instance.code:
         instance.generate_code()
-        instance.save(update_fields=['code'])
\ No newline at end of file
+        instance.save(update_fields=['code'])
+
+
+def invalidate_api_cache(sender, **kwargs):
+    api_cache.invalidate(sender)
+
+
+for label in api_cache.TRACKED_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(invalidate_api_cache, sender=model, dispatch_uid=f'api_cache_save_{label}')
+    post_delete.connect(invalidate_api_cache, sender=model, dispatch_uid=f'api_cache_delete_{label}')
+
+
+@receiver(m2m_changed, sender=Indicator.for_category.through)
+def invalidate_api_cache_on_category_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        api_cache.invalidate(Indicator, 'Base.Category')
+        dashboard_stats.mark_stale()
+
+
+def mark_dashboard_stale(sender, **kwargs):
+    dashboard_stats.mark_stale()
+
+
+for label in dashboard_stats.SOURCE_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(mark_dashboard_stale, sender=model, dispatch_uid=f'dashboard_save_{label}')
+    post_delete.connect(mark_dashboard_stale, sender=model, dispatch_uid=f'dashboard_delete_{label}')
+
+
+def mark_series_dirty(sender, instance, **kwargs):
+    series.mark_dirty([instance.indicator_id], series.frequency_of(sender))
+
+
+for model_name, _ in series.SOURCES.values():
+    model = apps.get_model('Base', model_name)
+    post_save.connect(mark_series_dirty, sender=model, dispatch_uid=f'series_save_{model_name}')
+    post_delete.connect(mark_series_dirty, sender=model, dispatch_uid=f'series_delete_{model_name}')
+
+
+@receiver(post_save, sender='Base.KPIRecord', dispatch_uid='latest_kpi_save')
+@receiver(post_delete, sender='Base.KPIRecord', dispatch_uid='latest_kpi_delete')
+def mark_latest_kpi_dirty(sender, instance, **kwargs):
+    if instance.record_type in latest_values.RECORD_FREQUENCIES:
+        series.mark_dirty([instance.indicator_id], instance.record_type)
+
+
+def mark_series_dirty_for_period(sender, instance, created=False, **kwargs):
+    # a renumbered year, quarter or month changes the keys of every series using it
+    if created:
+        return
+    lookup = {'DataPoint': 'for_datapoint', 'Quarter': 'for_quarter', 'Month': 'for_month'}[sender.__name__]
+    for frequency, (model_name, _) in series.SOURCES.items():
+        model = apps.get_model('Base', model_name)
+        if lookup not in {field.name for field in model._meta.get_fields()}:
+            continue
+        indicator_ids = model.objects.filter(**{lookup: instance}).order_by().values_list('indicator_id', flat=True).distinct()
+        series.mark_dirty(set(indicator_ids), frequency)
+
+
+for model_name in ('DataPoint', 'Quarter', 'Month'):
+    post_save.connect(
+        mark_series_dirty_for_period, sender=apps.get_model('Base', model_name),
+        dispatch_uid=f'series_period_save_{model_name}',
+    )
+
+
+@receiver(post_save, sender=LogEntry, dispatch_uid='audit_index_save')
+def index_log_entry(sender, instance, created, **kwargs):
+    if created:
+        audit.index_entries([instance])
+
+
+def remember_bulk_audit_original(sender, instance, **kwargs):
+    audit.remember(sender, instance)
+
+
+def collect_bulk_audit_save(sender, instance, created, **kwargs):
+    audit.collect(sender, instance, LogEntry.Action.CREATE if created else LogEntry.Action.UPDATE)
+
+
+def collect_bulk_audit_delete(sender, instance, **kwargs):
+    audit.collect(sender, instance, LogEntry.Action.DELETE)
+
+
+for label in audit.AUDITED_MODELS:
+    model = apps.get_model(label)
+    pre_save.connect(remember_bulk_audit_original, sender=model, dispatch_uid=f'bulk_audit_original_{label}')
+    post_save.connect(collect_bulk_audit_save, sender=model, dispatch_uid=f'bulk_audit_save_{label}')
+    post_delete.connect(collect_bulk_audit_delete, sender=model, dispatch_uid=f'bulk_audit_delete_{label}')
@@ -1,3 +1,984 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections, router, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, to_gregorian, EthDate
+import openpyxl
+from auditlog.context import set_actor
+from auditlog.models import LogEntry
+from tablib import Dataset
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from Base import (
+    audit, dashboard_stats, ethiopian_calendar, exports, import_staging, job_queue, kpi_periods, latest_values, resource,
+    rollups, series,
+)
+from Base.api.api_views import acknowledge_seen_api, indicators_bulk_api
+from Base.management.commands.dedupe_observations import duplicate_ids
+from Base.deltas import delta_columns, performance_change, series_deltas
+from Base.models import (
+    AnnualData, AuditBatch, AuditLogIndex, Category, DataPoint, Indicator, IndicatorLatest, IndicatorSeries, Job, KPIPeriod, KPIRecord, Month,
+    MonthData, Quarter, QuarterData, StatisticsSnapshot, Topic,
+)
+from UserManagement.models import CustomUser
+from Base.views import indicator_detail_view
+from mobile.api.api import get_annual_value
+from mobile.api.prefetch import attach_week_days
+from project import db_router, sqlite
+
+
+class PerformanceChangeTests(TestCase):
+
+    def test_sign_rules(self):
+        self.assertEqual(performance_change(120, 100, 'inc'), {"change": 20, "percent": 20.0})
+        self.assertEqual(performance_change(120, 100, 'dec'), {"change": -20, "percent": -20.0})
+        self.assertEqual(performance_change(80, 100, 'const'), {"change": -20, "percent": -20.0})
+
+    def test_undefined_change(self):
+        self.assertIsNone(performance_change(None, 100, 'inc'))
+        self.assertIsNone(performance_change(100, None, 'inc'))
+        self.assertIsNone(performance_change(100, 0, 'inc'))
+
+    def test_delta_columns_matches_scalar(self):
+        current = [110.0, None, 95.5, 3.0]
+        previous = [100.0, 50.0, 97.25, 0]
+        kpis = ['inc', 'inc', 'dec', 'inc']
+        self.assertEqual(
+            delta_columns(current, previous, kpis),
+            [performance_change(c, p, k) for c, p, k in zip(current, previous, kpis)],
+        )
+
+
+class SeriesDeltasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.indicator = Indicator.objects.create(title_ENG='GDP', kpi_characteristics='dec')
+        cls.quarter = Quarter.objects.create(title_ENG='Q1', title_AMH='ሩብ 1', number=1)
+        for index, year in enumerate(range(1995, 2015)):
+            datapoint = DataPoint.objects.create(year_EC=year)
+            AnnualData.objects.create(indicator=cls.indicator, for_datapoint=datapoint, performance=100 + index * 10)
+            QuarterData.objects.create(
+                indicator=cls.indicator, for_datapoint=datapoint, for_quarter=cls.quarter, performance=10 + index
+            )
+
+    def test_whole_series_costs_one_query(self):
+        rows = list(AnnualData.objects.select_related('for_datapoint'))
+        with self.assertNumQueries(1):
+            deltas = series_deltas(rows)
+
+        latest = rows[-1]
+        self.assertEqual(latest.for_datapoint.year_EC, 2014)
+        self.assertEqual(deltas[1][-1], performance_change(290, 280, 'dec'))
+        self.assertEqual(deltas[5][-1], performance_change(290, 240, 'dec'))
+        self.assertEqual(deltas[10][-1], performance_change(290, 190, 'dec'))
+        self.assertIsNone(deltas[1][0])
+        self.assertEqual(sum(delta is not None for delta in deltas[10]), 10)
+
+    def test_model_methods_delegate(self):
+        row = QuarterData.objects.select_related('for_datapoint').get(for_datapoint__year_EC=2010)
+        with self.assertNumQueries(1):
+            self.assertEqual(row.get_previous_year_performance(), performance_change(25, 24, 'dec'))
+            self.assertEqual(row.get_performance_value_5_years_ago(), performance_change(25, 20, 'dec'))
+            self.assertEqual(row.get_performance_value_10_years_ago(), performance_change(25, 15, 'dec'))
+
+
+class EthiopianCalendarTests(TestCase):
+
+    def test_matches_library(self):
+        dates = [date(2010, 1, 1) + timedelta(days=n) for n in range(365 * 12)] + [date(1850, 3, 4), date(2150, 9, 11)]
+        expected = []
+        for value in dates:
+            eth = to_ethiopian(EthDate(value.day, value.month, value.year))
+            expected.append((eth.year, eth.month, eth.day))
+
+        self.assertEqual(ethiopian_calendar.to_ethiopian_dates(dates), expected)
+        self.assertEqual([ethiopian_calendar.to_gregorian_date(*eth) for eth in expected], dates)
+
+    def test_weeks_and_overflow(self):
+        self.assertEqual(ethiopian_calendar.ethiopian_week(date(2023, 10, 11)), (2016, 1, 4))
+        self.assertEqual(ethiopian_calendar.ethiopian_week(date(2023, 10, 11), last_week=5), (2016, 1, 5))
+        # Pagume 8 rolls over into the next year like the library
+        self.assertEqual(ethiopian_calendar.to_gregorian_date(2015, 13, 8), to_gregorian(EthDate(8, 13, 2015)).date())
+
+
+def eth_day(year, month, day):
+    return to_gregorian(EthDate(day, month, year)).date()
+
+
+class WeeklyRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.indicator = Indicator.objects.create(title_ENG='Fuel')
+
+    def add_days(self, month, days, indicator=None):
+        for day in days:
+            KPIRecord.objects.create(
+                indicator=indicator or self.indicator, record_type='daily',
+                date=eth_day(2016, month, day), performance=day, target=1,
+            )
+
+    def weekly(self):
+        return list(KPIRecord.objects.filter(record_type='weekly').values_list('date', 'performance', 'target'))
+
+    def test_week_key(self):
+        self.assertEqual(rollups.week_key(eth_day(2016, 2, 30)), (2016, 2, 4))
+        self.assertEqual(rollups.week_key(eth_day(2015, 13, 6)), (2015, 13, 1))
+
+    def test_save_rolls_up_its_week(self):
+        self.add_days(2, [1, 2, 3, 4])
+        self.assertEqual(self.weekly(), [])
+
+        self.add_days(2, [5, 8])
+        self.assertEqual(self.weekly(), [(eth_day(2016, 2, 5), 15, 5)])
+
+    def test_deferred_batch_matches_rebuild(self):
+        with rollups.deferred_rollups():
+            self.add_days(2, range(1, 31))
+            self.assertEqual(self.weekly(), [])
+        incremental = sorted(self.weekly())
+
+        KPIRecord.objects.filter(record_type='weekly').delete()
+        call_command('rebuild_kpi_rollups', stdout=StringIO())
+
+        self.assertEqual(sorted(self.weekly()), incremental)
+        self.assertEqual(incremental[-1], (eth_day(2016, 2, 30), sum(range(22, 31)), 9))
+        self.assertEqual(len(incremental), 4)
+
+    def test_deferred_batch_scales_linearly(self):
+        def count_queries(month, days):
+            indicator = Indicator.objects.create(title_ENG=f'KPI {month}')
+            with CaptureQueriesContext(connection) as queries:
+                with rollups.deferred_rollups():
+                    self.add_days(month, range(1, days + 1), indicator)
+            return len(queries)
+
+        count_queries(1, 7)
+        # rollups add a constant, so doubling the rows doubles the marginal cost
+        week, two_weeks, four_weeks = count_queries(2, 7), count_queries(3, 14), count_queries(4, 28)
+        self.assertEqual(four_weeks - two_weeks, 2 * (two_weeks - week))
+
+
+class KPIRecordEthiopianDateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.indicator = Indicator.objects.create(title_ENG='Power')
+
+    def eth_fields(self, record):
+        record.refresh_from_db()
+        return tuple(getattr(record, field) for field in KPIRecord.ETHIOPIAN_DATE_FIELDS)
+
+    def test_maintained_on_save(self):
+        record = KPIRecord.objects.create(indicator=self.indicator, record_type='daily', date=eth_day(2016, 2, 29))
+        self.assertEqual(self.eth_fields(record), (2016, 2, 29, 4))
+
+        record.date = eth_day(2016, 3, 9)
+        record.save(update_fields=['date'])
+        self.assertEqual(self.eth_fields(record), (2016, 3, 9, 2))
+
+    def test_backfill_command(self):
+        for day in range(1, 6):
+            KPIRecord.objects.create(indicator=self.indicator, record_type='daily', date=eth_day(2016, 5, day))
+        KPIRecord.objects.update(eth_year=None, eth_month=None, eth_day=None, eth_week=None)
+
+        call_command('backfill_kpi_ethiopian_dates', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(KPIRecord.objects.values_list('record_type', 'eth_year', 'eth_month', 'eth_day', 'eth_week')),
+            [('daily', 2016, 5, day, 1) for day in range(1, 6)] + [('weekly', 2016, 5, 5, 1)],
+        )
+
+    def test_week_lookups_read_the_stored_columns(self):
+        for day in range(1, 6):
+            KPIRecord.objects.create(indicator=self.indicator, record_type='daily', date=eth_day(2016, 5, day))
+        weekly = KPIRecord.objects.get(record_type='weekly')
+        self.assertEqual(weekly.ethio_date, '2016-5-1')
+
+        with CaptureQueriesContext(connection) as queries:
+            rollups.refresh_weeks([(self.indicator.id, (2016, 5, 1))])
+            attach_week_days([KPIRecord.objects.get(record_type='weekly')])
+        daily_reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and "'daily'" in query['sql']]
+        self.assertEqual(len(daily_reads), 2)
+        for sql in daily_reads:
+            self.assertIn('"eth_week" = 1', sql)
+
+        # without the columns (not backfilled yet) the week is computed from the date
+        KPIRecord.objects.update(eth_year=None, eth_month=None, eth_day=None, eth_week=None)
+        self.assertEqual(KPIRecord.objects.get(record_type='weekly').ethio_date, '2016-5-1')
+
+
+class IndicatorsBulkApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='bulk@example.com', username='bulk')
+        topic = Topic.objects.create(title_ENG='Economy')
+        cls.category = Category.objects.create(name_ENG='Energy', name_AMH='ኢነርጂ', code='ENE', topic=topic)
+
+    def add_indicators(self, count):
+        indicators = []
+        for n in range(count):
+            indicator = Indicator.objects.create(title_ENG=f'Weekly {Indicator.objects.count()}')
+            indicator.for_category.add(self.category)
+            for week in range(8):
+                KPIRecord.objects.create(
+                    indicator=indicator, record_type='weekly', date=date(2024, 1, 1) + timedelta(weeks=week), performance=week,
+                )
+            indicators.append(indicator)
+        return indicators
+
+    def get(self, indicators, mode):
+        request = APIRequestFactory().get(
+            '/api/indicators-bulk/', {'ids': ','.join(str(i.id) for i in indicators), 'mode': mode}
+        )
+        force_authenticate(request, self.user)
+        return json.loads(indicators_bulk_api(request).content)
+
+    def test_latest_weeks_per_indicator(self):
+        indicators = self.add_indicators(2)
+        results = self.get(indicators, 'weekly')['results']
+
+        self.assertEqual([row['id'] for row in results], [i.id for i in indicators])
+        for row in results:
+            self.assertEqual([week['value'] for week in row['weekly']], [7.0, 6.0, 5.0, 4.0, 3.0])
+
+    def test_query_count_does_not_grow_with_indicators(self):
+        few, many = self.add_indicators(2), self.add_indicators(12)
+
+        def count_queries(indicators):
+            with CaptureQueriesContext(connection) as queries:
+                self.get(indicators, 'weekly')
+            return len(queries)
+
+        self.assertEqual(count_queries(few), count_queries(many))
+
+
+class IndicatorSeriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.indicator = Indicator.objects.create(title_ENG='GDP', code='GDP')
+        cls.years = [DataPoint.objects.create(year_EC=year) for year in range(2010, 2014)]
+        cls.quarter = Quarter.objects.create(title_ENG='Q1', title_AMH='ሩብ 1', number=1)
+        # as if committed, so the tests start without a pending flush
+        with cls.captureOnCommitCallbacks(execute=True):
+            for datapoint, performance in zip(cls.years, [1.5, None, 3.25, 4.0]):
+                AnnualData.objects.create(indicator=cls.indicator, for_datapoint=datapoint, performance=performance, target=5)
+            QuarterData.objects.create(indicator=cls.indicator, for_datapoint=cls.years[0], for_quarter=cls.quarter, performance=7)
+
+    def test_round_trip(self):
+        stored = series.rebuild([self.indicator.id], 'annual')[self.indicator.id]
+        loaded = series.load([self.indicator.id], 'annual')[self.indicator.id]
+
+        self.assertEqual(loaded.years, [2010, 2011, 2012, 2013])
+        self.assertEqual(loaded.values, [1.5, None, 3.25, 4.0])
+        self.assertEqual(loaded.targets, [5.0] * 4)
+        self.assertEqual(list(loaded.points()), list(stored.points()))
+        self.assertEqual(IndicatorSeries.objects.get(indicator=self.indicator, frequency='annual').length, 4)
+
+    def test_rebuilt_once_per_transaction(self):
+        series.load([self.indicator.id], 'annual')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for datapoint in self.years:
+                    AnnualData.objects.filter(indicator=self.indicator, for_datapoint=datapoint).first().delete()
+                AnnualData.objects.create(indicator=self.indicator, for_datapoint=self.years[0], performance=9)
+
+        loaded = series.load([self.indicator.id], 'annual')[self.indicator.id]
+        self.assertEqual(list(zip(loaded.years, loaded.values)), [(2010, 9.0)])
+
+    def test_flush_is_registered_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for row in AnnualData.objects.filter(indicator=self.indicator):
+                row.performance = 8
+                row.save()
+            KPIRecord.objects.create(indicator=self.indicator, record_type='weekly', date=date(2024, 3, 1))
+        self.assertEqual(len([callback for callback in callbacks if isinstance(callback, series._FlushCallback)]), 1)
+
+    def test_flush_dropped_by_a_rollback_is_registered_again(self):
+        row = AnnualData.objects.get(indicator=self.indicator, for_datapoint=self.years[0])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError), transaction.atomic():
+                row.save()
+                raise ValueError
+            row.performance = 9
+            row.save()
+        self.assertEqual(len([callback for callback in callbacks if isinstance(callback, series._FlushCallback)]), 1)
+        self.assertEqual(series.load([self.indicator.id], 'annual')[self.indicator.id].values[0], 9.0)
+
+    def test_annual_value_reads_blobs(self):
+        request = APIRequestFactory().get('/mobile/annual_value/', {'code': 'GDP'})
+        response = get_annual_value(request)
+
+        self.assertEqual(response.data['time_series'], {
+            'annual': [
+                {'year': '2013', 'value': 4.0}, {'year': '2012', 'value': 3.25},
+                {'year': '2011', 'value': None}, {'year': '2010', 'value': 1.5},
+            ],
+            'quarter': [{'year': '2010', 'quarter': 'Q1', 'value': 7.0}],
+            'month': [],
+        })
+
+    def test_bulk_api_annual_mode(self):
+        category = Category.objects.create(name_ENG='Macro', name_AMH='ማክሮ', code='MAC', topic=Topic.objects.create(title_ENG='Economy'))
+        self.indicator.for_category.add(category)
+        user = CustomUser.objects.create(email='series@example.com', username='series')
+        request = APIRequestFactory().get('/api/indicators-bulk/', {'ids': str(self.indicator.id), 'mode': 'annual'})
+        force_authenticate(request, user)
+        IndicatorSeries.objects.all().delete()
+
+        # not built yet: read from the row tables without writing
+        with CaptureQueriesContext(connection) as queries:
+            results = json.loads(indicators_bulk_api(request).content)['results']
+        annual = results[0]['all_annual']
+        self.assertEqual([(row['year_ec'], row['year_gc'], row['value']) for row in annual], [
+            (2013, '2020/2021', 4.0), (2012, '2019/2020', 3.25), (2011, '2018/2019', None), (2010, '2017/2018', 1.5),
+        ])
+        self.assertFalse(IndicatorSeries.objects.exists())
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+
+        call_command('rebuild_indicator_series', missing=True, stdout=StringIO())
+        self.assertEqual(IndicatorSeries.objects.filter(indicator=self.indicator).count(), 3)
+
+        # built: the read is a single blob query
+        with CaptureQueriesContext(connection) as cached:
+            self.assertEqual(json.loads(indicators_bulk_api(request).content)['results'][0]['all_annual'], annual)
+        self.assertLess(len(cached), len(queries))
+
+    def test_bulk_verify_rebuilds_the_series(self):
+        AnnualData.objects.update(is_verified=False)
+        series.rebuild([self.indicator.id], 'annual')
+        manager = CustomUser.objects.create_user(
+            username='verifier', email='verifier@example.com', password='pw', is_category_manager=True,
+        )
+        self.client.force_login(manager)
+        ids = AnnualData.objects.values_list('id', flat=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/data-management/verification/annual/', {'ids': list(ids)})
+
+        self.assertEqual(series.load([self.indicator.id], 'annual')[self.indicator.id].verified, [True] * 4)
+
+    def test_latest_values_are_read_only_until_built(self):
+        KPIRecord.objects.create(indicator=self.indicator, record_type='weekly', date=date(2024, 3, 1), performance=2)
+        # right after upgrading
+        IndicatorSeries.objects.all().delete()
+        IndicatorLatest.objects.all().delete()
+
+        with self.assertNumQueries(1):
+            latest_values.attach([self.indicator])
+        self.assertEqual(self.indicator.prefetched_latest, {})
+        self.assertFalse(IndicatorLatest.objects.exists())
+
+        call_command('rebuild_indicator_series', missing=True, stdout=StringIO())
+        latest_values.attach([self.indicator])
+        self.assertEqual(self.indicator.prefetched_latest['annual'].year_EC, 2013)
+        self.assertEqual(self.indicator.prefetched_latest['weekly'].date, date(2024, 3, 1))
+
+    def test_latest_values_follow_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AnnualData.objects.create(indicator=self.indicator, for_datapoint=DataPoint.objects.create(year_EC=2014), performance=6)
+            KPIRecord.objects.create(indicator=self.indicator, record_type='daily', date=date(2024, 3, 1), performance=2)
+            KPIRecord.objects.create(indicator=self.indicator, record_type='daily', date=date(2024, 3, 2), performance=3)
+
+        latest = {row.frequency: row for row in IndicatorLatest.objects.filter(indicator=self.indicator)}
+        self.assertEqual((latest['annual'].year_EC, latest['annual'].value), (2014, 6.0))
+        self.assertEqual((latest['annual'].previous_value, latest['annual'].previous_year_value), (4.0, 4.0))
+        self.assertEqual((latest['daily'].date, latest['daily'].value, latest['daily'].previous_value), (date(2024, 3, 2), 3.0, 2.0))
+        self.assertEqual(latest_values.latest_frequency(self.indicator, ('annual', 'daily')), 'daily')
+
+
+    def test_acknowledging_kpi_records_refreshes_their_indicators(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record = KPIRecord.objects.create(indicator=self.indicator, record_type='weekly', date=date(2024, 3, 1), performance=2)
+        IndicatorLatest.objects.filter(frequency='weekly').delete()
+        KPIPeriod.objects.all().delete()
+
+        request = APIRequestFactory().post('/api/acknowledge-seen/', {'kpi_ids': [record.id]}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            acknowledge_seen_api(request)
+
+        self.assertTrue(KPIRecord.objects.get(id=record.id).is_seen)
+        self.assertEqual(IndicatorLatest.objects.get(indicator=self.indicator, frequency='weekly').date, date(2024, 3, 1))
+        self.assertTrue(KPIPeriod.objects.filter(frequency='weekly').exists())
+
+class ObservationConstraintTests(TestCase):
+
+    def test_duplicate_ids_keep_first_of_each_key(self):
+        rows = [((1, 10), 7), ((1, 10), 3), ((1, 11), 4), ((2, None), 5), ((2, None), 6)]
+        self.assertEqual(duplicate_ids(rows), [3])
+
+    def test_unique_period_per_indicator(self):
+        indicator = Indicator.objects.create(title_ENG='Exports')
+        datapoint = DataPoint.objects.create(year_EC=2015)
+        AnnualData.objects.create(indicator=indicator, for_datapoint=datapoint, performance=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnnualData.objects.create(indicator=indicator, for_datapoint=datapoint, performance=2)
+
+    def test_commands_run(self):
+        indicator = Indicator.objects.create(title_ENG='Exports')
+        AnnualData.objects.create(indicator=indicator, for_datapoint=DataPoint.objects.create(year_EC=2015), performance=1)
+        out = StringIO()
+        call_command('dedupe_observations', stdout=out)
+        call_command('explain_observation_queries', repeat=1, stdout=out)
+        self.assertIn('AnnualData: 0 duplicates deleted', out.getvalue())
+        self.assertIn('key lookup, unordered', out.getvalue())
+
+
+class ReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        connections.settings['replica_1'] = {
+            **connections['default'].settings_dict, 'NAME': os.path.join(self.tempdir.name, 'replica.sqlite3'),
+        }
+        self.addCleanup(self.tempdir.cleanup)
+        self.addCleanup(connections.settings.pop, 'replica_1')
+        self.addCleanup(lambda: connections['replica_1'].close())
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_reads_follow_the_request_flag(self):
+        self.assertEqual(Indicator.objects.all().db, 'default')
+        with db_router.read_from_replicas():
+            self.assertEqual(Indicator.objects.all().db, 'replica_1')
+            self.assertEqual(connections[Indicator.objects.all().db].vendor, 'sqlite')
+            self.assertEqual(router.db_for_write(Indicator), 'default')
+        self.assertEqual(Indicator.objects.all().db, 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_default(self):
+        with db_router.read_from_replicas():
+            self.assertEqual(Indicator.objects.all().db, 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_middleware_routes_read_only_api_views(self):
+        seen = []
+        factory = RequestFactory()
+
+        for request, view in (
+            (factory.get('/mobile/annual_value/'), get_annual_value),
+            (factory.post('/api/indicators-bulk/'), indicators_bulk_api),
+            (factory.get('/indicator/1/'), indicator_detail_view),
+        ):
+            def get_response(request, view=view):
+                middleware.process_view(request, view, (), {})
+                seen.append(Indicator.objects.all().db)
+            middleware = db_router.ReadReplicaMiddleware(get_response)
+            middleware(request)
+
+        self.assertEqual(seen, ['replica_1', 'default', 'default'])
+        self.assertFalse(db_router.reading_from_replicas())
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_rebuilds_read_from_the_primary(self):
+        indicator = Indicator.objects.create(title_ENG='GDP')
+        KPIRecord.objects.create(indicator=indicator, record_type='weekly', date=date(2024, 1, 3), performance=1)
+
+        # the replica has no tables, so any read routed there fails
+        with db_router.read_from_replicas():
+            series.rebuild([indicator.id], 'annual')
+            kpi_periods.ensure_built('weekly')
+            dashboard_stats.refresh()
+            self.assertTrue(db_router.reading_from_replicas())
+
+        self.assertTrue(KPIPeriod.objects.filter(frequency='weekly').exists())
+
+
+class SQLiteConnectionTests(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        connections.settings['scratch'] = {
+            **connections['default'].settings_dict, 'NAME': os.path.join(self.tempdir.name, 'scratch.sqlite3'),
+        }
+        self.addCleanup(self.tempdir.cleanup)
+        self.addCleanup(connections.settings.pop, 'scratch')
+        self.addCleanup(lambda: connections['scratch'].close())
+
+    def pragma(self, name):
+        with connections['scratch'].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000})
+    def test_new_connections_use_wal_and_tuned_pragmas(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('cache_size'), -2000)
+
+    def test_retry_when_locked_repeats_the_transaction(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        self.assertEqual(sqlite.retry_when_locked(write, delay=0, connection=connections['scratch']), 'done')
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            sqlite.retry_when_locked(write, delay=0, connection=connections['default'])
+        self.assertEqual(len(calls), 1)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            raise OperationalError('no such table: missing')
+
+        with self.assertRaises(OperationalError):
+            sqlite.retry_when_locked(write, delay=0, connection=connections['scratch'])
+        self.assertEqual(len(calls), 1)
+
+
+class WideResourceTests(TestCase):
+
+    def test_import_does_no_queries(self):
+        with self.assertNumQueries(0):
+            importlib.reload(resource)
+
+    def test_resources_are_cached_until_a_year_is_added(self):
+        DataPoint.objects.create(year_EC=2015)
+        first = resource.annual_aggregate_resource()
+        self.assertIs(resource.annual_aggregate_resource(), first)
+        self.assertIn('year_2015', first._meta.fields)
+
+        DataPoint.objects.create(year_EC=2016)
+        rebuilt = resource.annual_aggregate_resource()
+        self.assertIsNot(rebuilt, first)
+        self.assertIn('year_2016', rebuilt._meta.fields)
+
+    def test_quarter_columns_and_module_attribute(self):
+        DataPoint.objects.create(year_EC=2015)
+        Quarter.objects.create(title_ENG='Q1', title_AMH='ሩብ 1', number=1)
+        wide = resource.QuarterDataWideResource
+        self.assertIs(wide, resource.quarter_aggregate_resource())
+        self.assertEqual(wide().fields['Q1_2015'].column_name, 'Q1 2015')
+
+
+class StreamingExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(5):
+            Topic.objects.create(title_ENG=f'Topic {n}', title_AMH=f'ርዕስ {n}\x07')
+
+    def test_csv_is_streamed_and_matches_the_dataset(self):
+        response = exports.export_response(resource.TopicResource(), file_type='csv', filename='topic')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="topic.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode(), resource.TopicResource().export().csv)
+
+    def test_xlsx_is_written_in_write_only_mode(self):
+        response = exports.export_response(resource.TopicResource(), filename='topic')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="topic.xlsx"')
+        sheet = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = [[cell if cell is not None else '' for cell in row] for row in sheet.iter_rows(values_only=True)]
+
+        dataset = resource.TopicResource().export()
+        self.assertEqual(rows[0], dataset.headers)
+        self.assertEqual(len(rows), len(dataset) + 1)
+        # control characters openpyxl cannot store are dropped
+        self.assertIn('ርዕስ 0', rows[1])
+
+
+class JobQueueTests(TestCase):
+
+    def register(self, name, func):
+        job_queue.HANDLERS[name] = func
+        self.addCleanup(job_queue.HANDLERS.pop, name)
+
+    def test_jobs_run_once_and_report_progress(self):
+        def count(job, upto):
+            for n in range(1, upto + 1):
+                job.report_progress(n, upto)
+            return {'counted': upto}
+        self.register('count', count)
+        owner = CustomUser.objects.create(email='owner@example.com', username='owner')
+        job = job_queue.enqueue('count', {'upto': 4}, user=owner)
+
+        self.assertEqual(job_queue.run_pending(), 1)
+        self.assertEqual(job_queue.run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.result, job.attempts), ('succeeded', 100, {'counted': 4}, 1))
+
+        status_url = f'/api/jobs/{job.token}/'
+        self.assertEqual(self.client.get(status_url).status_code, 401)
+        self.client.force_login(CustomUser.objects.create(email='other@example.com', username='other'))
+        self.assertEqual(self.client.get(status_url).status_code, 403)
+
+        self.client.force_login(owner)
+        response = self.client.get(status_url)
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertEqual(response.json()['status_url'], status_url)
+
+    def test_failures_are_retried_then_marked_failed(self):
+        def broken(job):
+            raise ValueError('boom')
+        self.register('broken', broken)
+        job = job_queue.enqueue('broken', max_attempts=2)
+
+        job_queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.message), ('queued', 1, 'boom'))
+        self.assertGreater(job.run_after, timezone.now())
+        # not due yet
+        self.assertIsNone(job_queue.claim())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job_queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claimed_jobs_are_not_claimed_again_until_stale(self):
+        job = job_queue.enqueue('anything')
+        self.assertEqual(job_queue.claim('worker-1').pk, job.pk)
+        self.assertIsNone(job_queue.claim('worker-2'))
+
+        self.assertEqual(job_queue.requeue_stale(timedelta(0)), 1)
+        self.assertEqual(job_queue.claim('worker-2').locked_by, 'worker-2')
+
+    def test_progress_is_a_heartbeat_and_exhausted_jobs_fail(self):
+        job = job_queue.enqueue('anything', max_attempts=1)
+        job = job_queue.claim('worker-1')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        job.report_progress(1, 2)
+        self.assertEqual(job_queue.requeue_stale(), 0)
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(job_queue.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('failed', ''))
+        self.assertIsNotNone(job.finished_at)
+
+
+class ImportStagingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(IMPORT_STAGING_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_session_keeps_only_the_token_and_rows_come_back_in_chunks(self):
+        dataset = Dataset(*[(f'Topic {n}', f'Topic AMH {n}', n) for n in range(5)], headers=['title_ENG', 'title_AMH', 'rank'])
+        session = {}
+        token = import_staging.stage_in_session(session, 'topic_import_stage', dataset, 'topic')
+
+        self.assertEqual(session, {'topic_import_stage': token})
+        stage = import_staging.session_stage(session, 'topic_import_stage')
+        self.assertEqual((stage.kind, stage.headers, len(stage)), ('topic', ['title_ENG', 'title_AMH', 'rank'], 5))
+        chunks = list(stage.chunks(size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(chunks[2][0], ('Topic 4', 'Topic AMH 4', 4))
+
+        # staging again replaces the earlier stage
+        import_staging.stage_in_session(session, 'topic_import_stage', dataset, 'topic')
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        import_staging.pop_session_stage(session, 'topic_import_stage')
+        self.assertEqual((session, os.listdir(self.directory)), ({}, []))
+
+    def test_expired_and_unknown_stages_are_not_read(self):
+        token = import_staging.stage(Dataset(('a',), headers=['title_ENG']), 'topic')
+        with self.assertRaises(KeyError):
+            import_staging.load('../../etc/passwd')
+        self.assertIsNone(import_staging.session_stage({}, 'topic_import_stage'))
+
+        with override_settings(IMPORT_STAGE_MAX_AGE=-1):
+            with self.assertRaises(KeyError):
+                import_staging.load(token)
+            self.assertEqual(import_staging.purge(), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_confirm_stage_imports_the_staged_rows(self):
+        dataset = Dataset(*[(f'Topic {n}', f'Topic AMH {n}') for n in range(3)], headers=['title_ENG', 'title_AMH'])
+        stage = import_staging.load(import_staging.stage(dataset, 'topic'))
+
+        success, message = resource.confirm_stage(stage)
+
+        self.assertTrue(success, message)
+        self.assertEqual(Topic.objects.filter(title_ENG__startswith='Topic ').count(), 3)
+
+
+    def test_confirm_checks_and_imports_all_chunks_in_one_transaction(self):
+        stage = import_staging.load(import_staging.stage(
+            Dataset(('Energy', 'Energy'), ('Health', 'Health'), ('Energy', 'Power'), headers=['title_ENG', 'title_AMH']),
+            'topic',
+        ))
+        # the last chunk repeats a title the first one creates
+        self.assertFalse(resource.confirm_stage(stage, chunk_size=2)[0])
+        self.assertFalse(Topic.objects.exists())
+
+        stage = import_staging.load(import_staging.stage(
+            Dataset(('Energy', 'Energy'), ('Health', 'Health'), ('Water', 'Water'), headers=['title_ENG', 'title_AMH']),
+            'topic',
+        ))
+        self.assertTrue(resource.confirm_stage(stage, chunk_size=2)[0])
+        self.assertEqual(Topic.objects.count(), 3)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(title_ENG='Economy')
+        self.category = Category.objects.create(name_ENG='GDP', name_AMH='GDP', code='GDP', topic=topic)
+        self.indicators = [Indicator.objects.create(title_ENG=f'Indicator {n}', is_verified=n != 2) for n in range(3)]
+        self.category.indicators.add(*self.indicators)
+        year = DataPoint.objects.create(year_EC=2016)
+        self.months = [Month.objects.create(month_ENG=f'Month {n}', month_AMH=f'Month {n}', number=n) for n in (1, 2)]
+        AnnualData.objects.create(indicator=self.indicators[0], for_datapoint=year, performance=1)
+        MonthData.objects.create(indicator=self.indicators[0], for_datapoint=year, for_month=self.months[1], performance=1)
+        MonthData.objects.create(indicator=self.indicators[1], for_datapoint=year, for_month=self.months[1], performance=2)
+        self.user = CustomUser.objects.create_user(username='viewer', email='viewer@example.com', password='pw')
+
+    def test_compute_gathers_the_dashboard_statistics(self):
+        stats = dashboard_stats.compute()
+
+        self.assertEqual(stats['total_indicators'], 3)
+        self.assertEqual(stats['composition'], [1, 0, 2])
+        self.assertEqual((stats['cat_names'], stats['cat_counts']), (['GDP'], [3]))
+        self.assertEqual((stats['months'], stats['monthly_data']), (['Month 1', 'Month 2'], [0, 2]))
+        context = dashboard_stats.context(stats)
+        self.assertEqual(
+            (context['pending_verifications'], context['verification_rate'], context['data_gap_count'], context['freshness']),
+            (1, 66.7, 2, 'Today'),
+        )
+
+    def test_snapshot_is_recomputed_only_after_writes(self):
+        dashboard_stats.refresh()
+        with self.assertNumQueries(1):
+            self.assertEqual(dashboard_stats.snapshot()['total_indicators'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Indicator.objects.create(title_ENG='Indicator 3')
+        self.assertTrue(StatisticsSnapshot.objects.get(key=dashboard_stats.KEY).is_stale)
+        self.assertEqual(dashboard_stats.snapshot()['total_indicators'], 4)
+        self.assertFalse(StatisticsSnapshot.objects.get(key=dashboard_stats.KEY).is_stale)
+
+    def test_dashboard_renders_from_the_snapshot(self):
+        dashboard_stats.refresh()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/data-management/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['composition'], [1, 0, 2])
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+
+class AuditLogIndexTests(TestCase):
+    def setUp(self):
+        self.importer = CustomUser.objects.create_user(username='importer', email='importer@example.com', password='pw', is_importer=True)
+        self.indicator = Indicator.objects.create(title_ENG='Inflation')
+        self.year = DataPoint.objects.create(year_EC=2016)
+
+    def test_entries_are_indexed_when_written(self):
+        with set_actor(self.importer):
+            row = AnnualData.objects.create(indicator=self.indicator, for_datapoint=self.year, performance=1)
+            row.performance = 2
+            row.save()
+            row.delete()
+
+        indexed = list(AuditLogIndex.objects.filter(model='annualdata').order_by('log_entry_id'))
+        self.assertEqual(
+            [(i.action, i.actor_role, i.indicator_id, i.change_summary) for i in indexed],
+            [
+                (LogEntry.Action.CREATE, 'importer', self.indicator.id, 'New record created'),
+                (LogEntry.Action.UPDATE, 'importer', self.indicator.id, 'performance updated'),
+                (LogEntry.Action.DELETE, 'importer', self.indicator.id, 'Record deleted'),
+            ],
+        )
+        self.assertEqual(indexed[0].related_object, 'Indicator: Inflation')
+
+    def test_bulk_logged_updates_are_indexed(self):
+        rows = AnnualData.objects.bulk_create([AnnualData(indicator=self.indicator, for_datapoint=self.year, performance=1)])
+        audit.log_updates(AnnualData, [rows[0].id], {'is_verified': (False, True)}, actor=self.importer)
+
+        indexed = AuditLogIndex.objects.get(model='annualdata')
+        self.assertEqual((indexed.actor_role, indexed.row_count, indexed.change_summary), ('importer', 1, '1 rows written'))
+
+    def test_audit_log_view_pages_the_index(self):
+        admin = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        self.client.force_login(admin)
+
+        def page_queries(entries):
+            with set_actor(self.importer):
+                for n in range(entries):
+                    indicator = Indicator.objects.create(title_ENG=f'Inflation {entries} {n}')
+                    AnnualData.objects.create(indicator=indicator, for_datapoint=self.year, performance=n)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/data-management/audit-log/', {'user_type': 'importer', 'model': 'AnnualData'})
+            self.assertEqual(response.status_code, 200)
+            return len(queries), response.context['logs']
+
+        few, logs = page_queries(2)
+        many, logs = page_queries(8)
+        self.assertEqual(few, many)
+        self.assertEqual(len(logs), 10)
+        self.assertIn('Indicator: Inflation 8 7', [log['related_object'] for log in logs])
+        self.assertEqual({log['context'] for log in logs}, {'Data Table'})
+
+
+class BulkAuditTests(TestCase):
+    def setUp(self):
+        self.importer = CustomUser.objects.create_user(username='importer', email='importer@example.com', password='pw', is_importer=True)
+        self.year = DataPoint.objects.create(year_EC=2016)
+        self.indicators = [Indicator.objects.create(title_ENG=f'Indicator {n}') for n in range(5)]
+        LogEntry.objects.all().delete()
+
+    def test_rows_saved_in_bulk_mode_are_logged_per_batch(self):
+        with audit.bulk_audit(self.importer, label='Test import', batch_size=2):
+            for indicator in self.indicators:
+                row, _ = AnnualData.objects.update_or_create(indicator=indicator, for_datapoint=self.year, defaults={'performance': 1})
+                row.is_verified = True
+                row.save(update_fields=['is_verified'])
+
+        entries = list(LogEntry.objects.order_by('id'))
+        self.assertEqual([entry.audit_batch.row_count for entry in entries], [2, 2, 1])
+        self.assertEqual({entry.action for entry in entries}, {LogEntry.Action.CREATE})
+        object_pk, action, changes = entries[0].audit_batch.rows()[0]
+        self.assertEqual((action, changes['performance'], changes['is_verified']), (LogEntry.Action.CREATE, [None, '1'], [None, 'True']))
+        self.assertEqual(AuditLogIndex.objects.filter(row_count__gt=1).count(), 2)
+
+    def test_updates_record_the_values_they_replace(self):
+        row = AnnualData.objects.create(indicator=self.indicators[0], for_datapoint=self.year, performance=1)
+        LogEntry.objects.all().delete()
+
+        with audit.bulk_audit(self.importer):
+            row.performance = 2
+            row.save()
+            row.is_verified = True
+            row.save()
+
+        [entry] = LogEntry.objects.all()
+        self.assertEqual(
+            entry.audit_batch.rows(),
+            [[str(row.pk), LogEntry.Action.UPDATE, {'performance': ['1.0', '2'], 'is_verified': ['False', 'True']}]],
+        )
+
+    def test_data_grid_bulk_save_is_logged_per_batch(self):
+        updates = [{'indicator_id': indicator.id, 'year_ec': 2016, 'value': 3} for indicator in self.indicators]
+        request = APIRequestFactory().patch(
+            '/api/indicators-bulk/', json.dumps({'mode': 'annual', 'updates': updates}), content_type='application/json',
+        )
+        force_authenticate(request, self.importer)
+
+        self.assertEqual(json.loads(indicators_bulk_api(request).content)['saved'], 5)
+        [entry] = LogEntry.objects.filter(content_type__model='annualdata')
+        self.assertEqual(entry.audit_batch.row_count, 5)
+
+    def test_single_edits_keep_their_own_entries(self):
+        AnnualData.objects.create(indicator=self.indicators[0], for_datapoint=self.year, performance=1)
+        entry = LogEntry.objects.get(content_type__model='annualdata')
+        self.assertFalse(AuditBatch.objects.filter(log_entry=entry).exists())
+
+    def test_failed_block_inside_a_transaction_writes_nothing(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic(), audit.bulk_audit(self.importer):
+                AnnualData.objects.create(indicator=self.indicators[0], for_datapoint=self.year, performance=1)
+                raise ValueError
+        self.assertFalse(LogEntry.objects.exists())
+
+    def test_batch_rows_are_expanded_on_demand(self):
+        admin = CustomUser.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        [entry] = audit.log_batch(AnnualData, [[str(n), LogEntry.Action.UPDATE, {'performance': ['1', '2']}] for n in range(250)])
+        self.client.force_login(admin)
+
+        response = self.client.get(f'/data-management/audit-log/{entry.id}/rows/', {'page': 2})
+
+        self.assertEqual((response.json()['row_count'], response.json()['num_pages']), (250, 2))
+        self.assertEqual(response.json()['rows'][0], {'object_pk': '200', 'action': 1, 'changes': {'performance': ['1', '2']}})
+
+
+class KPIPeriodTests(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(title_ENG='Economy')
+        category = Category.objects.create(name_ENG='Fuel', name_AMH='Fuel', code='FUEL', topic=topic)
+        self.fuel, self.power = Indicator.objects.create(title_ENG='Fuel'), Indicator.objects.create(title_ENG='Power')
+        category.indicators.add(self.fuel, self.power)
+
+    def add(self, indicator, record_type, month, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            return KPIRecord.objects.create(
+                indicator=indicator, record_type=record_type, date=eth_day(2016, month, day), performance=day,
+            )
+
+    def catalog(self, frequency):
+        return {
+            period.key: {entry.indicator_id: entry.date for entry in period.entries.all()}
+            for period in KPIPeriod.objects.filter(frequency=frequency).prefetch_related('entries')
+        }
+
+    def test_catalog_follows_record_writes(self):
+        self.add(self.fuel, 'weekly', 2, 3)
+        power = self.add(self.power, 'weekly', 2, 2)
+        late = self.add(self.fuel, 'weekly', 2, 29)
+        self.assertEqual(self.catalog('weekly'), {
+            20160201: {self.fuel.id: eth_day(2016, 2, 3), self.power.id: eth_day(2016, 2, 2)},
+            20160205: {self.fuel.id: eth_day(2016, 2, 29)},
+        })
+
+        with self.captureOnCommitCallbacks(execute=True):
+            power.delete()
+            late.delete()
+        self.assertEqual(self.catalog('weekly'), {20160201: {self.fuel.id: eth_day(2016, 2, 3)}})
+
+        self.add(self.power, 'daily', 3, 1)
+        incremental = self.catalog('weekly'), self.catalog('daily')
+        KPIPeriod.objects.all().delete()
+        call_command('rebuild_kpi_periods', stdout=StringIO())
+        self.assertEqual((self.catalog('weekly'), self.catalog('daily')), incremental)
+        self.assertEqual(incremental[1], {20160301: {self.power.id: eth_day(2016, 3, 1)}})
+
+    def test_deploy_builds_an_empty_catalog_once(self):
+        self.add(self.fuel, 'weekly', 2, 3)
+        expected = self.catalog('weekly')
+        KPIPeriod.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_kpi_periods', if_empty=True, stdout=out)
+        self.assertEqual(self.catalog('weekly'), expected)
+        self.assertIn('Built: weekly.', out.getvalue())
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebuild_kpi_periods', if_empty=True, stdout=out)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        self.assertIn('Built: nothing to build.', out.getvalue())
+
+    def test_pages_are_read_by_key(self):
+        for day in range(1, 13):
+            self.add(self.fuel if day % 2 else self.power, 'daily', 2, day)
+
+        with self.assertNumQueries(2):
+            first, has_prev, has_next = kpi_periods.page('daily', size=5, descending=True)
+        self.assertEqual([record.date for _, record in first], [eth_day(2016, 2, day) for day in range(12, 7, -1)])
+        self.assertEqual((has_prev, has_next), (False, True))
+
+        # the page, its records and whether periods precede the cursor
+        with self.assertNumQueries(3):
+            second, has_prev, _ = kpi_periods.page('daily', after=first[-1][0].key, size=5, descending=True)
+        self.assertEqual([period.number for period, _ in second], [7, 6, 5, 4, 3])
+        self.assertTrue(has_prev)
+
+        odd, has_prev, has_next = kpi_periods.page('daily', [self.fuel.id], size=10)
+        self.assertEqual([period.number for period, _ in odd], [1, 3, 5, 7, 9, 11])
+        self.assertEqual((has_prev, has_next), (False, False))
+
+        # a page number past an empty selection has nothing before it
+        self.assertEqual(kpi_periods.page('daily', [0], size=10, offset=10), ([], False, False))
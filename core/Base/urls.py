@@ -57,6 +57,8 @@ urlpatterns = [
     path('api/indicators-bulk/', api_views.indicators_bulk_api, name='indicators_bulk_api'),
     path('api/kpi-records/weekly/', api_views.kpi_weekly_bulk_api, name='kpi_weekly_bulk_api'),
     path('api/kpi-records/daily/', api_views.kpi_daily_bulk_api, name='kpi_daily_bulk_api'),
+    path('api/cache-stats/', api_views.api_cache_stats, name='api_cache_stats'),
+    path('api/jobs/<uuid:token>/', api_views.job_status_api, name='job_status_api'),
     path('api/acknowledge-seen/', api_views.acknowledge_seen_api, name='acknowledge_seen_api'),
     path('api/dashboard-counts/', api_views.dashboard_counts_api, name='dashboard_counts_api'),
     path('topics/', views.topics_list, name='topics_list'),
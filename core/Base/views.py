@@ -19,6 +19,7 @@ from .models import (
     ProjectInitiatives,
     Content    
 )
+from . import series
 from UserManagement.models import CategoryAssignment
 from UserAdmin.forms import(
     IndicatorForm,
@@ -47,43 +48,29 @@ def indicator_detail_view(request, id):
         except Indicator.DoesNotExist:
             return HttpResponse(404)
 
-        # --- Annual Data (last 10 years) ---
-        annual_data_value = list(
-            AnnualData.objects.filter(indicator=indicator)
-            .order_by('-for_datapoint__year_GC')
-            .values(
-                'id', 'indicator__title_ENG', 'indicator__title_AMH',
-                'indicator__id', 'indicator__parent_id',
-                'for_datapoint__year_EC', 'for_datapoint__year_GC',
-                'performance', 'target'
-            )[:10]
-        )
-
-        # --- Quarterly Data (last 4 quarters) ---
-        quarter_data_value = list(
-            QuarterData.objects.filter(indicator=indicator)
-            .order_by('-for_datapoint__year_GC', '-for_quarter__number')
-            .values(
-                'id', 'indicator__title_ENG', 'indicator__title_AMH',
-                'indicator__id', 'indicator__parent_id',
-                'for_datapoint__year_EC', 'for_datapoint__year_GC',
-                'for_quarter__number',
-                'performance', 'target'
-            )[:4]
-        )
+        # --- Annual, quarterly and monthly data, read from the series blobs ---
+        stored = series.load_all(indicator.id)
+        year_gc_by_ec = dict(DataPoint.objects.values_list('year_EC', 'year_GC'))
 
-        # --- Monthly Data (last 12 months) ---
-        month_data_value = list(
-            MonthData.objects.filter(indicator=indicator)
-            .order_by('-for_datapoint__year_GC', '-for_month__number')
-            .values(
-                'id', 'indicator__title_ENG', 'indicator__title_AMH',
-                'indicator__id', 'indicator__parent_id',
-                'for_datapoint__year_EC', 'for_datapoint__year_GC',
-                'for_month__number',
-                'performance', 'target'
-            )[:12]
-        )
+        def series_values(frequency, count, period_key=None):
+            values = []
+            # newest first; rows without a year come last
+            for row_id, year, period, performance, target, *_ in list(stored[frequency].points())[::-1][:count]:
+                value = {
+                    'id': row_id, 'indicator__title_ENG': indicator.title_ENG, 'indicator__title_AMH': indicator.title_AMH,
+                    'indicator__id': indicator.id, 'indicator__parent_id': indicator.parent_id,
+                    'for_datapoint__year_EC': year, 'for_datapoint__year_GC': year_gc_by_ec.get(year),
+                    'performance': performance, 'target': target,
+                }
+                if period_key:
+                    value[period_key] = period
+                values.append(value)
+            return values
+
+        # last 10 years, 4 quarters and 12 months
+        annual_data_value = series_values('annual', 10)
+        quarter_data_value = series_values('quarterly', 4, 'for_quarter__number')
+        month_data_value = series_values('monthly', 12, 'for_month__number')
 
         # --- Weekly Data (last 7 days, aggregated into weeks) ---
         today = timezone.now().date()
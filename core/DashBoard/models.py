@@ -117,9 +117,9 @@ class DashboardIndicator(models.Model):
     def get_annual_value(self,start_date=None, end_date=None, year=None):
         indicator = self.indicator.all()
         if (start_date and end_date) and not year:
-            annual = AnnualData.objects.filter(indicator__in = indicator ,for_datapoint__year_EC__range=(start_date, end_date))
+            annual = AnnualData.objects.filter(indicator__in = indicator ,for_datapoint__year_EC__range=(start_date, end_date)).order_by('for_datapoint__year_EC')
             return annual
         else:
-            annual = AnnualData.objects.filter(indicator__in = indicator ,for_datapoint__year_EC=year)
+            annual = AnnualData.objects.filter(indicator__in = indicator ,for_datapoint__year_EC=year).order_by('for_datapoint__year_EC')
             return annual   
          
@@ -59,5 +59,6 @@ urlpatterns = [
 
     ######## Audit Log ##########
     path('audit-log/', audit_log_view, name='audit_log_view'),
+    path('audit-log/<int:log_id>/rows/', audit_log_batch_view, name='audit_log_batch_view'),
 
 ]
@@ -13,89 +13,21 @@ from django.shortcuts import render
 from django.db.models import Count, Q, Sum
 from django.utils import timezone
 
+from django.db import transaction
 from django.db.models import Prefetch
 from .serializers import *
+from Base import api_cache, audit, dashboard_stats, series
 
 
 from django.http import JsonResponse
 @login_required
 def dashboard_index(request):
-    # --- 1. Top Level Metrics ---
-    total_indicators = Indicator.objects.count()
-    total_categories = Category.objects.count()
-    total_topics = Topic.objects.count()
-    pending_verifications = Indicator.objects.filter(is_verified=False).count()
-
-    # --- 2. Advanced Stats & Health ---
-    last_entry = MonthData.objects.order_by('-created_at').first()
-    if last_entry:
-        diff = timezone.now() - last_entry.created_at
-        freshness = "Today" if diff.days == 0 else f"{diff.days} Days Ago"
-    else:
-        freshness = "No Data"
-
-    # Stat: Data Completion Gap (Indicators with NO data at all)
-    indicators_with_any_data = AnnualData.objects.values('indicator').distinct().count()
-    data_gap_count = total_indicators - indicators_with_any_data
-    data_gap_percentage = round((data_gap_count / total_indicators * 100), 1) if total_indicators > 0 else 0
-
-    # Stat: Data Composition (Annual vs Quarter vs Month)
-    total_records = AnnualData.objects.count() + QuarterData.objects.count() + MonthData.objects.count()
-    composition = [
-        AnnualData.objects.count(),
-        QuarterData.objects.count(),
-        MonthData.objects.count()
-    ]
-
-    # --- 3. Category Summary (Horizontal Bar Chart) ---
-    categories_data = Category.objects.annotate(
-        indicator_count=Count('indicators')
-    ).order_by('-indicator_count')[:10]
-    
-    cat_names = [c.name_ENG for c in categories_data]
-    cat_counts = [c.indicator_count for c in categories_data]
-
-    # --- 4. Monthly Trend (Line Chart) ---
-    current_year = DataPoint.objects.order_by('-year_EC').first()
-    months_query = Month.objects.all().order_by('number')
-    monthly_performance = []
-    month_labels = []
-    
-    for m in months_query:
-        count = MonthData.objects.filter(for_month=m, for_datapoint=current_year).count()
-        monthly_performance.append(count)
-        month_labels.append(m.month_ENG)
-
-    total_indicators = Indicator.objects.count()
-    verified_indicators = Indicator.objects.filter(is_verified=True).count()
-    
-    # Calculate percentage safely
-    if total_indicators > 0:
-        verification_rate = round((verified_indicators / total_indicators) * 100, 1)
-    else:
-        verification_rate = 0
-
-    context = {
-        'total_topics': total_topics,
-        'total_categories': total_categories,
-        'total_indicators': total_indicators,
-        'pending_verifications': pending_verifications,
-        'freshness': freshness,
-        'data_gap_count': data_gap_count,
-        'data_gap_percentage': data_gap_percentage,
-        'composition': composition,
-        'cat_names': cat_names,
-        'cat_counts': cat_counts,
-        'months': month_labels,
-        'monthly_data': monthly_performance,
+    # Counts, composition, freshness and charts come from one snapshot row (Base.dashboard_stats)
+    context = dashboard_stats.context(dashboard_stats.snapshot())
+    context.update({
         'latest_indicators': Indicator.objects.all().order_by('-created_at')[:5],
-        'current_year': current_year,
-        'all_topics'    : Topic.objects.all(),
-        'total_indicators': total_indicators,
-        'verification_rate': verification_rate, # Pass this directly
-        'total_documents': Document.objects.count(),
-        'total_users': CustomUser.objects.filter(is_active=True).count(),
-    }
+        'all_topics'    : Topic.objects.prefetch_related('categories'),
+    })
 
     return render(request, 'data_management/dashboard.html', context)
 
@@ -495,9 +427,6 @@ from .utils import (
     get_unverified_annual_data,
     get_unverified_quarter_data,
     get_unverified_month_data,
-    get_action_context,
-    get_field_changes_summary,
-    get_related_object_info,
     
 
 )
@@ -527,12 +456,17 @@ def bulk_verify(request, model):
     }
 
     ids = request.POST.getlist("ids")
-
-    model_map[model].objects.filter(
-        id__in=ids
-    ).update(
-        is_verified=True
-    )
+    model_class = model_map[model]
+
+    with transaction.atomic():
+        qs = model_class.objects.filter(id__in=ids)
+        if model_class is not Indicator:
+            # the stored series carry the verified flags; rebuilt on commit
+            series.mark_rows_dirty(qs)
+        qs.update(is_verified=True)
+    api_cache.invalidate(model_class)
+    if model_class is Indicator:
+        dashboard_stats.mark_stale()
 
     return redirect("verification_dashboard")
 
@@ -780,16 +714,11 @@ from django.db.models import Q
 @user_passes_test(lambda u: u.is_staff or u.is_superuser, login_url='/user-management/login/')
 def audit_log_view(request):
     """Display audit log for admin - shows all actions by data importers and category managers"""
-    # Filter to only show actions by data importers and category managers
-    # Use select_related for better performance
-    # Note: We filter by actor to ensure we only show actions by importers/managers
-    # For delete actions, the actor should be captured by AuditlogMiddleware
-    logs = LogEntry.objects.select_related('actor', 'content_type').filter(
-        Q(actor__is_importer=True) | Q(actor__is_category_manager=True)
-    )
-    
-    # Order by most recent first
-    logs = logs.order_by('-timestamp').distinct()
+    # Pages through the audit index (Base.audit), which holds the actor role, model,
+    # indicator and change summary of every entry, so no per-row lookups are needed
+    logs = AuditLogIndex.objects.select_related(
+        'log_entry__actor', 'log_entry__content_type'
+    ).filter(actor_role__in=['importer', 'manager']).order_by('-timestamp')
     
     # Get filter parameters
     action_type = request.GET.get('action', '')
@@ -801,29 +730,28 @@ def audit_log_view(request):
     if action_type:
         logs = logs.filter(action=action_type)
     if user_type == 'importer':
-        logs = logs.filter(actor__is_importer=True)
+        logs = logs.filter(actor_role='importer')
     elif user_type == 'manager':
-        logs = logs.filter(actor__is_category_manager=True)
+        logs = logs.filter(actor_role='manager')
     if user_id:
         logs = logs.filter(actor_id=user_id)
     if model_name:
-        logs = logs.filter(content_type__model=model_name.lower())
+        logs = logs.filter(model=model_name.lower())
     
     # Pagination
     paginator = Paginator(logs, 50)  # Show 50 entries per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Enrich logs with additional context
-    enriched_logs = []
-    for log in page_obj:
-        log_data = {
-            'log': log,
-            'context': get_action_context(log),
-            'field_changes': get_field_changes_summary(log),
-            'related_object': get_related_object_info(log)
+    enriched_logs = [
+        {
+            'log': index.log_entry,
+            'context': audit.action_context(index.model),
+            'field_changes': index.change_summary,
+            'related_object': index.related_object,
         }
-        enriched_logs.append(log_data)
+        for index in page_obj
+    ]
     
     # Get all importers and managers for filter dropdown
     importers = CustomUser.objects.filter(is_importer=True).order_by('email')
@@ -870,6 +798,25 @@ def audit_log_view(request):
     return render(request, 'data_management/audit_log.html', context)
 
 
+@login_required
+@user_passes_test(lambda u: u.is_staff or u.is_superuser, login_url='/user-management/login/')
+def audit_log_batch_view(request, log_id):
+    """Rows of an aggregate audit entry (Base.audit.log_batch), 200 per page"""
+    batch = get_object_or_404(AuditBatch.objects.select_related('log_entry__content_type'), log_entry_id=log_id)
+    page_obj = Paginator(batch.rows(), 200).get_page(request.GET.get('page'))
+    return JsonResponse({
+        'log_id': log_id,
+        'model': batch.log_entry.content_type.model,
+        'row_count': batch.row_count,
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages,
+        'rows': [
+            {'object_pk': object_pk, 'action': action, 'changes': changes}
+            for object_pk, action, changes in page_obj
+        ],
+    })
+
+
 
 
 
@@ -4,6 +4,7 @@ from rest_framework.decorators import api_view
 from django.db.models import Q
 from rest_framework import status
 from django.db.models import Count
+from Base.api_cache import cached_api_response
 from Base.models import (
     Topic,
     Category,
@@ -19,6 +20,7 @@ from DataPortal.serializers import (
 )
 
 @api_view(['GET'])
+@cached_api_response('data_points', depends_on=('Base.DataPoint',))
 def data_points(request):
     if request.method == 'GET':
         data_points = DataPoint.objects.filter().order_by('-year_EC')[:10]
@@ -26,6 +28,7 @@ def data_points(request):
         return Response(serializer.data)
 
 @api_view(['GET'])
+@cached_api_response('topic_lists', depends_on=('Base.Topic', 'Base.Category', 'Base.Indicator'))
 def topic_lists(request):
     if request.method == 'GET':
         topics = Topic.objects.filter(is_dashboard=True , is_initiative=False).annotate(category_count=Count('categories')).select_related()
@@ -34,6 +37,7 @@ def topic_lists(request):
     
 
 @api_view(['GET'])
+@cached_api_response('category_with_indicator')
 def category_with_indicator(request , id=None):
     search = request.GET.get('search')
 
@@ -61,6 +65,7 @@ def category_with_indicator(request , id=None):
 
 
 @api_view(['GET'])
+@cached_api_response('indicator_value')
 def indicator_value(request, id):
     try:
         indicator = Indicator.objects.get(pk = id)
@@ -14,10 +14,11 @@ from DashBoard.models import (
     DashboardIndicator,
     Row,
 )
+from Base import import_staging
 from Base.forms import (ImportFileForm, ImportFileIndicatorAddValueForm)
 from Base.resource import (
     handle_uploaded_Topic_file,
-    confirm_file,
+    confirm_stage,
     handle_uploaded_Category_file,
     handle_uploaded_Indicator_file,
     handle_uploaded_Annual_file,
@@ -55,6 +56,7 @@ from Base.models import (
     ProjectInitiatives,
     SubProject,
 )
+from Base import exports
 import random
 
 from django.db.models import Count
@@ -214,22 +216,16 @@ def data_view(request):
             if form.is_valid():
                 type_of_data = form.cleaned_data['type_of_data']
                 if type_of_data == 'yearly':
-                    request.session['data_import_type'] = 'yearly'
                     success, imported_data,result = handle_uploaded_Annual_file(file = request.FILES['file'])
                 elif type_of_data == 'quarterly':
-                    request.session['data_import_type'] = 'quarterly'
                     success, imported_data, result = handle_uploaded_Quarter_file(file = request.FILES['file'])
                 elif type_of_data == 'monthly':
-                    request.session['data_import_type'] = 'monthly'
                     success, imported_data, result = handle_uploaded_Month_file(file = request.FILES['file'])
 
         
                 if success:
-                    # Convert Dataset to JSON-serializable format
-                    serialized_data = imported_data.dict  # Converts Dataset rows into a list of dictionaries
-        
-                    # Store serialized data in the session
-                    request.session['data_view_imported_data'] = serialized_data
+                    # Stage the parsed rows on disk; only the token goes in the session
+                    import_staging.stage_in_session(request.session, 'data_view_import_stage', imported_data, type_of_data)
         
                     # Provide a preview of the import
                     context = {'result': result}
@@ -239,26 +235,14 @@ def data_view(request):
             else:
                 messages.error(request, '😞 An error occurred while importing the data.')
         elif 'confirm_data_form' in request.POST:
-            # Retrieve serialized data from the session
-            serialized_data = request.session.get('data_view_imported_data', None)
-            type_of_data = request.session.get('data_import_type', None)
-        
-            if serialized_data and type_of_data:
-                # Convert serialized data back to a Dataset object
-                from tablib import Dataset  # Adjust based on your Dataset class
-        
-                imported_data = Dataset()
-                headers = serialized_data[0].keys() if serialized_data else []  # Extract headers from the first row
-                imported_data.headers = headers  # Set headers
-                for row in serialized_data:
-                    imported_data.append(list(row.values()))  # Add rows back to the Dataset
+            stage = import_staging.session_stage(request.session, 'data_view_import_stage')
         
-                # Process the original Dataset
-                success, message = confirm_file(imported_data, type_of_data)
+            if stage:
+                # Import the staged rows chunk by chunk
+                success, message = confirm_stage(stage, actor=request.user)
                 if success:
-                    # Clear session data after successful processing
-                    del request.session['data_view_imported_data']
-                    del request.session['data_import_type']
+                    # Clear the stage after successful processing
+                    import_staging.pop_session_stage(request.session, 'data_view_import_stage')
                     messages.success(request, message)
                 else:
                     messages.error(request, message)
@@ -427,11 +411,8 @@ def topic(request):
                 success, imported_data, result = handle_uploaded_Topic_file(file)
         
                 if success:
-                    # Convert Dataset to JSON-serializable format
-                    serialized_data = imported_data.dict  # Converts Dataset rows into a list of dictionaries
-        
-                    # Store serialized data in the session
-                    request.session['topic_imported_data'] = serialized_data
+                    # Stage the parsed rows on disk; only the token goes in the session
+                    import_staging.stage_in_session(request.session, 'topic_import_stage', imported_data, 'topic')
         
                     # Provide a preview of the import
                     context = {'result': result}
@@ -441,24 +422,14 @@ def topic(request):
             else:
                 messages.error(request, '😞 An error occurred while importing the topic.')
         elif 'confirm_data_form' in request.POST:
-            # Retrieve serialized data from the session
-            serialized_data = request.session.get('topic_imported_data', None)
-        
-            if serialized_data:
-                # Convert serialized data back to a Dataset object
-                from tablib import Dataset  # Adjust based on your Dataset class
-        
-                imported_data = Dataset()
-                headers = serialized_data[0].keys() if serialized_data else []  # Extract headers from the first row
-                imported_data.headers = headers  # Set headers
-                for row in serialized_data:
-                    imported_data.append(list(row.values()))  # Add rows back to the Dataset
-        
-                # Process the original Dataset
-                success, message = confirm_file(imported_data, 'topic')
+            stage = import_staging.session_stage(request.session, 'topic_import_stage')
+            
+            if stage:
+                # Import the staged rows chunk by chunk
+                success, message = confirm_stage(stage, actor=request.user)
                 if success:
-                    # Clear session data after successful processing
-                    del request.session['topic_imported_data']
+                    # Clear the stage after successful processing
+                    import_staging.pop_session_stage(request.session, 'topic_import_stage')
                     messages.success(request, message)
                 else:
                     messages.error(request, message)
@@ -559,11 +530,8 @@ def categories(request):
                 success, imported_data, result = handle_uploaded_Category_file(file)
         
                 if success:
-                    # Convert Dataset to JSON-serializable format
-                    serialized_data = imported_data.dict  # Converts Dataset rows into a list of dictionaries
-        
-                    # Store serialized data in the session
-                    request.session['category_imported_data'] = serialized_data
+                    # Stage the parsed rows on disk; only the token goes in the session
+                    import_staging.stage_in_session(request.session, 'category_import_stage', imported_data, 'category')
         
                     # Provide a preview of the imports
                     context = {'result': result}
@@ -573,24 +541,14 @@ def categories(request):
             else:
                 messages.error(request, '😞 An error occurred while importing the category.')
         elif 'confirm_data_form' in request.POST:
-            # Retrieve serialized data from the session
-            serialized_data = request.session.get('category_imported_data', None)
-        
-            if serialized_data:
-                # Convert serialized data back to a Dataset object
-                from tablib import Dataset  # Adjust based on your Dataset class
-        
-                imported_data = Dataset()
-                headers = serialized_data[0].keys() if serialized_data else []  # Extract headers from the first row
-                imported_data.headers = headers  # Set headers
-                for row in serialized_data:
-                    imported_data.append(list(row.values()))  # Add rows back to the Dataset
-        
-                # Process the original Dataset
-                success, message = confirm_file(imported_data, 'category')
+            stage = import_staging.session_stage(request.session, 'category_import_stage')
+            
+            if stage:
+                # Import the staged rows chunk by chunk
+                success, message = confirm_stage(stage, actor=request.user)
                 if success:
-                    # Clear session data after successful processing
-                    del request.session['category_imported_data']
+                    # Clear the stage after successful processing
+                    import_staging.pop_session_stage(request.session, 'category_import_stage')
                     messages.success(request, message)
                 else:
                     messages.error(request, message)
@@ -752,11 +710,8 @@ def all_indicators(request):
                     success, imported_data, result = handle_uploaded_Indicator_file(file)
             
                     if success:
-                        # Convert Dataset to JSON-serializable format
-                        serialized_data = imported_data.dict  # Converts Dataset rows into a list of dictionaries
-            
-                        # Store serialized data in the session
-                        request.session['indicator_imported_data'] = serialized_data
+                        # Stage the parsed rows on disk; only the token goes in the session
+                        import_staging.stage_in_session(request.session, 'indicator_import_stage', imported_data, 'indicator')
             
                         # Provide a preview of the import
                         context = {'result': result}
@@ -766,24 +721,14 @@ def all_indicators(request):
                 else:
                     messages.error(request, '😞 An error occurred while importing the indicator.')
             elif 'confirm_data_form' in request.POST:
-                # Retrieve serialized data from the session
-                serialized_data = request.session.get('indicator_imported_data', None)
-            
-                if serialized_data:
-                    # Convert serialized data back to a Dataset object
-                    from tablib import Dataset  # Adjust based on your Dataset class
-            
-                    imported_data = Dataset()
-                    headers = serialized_data[0].keys() if serialized_data else []  # Extract headers from the first row
-                    imported_data.headers = headers  # Set headers
-                    for row in serialized_data:
-                        imported_data.append(list(row.values()))  # Add rows back to the Dataset
-            
-                    # Process the original Dataset
-                    success, message = confirm_file(imported_data, 'indicator')
+                stage = import_staging.session_stage(request.session, 'indicator_import_stage')
+                
+                if stage:
+                    # Import the staged rows chunk by chunk
+                    success, message = confirm_stage(stage, actor=request.user)
                     if success:
-                        # Clear session data after successful processing
-                        del request.session['indicator_imported_data']
+                        # Clear the stage after successful processing
+                        import_staging.pop_session_stage(request.session, 'indicator_import_stage')
                         messages.success(request, message)
                     else:
                         messages.error(request, message)
@@ -1557,11 +1502,7 @@ def delete_sub_project(request, id):
 @login_required(login_url='login')
 @login_required(login_url='login')
 def export_topic(request):
-    topic = TopicResource()
-    dataset = topic.export()
-    response = HttpResponse(dataset.xlsx, content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="topic.xlsx"'
-    return response
+    return exports.export_response(TopicResource(), filename='topic', content_type='application/vnd.ms-excel')
 
 
 
@@ -1569,20 +1510,12 @@ def export_topic(request):
 
 @login_required(login_url='login')
 def export_category(request):
-    category = CategoryResource()
-    dataset = category.export()
-    response = HttpResponse(dataset.xlsx, content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="category.xlsx"'
-    return response
+    return exports.export_response(CategoryResource(), filename='category', content_type='application/vnd.ms-excel')
 
 
 @login_required(login_url='login')
 def export_indicator(request):
-    indicator = IndicatorResource()
-    dataset = indicator.export()
-    response = HttpResponse(dataset.xlsx, content_type='application/vnd.ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="indicator.xlsx"'
-    return response
+    return exports.export_response(IndicatorResource(), filename='indicator', content_type='application/vnd.ms-excel')
 
 
 
@@ -14,9 +14,13 @@ from ..serializers import (
     IndicatorSubmissionSerializer, DataSubmissionSerializer,
     UserManagementStatsSerializer, UnassignedCategorySerializer
 )
-from ethiopian_date_converter.ethiopian_date_convertor import to_ethiopian, to_gregorian, EthDate
+from Base import job_queue, kpi_periods
+from Base.serializer import JobSerializer
 import secrets
 from ..models import CustomUser as UM_CustomUser
+from .. import approvals
+from ..importer import DataSubmissionImporter
+from ..row_source import RowSource
 import csv
 import os
 from django.http import HttpResponse
@@ -26,8 +30,6 @@ try:
 except Exception:
     openpyxl = None
 
-from io import TextIOWrapper
-
 from rest_framework.views import APIView
 
 
@@ -554,25 +556,17 @@ def approve_all_submissions_api(request):
                 Q(indicator__for_category__in=assigned_categories)
             ).distinct()
 
-    count = submissions.count()
-    for submission in submissions:
-        submission.status = 'approved'
-        submission.verified_by = request.user
-        submission.verified_at = timezone.now()
-        submission.save()
-        
-        if submission_type == 'indicator' and submission.indicator:
-            try:
-                ind = submission.indicator
-                ind.is_verified = True
-                ind.save(update_fields=['is_verified'])
-            except: pass
-        elif submission_type == 'data':
-            try:
-                _import_data_submission_to_db(submission)
-            except: pass
-            
-    return Response({'message': f'Successfully approved {count} {submission_type} submissions.'})
+    # one UPDATE for the submissions (and their indicators)
+    approved_ids = approvals.approve_submissions(submissions, request.user)
+    count = len(approved_ids)
+
+    out = {'message': f'Successfully approved {count} {submission_type} submissions.'}
+    if submission_type == 'data' and approved_ids:
+        # the files are imported by the job worker
+        job = job_queue.enqueue('import_data_submissions', {'submission_ids': approved_ids}, user=request.user)
+        out['message'] += ' Their data is being imported in the background.'
+        out['job'] = JobSerializer(job).data
+    return Response(out)
 
 
 @api_view(['POST'])
@@ -605,341 +599,28 @@ def approve_submission_api(request):
     if submission_type == 'indicator':
         serializer = IndicatorSubmissionSerializer(submission)
     else:
-        # attempt to import data into DB when a data submission is approved
-        import_result = None
-        try:
-            import_result = _import_data_submission_to_db(submission)
-        except Exception as e:
-            # don't fail the approval if import fails; include error in response
-            import_result = {'error': str(e)}
+        # the file is imported by the job worker; the import result is
+        # reported on the job (see Base.job_queue)
+        job = job_queue.enqueue('import_data_submissions', {'submission_ids': [submission.id]}, user=request.user)
         serializer = DataSubmissionSerializer(submission)
     
     out = serializer.data
     if submission_type == 'data':
         # keep serialized submission fields at top-level for backwards compatibility
-        # and attach import_result as an extra key
+        # and attach the import job as an extra key; the import result that
+        # used to be returned here is the job's result once it has run
         try:
             out = dict(serializer.data)
         except Exception:
             out = serializer.data
-        out['import_result'] = import_result
+        out['job'] = JobSerializer(job).data
     return Response(out)
 
 
 def _import_data_submission_to_db(submission: DataSubmission):
+    """Import an approved submission file; see DataSubmissionImporter for the stages."""
 
-
-    result = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
-
-    # ensure file path is available
-    ffield = submission.data_file
-    if not ffield:
-        raise ValueError('No uploaded file attached to submission')
-
-    file_path = ffield.path if hasattr(ffield, 'path') else None
-    if not file_path or not os.path.exists(file_path):
-        raise ValueError('Uploaded file not found on disk')
-
-    # helper to parse rows from CSV or Excel
-    def iter_rows_from_file(path):
-        lower = path.lower()
-        if lower.endswith('.csv'):
-            with open(path, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for r in reader:
-                    yield r
-        elif lower.endswith(('.xls', '.xlsx')):
-            if not openpyxl:
-                raise RuntimeError('openpyxl required to parse Excel files but is not installed')
-            wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
-            ws = wb.active
-            rows = list(ws.rows)
-            if not rows:
-                return
-            headers = [str(c.value).strip() if c.value is not None else '' for c in rows[0]]
-            for row in rows[1:]:
-                obj = {}
-                for h, cell in zip(headers, row):
-                    obj[h] = cell.value
-                yield obj
-        else:
-            raise RuntimeError('Unsupported file type')
-
-    # indicator identification
-    submission_indicator = submission.indicator
-    indicator_code = (submission_indicator.code or '').strip().lower() if submission_indicator else None
-
-    # parse and import
-    for i, raw in enumerate(iter_rows_from_file(file_path), start=1):
-        try:
-            # normalize keys to lowercase
-            row = { (k or '').strip().lower(): (v if v is not None else '') for k,v in raw.items() }
-
-            # Determine which indicator this row belongs to
-            row_indicator_code = (row.get('indicator') or '').strip().lower()
-            
-            target_indicator = None
-            if submission_indicator:
-                # Single mode: only import rows matching the submission's indicator
-                if row_indicator_code and indicator_code and row_indicator_code != indicator_code:
-                    continue
-                target_indicator = submission_indicator
-            else:
-                # Bulk mode (Multiple mode): look up indicator from row
-                if not row_indicator_code:
-                    # Skip rows with no indicator in bulk mode
-                    continue
-                try:
-                    target_indicator = Indicator.objects.get(code__iexact=row_indicator_code)
-                except Indicator.DoesNotExist:
-                    result['skipped'] += 1
-                    result['errors'].append({'row': i, 'error': f'Unknown indicator code: {row_indicator_code}'})
-                    continue
-
-            # Check if it's "Wide" format
-            is_annual_wide = False
-            year_cols = []
-            for k in row.keys():
-                if k.isdigit() and len(k) == 4:
-                    year_cols.append(k)
-            if year_cols:
-                is_annual_wide = True
-
-            is_period_wide = ('for_datapoint' in row) and ('for_quarter' in row or 'for_month' in row)
-            
-            if is_annual_wide:
-                # Wide format (Annual only - years as columns)
-                for year_str in year_cols:
-                    perf_raw = row.get(year_str)
-                    if perf_raw in (None, ''):
-                        continue
-                    try:
-                        performance = float(perf_raw)
-                        datapoint, _ = DataPoint.objects.get_or_create(year_EC=year_str)
-                        obj, created = AnnualData.objects.update_or_create(
-                            indicator=target_indicator,
-                            for_datapoint=datapoint,
-                            defaults={'performance': performance, 'is_verified': True}
-                        )
-                        if created: result['created'] += 1
-                        else: result['updated'] += 1
-                    except Exception as e:
-                        result['errors'].append({'row': i, 'error': f'Invalid value for {year_str}: {perf_raw}'})
-                continue
-
-            if is_period_wide:
-                # Wide-indicator format: for_datapoint, for_quarter/for_month, IND1, IND2...
-                year_raw = (row.get('for_datapoint') or '').strip()
-                if not year_raw:
-                    continue
-                
-                datapoint, _ = DataPoint.objects.get_or_create(year_EC=str(year_raw))
-                
-                # Identify period
-                quarter_num = None
-                month_num = None
-                if 'for_quarter' in row and row.get('for_quarter') != '':
-                    try: quarter_num = int(row.get('for_quarter'))
-                    except: pass
-                if 'for_month' in row and row.get('for_month') != '':
-                    try: month_num = int(row.get('for_month'))
-                    except: pass
-                
-                # Identify indicator columns (all except control columns)
-                control_cols = ['for_datapoint', 'for_quarter', 'for_month', 'indicator', 'title_eng', 'title_amh']
-                for col_name, val in row.items():
-                    if col_name in control_cols or val in (None, ''):
-                        continue
-                    
-                    # Match indicator by code or title
-                    ind_obj = Indicator.objects.filter(code__iexact=col_name).first()
-                    if not ind_obj:
-                        ind_obj = Indicator.objects.filter(title_ENG__iexact=col_name).first()
-                    
-                    if not ind_obj:
-                        continue
-                    
-                    try:
-                        performance = float(val)
-                        if quarter_num:
-                            q_obj, _ = Quarter.objects.get_or_create(number=quarter_num, defaults={'title_ENG': f'Q{quarter_num}', 'title_AMH': f'Q{quarter_num}'})
-                            obj, created = QuarterData.objects.update_or_create(
-                                indicator=ind_obj,
-                                for_datapoint=datapoint,
-                                for_quarter=q_obj,
-                                defaults={'performance': performance, 'is_verified': True}
-                            )
-                        elif month_num:
-                            m_obj = Month.objects.filter(number=month_num).first()
-                            if not m_obj:
-                                m_obj = Month.objects.create(number=month_num, month_ENG=str(month_num), month_AMH=str(month_num))
-                            obj, created = MonthData.objects.update_or_create(
-                                indicator=ind_obj,
-                                for_datapoint=datapoint,
-                                for_month=m_obj,
-                                defaults={'performance': performance, 'is_verified': True}
-                            )
-                        else:
-                            # Assume annual if neither quarter nor month
-                            obj, created = AnnualData.objects.update_or_create(
-                                indicator=ind_obj,
-                                for_datapoint=datapoint,
-                                defaults={'performance': performance, 'is_verified': True}
-                            )
-                        
-                        if created: result['created'] += 1
-                        else: result['updated'] += 1
-                    except Exception as e:
-                        result['errors'].append({'row': i, 'error': f'Invalid value for indicator {col_name}: {val}'})
-                continue
-
-            # Long format (continues below)
-            year = row.get('year_ec') or row.get('year_gc')
-            if not year:
-                result['skipped'] += 1
-                result['errors'].append({'row': i, 'error': 'Missing year_EC/year_GC or year-columns'})
-                continue
-
-            # performance
-            perf_raw = row.get('performance') or row.get('value') or row.get('amount')
-            if perf_raw in (None, ''):
-                result['skipped'] += 1
-                result['errors'].append({'row': i, 'error': 'Missing performance/value'})
-                continue
-            try:
-                performance = float(perf_raw)
-            except Exception:
-                result['skipped'] += 1
-                result['errors'].append({'row': i, 'error': f'Invalid performance value: {perf_raw}'})
-                continue
-
-            # find or create datapoint by year_EC (prefer)
-            year_ec = row.get('year_ec') or None
-            if not year_ec and row.get('year_gc'):
-                try:
-                    year_ec = str(int(row.get('year_gc')) - 7)
-                except Exception:
-                    year_ec = None
-
-            if year_ec:
-                datapoint, _ = DataPoint.objects.get_or_create(year_EC=str(year_ec))
-            else:
-                datapoint, _ = DataPoint.objects.get_or_create(year_EC=str(year))
-
-            # frequency
-            if 'month' in row and row.get('month') != '':
-                mraw = str(row.get('month')).strip()
-                month_obj = None
-                try:
-                    mnum = int(mraw)
-                    month_obj = Month.objects.filter(number=mnum).first()
-                except Exception:
-                    month_obj = Month.objects.filter(month_ENG__iexact=mraw).first()
-                if not month_obj:
-                    try:
-                        if mraw.isdigit():
-                            month_obj = Month.objects.create(number=int(mraw), month_ENG=str(mraw), month_AMH=str(mraw))
-                        else:
-                            raise ValueError('Unknown month')
-                    except Exception:
-                        result['skipped'] += 1
-                        result['errors'].append({'row': i, 'error': f'Invalid month: {mraw}'})
-                        continue
-
-                obj, created = MonthData.objects.update_or_create(
-                    indicator=target_indicator,
-                    for_datapoint=datapoint,
-                    for_month=month_obj,
-                    defaults={'performance': performance, 'is_verified': True}
-                )
-                if created: result['created'] += 1
-                else: result['updated'] += 1
-                continue
-
-            # daily
-            if 'day' in row and row.get('day') != '':
-                mraw = str(row.get('month')).strip()
-                draw = str(row.get('day')).strip()
-                try:
-                    month = int(mraw)
-                    day = int(draw)
-                    # Convert to Gregorian
-                    eth_date = EthDate(day, month, int(year_ec))
-                    greg_date = to_gregorian(eth_date)
-                    
-                    obj, created = KPIRecord.objects.update_or_create(
-                        indicator=target_indicator,
-                        date=greg_date,
-                        record_type='daily',
-                        defaults={'performance': performance, 'is_verified': True}
-                    )
-                    if created: result['created'] += 1
-                    else: result['updated'] += 1
-                    continue
-                except Exception as e:
-                    result['skipped'] += 1
-                    result['errors'].append({'row': i, 'error': f'Invalid daily date: {e}'})
-                    continue
-
-            # weekly
-            if 'week' in row and row.get('week') != '':
-                mraw = str(row.get('month')).strip()
-                wraw = str(row.get('week')).strip()
-                try:
-                    month = int(mraw)
-                    week = int(wraw)
-                    # Following resource.py logic: day = (week-1)*7 + 1
-                    day = ((week - 1) * 7) + 1
-                    eth_date = EthDate(day, month, int(year_ec))
-                    greg_date = to_gregorian(eth_date)
-                    
-                    obj, created = KPIRecord.objects.update_or_create(
-                        indicator=target_indicator,
-                        date=greg_date,
-                        record_type='weekly',
-                        defaults={'performance': performance, 'is_verified': True}
-                    )
-                    if created: result['created'] += 1
-                    else: result['updated'] += 1
-                    continue
-                except Exception as e:
-                    result['skipped'] += 1
-                    result['errors'].append({'row': i, 'error': f'Invalid weekly date: {e}'})
-                    continue
-
-            if 'quarter' in row and row.get('quarter') != '':
-                qraw = row.get('quarter')
-                try:
-                    qnum = int(qraw)
-                except Exception:
-                    result['skipped'] += 1
-                    result['errors'].append({'row': i, 'error': f'Invalid quarter: {qraw}'})
-                    continue
-                quarter_obj, _ = Quarter.objects.get_or_create(number=qnum, defaults={'title_ENG': f'Q{qnum}', 'title_AMH': f'Q{qnum}'})
-                obj, created = QuarterData.objects.update_or_create(
-                    indicator=target_indicator,
-                    for_datapoint=datapoint,
-                    for_quarter=quarter_obj,
-                    defaults={'performance': performance, 'is_verified': True}
-                )
-                if created: result['created'] += 1
-                else: result['updated'] += 1
-                continue
-
-            # else assume annual
-            obj, created = AnnualData.objects.update_or_create(
-                indicator=target_indicator,
-                for_datapoint=datapoint,
-                defaults={'performance': performance, 'is_verified': True}
-            )
-            if created: result['created'] += 1
-            else: result['updated'] += 1
-
-        except Exception as e:
-            result['skipped'] += 1
-            result['errors'].append({'row': i, 'error': str(e)})
-
-    return result
+    return DataSubmissionImporter(submission).run(approvals.submission_rows(submission))
 
 
 @api_view(['POST'])
@@ -953,40 +634,8 @@ def submit_bulk_data_api(request):
         return Response({'error': 'data_file is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        # Read rows from uploaded file (CSV or Excel)
-        filename = (getattr(data_file, 'name', '') or '').lower()
-        _, ext = os.path.splitext(filename)
-        ext = ext.lower()
-
-        def iter_rows_from_upload(fobj, extension):
-            if extension == '.csv':
-                # Read entire stream as text and parse via DictReader
-                content = fobj.read()
-                if isinstance(content, bytes):
-                    text = content.decode('utf-8', errors='replace')
-                else:
-                    text = str(content)
-                lines = text.splitlines()
-                reader = csv.DictReader(lines)
-                for r in reader:
-                    yield r
-            elif extension in ('.xls', '.xlsx'):
-                if not openpyxl:
-                    raise RuntimeError('Excel import requires openpyxl on the server. Please install openpyxl.')
-                fobj.seek(0)
-                wb = openpyxl.load_workbook(fobj, read_only=True, data_only=True)
-                ws = wb.active
-                rows = list(ws.rows)
-                if not rows:
-                    return
-                headers = [str(c.value).strip() if c.value is not None else '' for c in rows[0]]
-                for row in rows[1:]:
-                    obj = {}
-                    for h, cell in zip(headers, row):
-                        obj[h] = cell.value
-                    yield obj
-            else:
-                raise RuntimeError('Unsupported file type. Accepts .csv, .xls, .xlsx')
+        # Rows are read lazily from the uploaded file (CSV or Excel)
+        rows = RowSource(data_file, errors='replace')
 
         result = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
         selected_indicator_ids = request.data.getlist('indicator_ids[]') or request.data.getlist('indicator_ids')
@@ -995,7 +644,7 @@ def submit_bulk_data_api(request):
             allowed_indicator_codes = list(Indicator.objects.filter(id__in=selected_indicator_ids).values_list('code', flat=True))
 
         processed_indicators = set()
-        for i, raw in enumerate(iter_rows_from_upload(data_file, ext), start=1):
+        for i, raw in enumerate(rows, start=1):
             try:
                 row = { (str(k) or '').strip().lower(): v for k,v in raw.items() }
                 
@@ -1439,15 +1088,11 @@ def submit_data_api(request):
             if not openpyxl:
                 return Response({'error': 'Excel import requires openpyxl on the server. Please install openpyxl.'}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                data_file.seek(0)
-                wb = openpyxl.load_workbook(data_file, read_only=True, data_only=True)
-                ws = wb.active
                 # read header row only
-                header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), None)
+                header_row = RowSource(data_file).headers()
                 if not header_row:
                     return Response({'error': 'Excel file appears empty or malformed (no header found).'}, status=status.HTTP_400_BAD_REQUEST)
-                cols = [ (str(c).strip() if c is not None else '') for c in header_row ]
-                if not _check_columns(cols):
+                if not _check_columns(header_row):
                     return Response({'error': 'Excel missing required columns. Required: year_EC/year_GC and performance/value/amount (case-insensitive).'}, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
                 return Response({'error': 'Failed to inspect Excel file header: ' + str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -1509,17 +1154,18 @@ def preview_existing_submission_api(request, submission_id: int):
     }, status=status.HTTP_200_OK)
 
 
-def _preview_csv_file(file_field, max_rows: int = 20):
+def _preview_rows(file_field, max_rows):
+    """Stringified first ``max_rows`` rows of an uploaded file; stops reading after them."""
     file_field.open('rb')
-    wrapper = TextIOWrapper(file_field, encoding='utf-8', errors='replace')
-    reader = csv.DictReader(wrapper)
-    out = []
-    for i, row in enumerate(reader):
-        if i >= max_rows:
-            break
-        out.append({str(k): ('' if v is None else str(v)) for k, v in row.items()})
-    file_field.close()
-    return out
+    try:
+        rows = RowSource(file_field, errors='replace').head(max_rows)
+    finally:
+        file_field.close()
+    return [{str(k): ('' if v is None else str(v)) for k, v in row.items()} for row in rows]
+
+
+def _preview_csv_file(file_field, max_rows: int = 20):
+    return _preview_rows(file_field, max_rows)
 
 
 @api_view(['POST'])
@@ -1580,22 +1226,7 @@ def preview_data_submission_api(request):
 
 
 def _preview_excel_file(file_field, max_rows: int = 20):
-    file_field.open('rb')
-    wb = openpyxl.load_workbook(file_field, read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.rows)
-    if not rows:
-        return []
-
-    headers = [str(c.value).strip() if c.value is not None else '' for c in rows[0]]
-    out = []
-    for row in rows[1:max_rows + 1]:
-        obj = {}
-        for h, cell in zip(headers, row):
-            obj[h] = '' if cell.value is None else str(cell.value)
-        out.append(obj)
-    file_field.close()
-    return out
+    return _preview_rows(file_field, max_rows)
 
 
 class AnnualSidebarList(APIView):
@@ -1620,13 +1251,15 @@ class AnnualSidebarList(APIView):
         base = request.build_absolute_uri(request.path)
         if (start + self.PAGE_SIZE) < total:
             next_url = f"{base}?page={page+1}"
-        if page > 1 and total > 0:
+        # like has_next, from the rows around the page: some precede it
+        has_prev = min(start, total) > 0
+        if has_prev:
             prev_url = f"{base}?page={page-1}"
 
         return Response({
             "results": payload,
             "has_next": (start + self.PAGE_SIZE) < total,
-            "has_prev": page > 1 and total > 0,
+            "has_prev": has_prev,
             "page": page,
             "total": total,
             "total_pages": total_pages,
@@ -1664,15 +1297,17 @@ class QuarterlySidebarList(APIView):
                     "quarter_number": quarter['number'],
                 })
 
+        # one year per page: earlier pages exist when a year precedes this one
+        has_prev = min(idx, total_years) > 0
         return Response({
             "results": payload,
             "has_next": page < total_years,
-            "has_prev": page > 1,
+            "has_prev": has_prev,
             "page": page,
             "total": total_years,
             "total_pages": total_years,
             "next": (request.build_absolute_uri(request.path) + f"?page={page+1}") if page < total_years else None,
-            "previous": (request.build_absolute_uri(request.path) + f"?page={page-1}") if page > 1 else None,
+            "previous": (request.build_absolute_uri(request.path) + f"?page={page-1}") if has_prev else None,
         })
 
     def _get_quarters(self):
@@ -1714,15 +1349,17 @@ class MonthlySidebarList(APIView):
                     "month_number": month['number'],
                 })
 
+        # one year per page: earlier pages exist when a year precedes this one
+        has_prev = min(idx, total_years) > 0
         return Response({
             "results": payload,
             "has_next": page < total_years,
-            "has_prev": page > 1,
+            "has_prev": has_prev,
             "page": page,
             "total": total_years,
             "total_pages": total_years,
             "next": (request.build_absolute_uri(request.path) + f"?page={page+1}") if page < total_years else None,
-            "previous": (request.build_absolute_uri(request.path) + f"?page={page-1}") if page > 1 else None,
+            "previous": (request.build_absolute_uri(request.path) + f"?page={page-1}") if has_prev else None,
         })
 
     def _get_months(self):
@@ -1738,116 +1375,87 @@ class MonthlySidebarList(APIView):
         return [{"number": i, "month_ENG": f"Month {i}", "month_AMH": f"Month {i}"} for i in range(1, 13)]
 
 
-class WeeklySidebarList(APIView):
-    PAGE_SIZE = 5  # show 5 weeks per page
+def sidebar_page(request, frequency, page_size, descending):
+    """
+    One page of the weekly/daily sidebar from the KPI period catalog.
 
-    def get(self, request):
+    ``cursor`` is the ``next_cursor`` of the previous page; the page is then
+    read with a keyset query and costs the same however deep it is.
+    Without a cursor ``page`` is used as before, and the totals are only
+    counted for those page-numbered requests.
+    """
+    try:
         page = max(int(request.GET.get("page", 1)), 1)
-        # Filter dates only for selected indicators if provided
-        indicator_ids = request.GET.get('ids', '').split(',')
-        indicator_ids = [i for i in indicator_ids if i.strip()]
+        cursor = request.GET.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return None, Response({'error': 'Invalid page or cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+    # Filter dates only for selected indicators if provided
+    indicator_ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.strip().isdigit()]
+
+    offset = 0 if cursor is not None else (page - 1) * page_size
+    items, has_prev, has_next = kpi_periods.page(
+        frequency, indicator_ids, after=cursor, size=page_size, descending=descending, offset=offset,
+    )
+    meta = {
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "page": page,
+        "next_cursor": items[-1][0].key if items and has_next else None,
+    }
+    if cursor is None:
+        total = kpi_periods.periods(frequency, indicator_ids).count()
+        meta["total"] = total
+        meta["total_pages"] = (total + page_size - 1) // page_size
+    return items, meta
 
-        unique_dates_qs = KPIRecord.objects.filter(record_type='weekly', indicator__for_category__topic__is_initiative=False)
-        if indicator_ids:
-            unique_dates_qs = unique_dates_qs.filter(indicator_id__in=indicator_ids)
-        
-        unique_dates = unique_dates_qs.order_by('date').values_list('date', flat=True).distinct()
-
-        seen_weeks = set()
-        unique_week_items = []
-
-        # Helper to calculate week grouping key
-        def get_ethio_week_key(greg_date):
-            gregorian_date = EthDate(greg_date.day, greg_date.month, greg_date.year)
-            eth_date = to_ethiopian(gregorian_date)
-            week = ((eth_date.day - 1) // 7) + 1
-            week = min(week, 5)
-            return (eth_date.year, eth_date.month, week)
-
-        for d in unique_dates:
-            key = get_ethio_week_key(d)
-            if key not in seen_weeks:
-                seen_weeks.add(key)
-                unique_week_items.append({
-                    'date': d,
-                    'year_ec': key[0],
-                    'month_ec': key[1],
-                    'week_ec': key[2]
-                })
 
-        total = len(unique_week_items)
-        start = (page - 1) * self.PAGE_SIZE
-        page_items = unique_week_items[start:start + self.PAGE_SIZE]
+class WeeklySidebarList(APIView):
+    PAGE_SIZE = 5  # show 5 weeks per page
 
+    def get(self, request):
+        items, meta = sidebar_page(request, 'weekly', self.PAGE_SIZE, descending=False)
+        if items is None:
+            return meta
+
+        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                       'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
         # Format for payload
         payload = []
-        for item in page_items:
-            rec_qs = KPIRecord.objects.filter(record_type='weekly', date=item['date'], indicator__for_category__topic__is_initiative=False)
-            if indicator_ids:
-                rec_qs = rec_qs.filter(indicator_id__in=indicator_ids)
-            rec = rec_qs.first()
-            if not rec:
-                continue
+        for period, rec in items:
+            # the first date of the week with data
+            month_name = month_names[rec.date.month - 1]
 
-            month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            # item['date'] is a date object
-            month_gc_idx = item['date'].month - 1
-            month_name = month_names[month_gc_idx]
-            
             # Format: "Week X (Month) - Year" (Using GC Year to match Month Name)
-            label = f"Week {item['week_ec']} ({month_name}) - {item['date'].year}"
+            label = f"Week {period.number} ({month_name}) - {rec.date.year}"
 
             payload.append({
                 "id": rec.id,
-                "date": item['date'].isoformat(),
-                "ethio_date": rec.ethio_date, # Should match our calc
-                "week": item['week_ec'],
-                "month_number": item['month_ec'],
+                "date": rec.date.isoformat(),
+                "ethio_date": rec.ethio_date,
+                "week": period.number,
+                "month_number": period.eth_month,
                 "month_name": month_name,
                 "label": label,
-                "year_ec": item['year_ec'],
-                "year_gc": f"{item['date'].year}",
+                "year_ec": period.eth_year,
+                "year_gc": f"{rec.date.year}",
             })
 
-        return Response({
-            "results": payload,
-            "has_next": (start + self.PAGE_SIZE) < total,
-            "has_prev": page > 1,
-            "page": page,
-            "total": total,
-            "total_pages": (total + self.PAGE_SIZE - 1) // self.PAGE_SIZE,
-        })
+        return Response({"results": payload, **meta})
 
 
 class DailySidebarList(APIView):
     PAGE_SIZE = 10  # show 10 days per page
 
     def get(self, request):
-        page = max(int(request.GET.get("page", 1)), 1)
-        # Filter dates only for selected indicators if provided
-        indicator_ids = request.GET.get('ids', '').split(',')
-        indicator_ids = [i for i in indicator_ids if i.strip()]
-
-        # Get all daily KPI records ordered by date (most recent first)
-        qs = KPIRecord.objects.filter(record_type='daily', indicator__for_category__topic__is_initiative=False)
-        if indicator_ids:
-            qs = qs.filter(indicator_id__in=indicator_ids)
-        
-        unique_dates = list(qs.order_by('-date').values_list('date', flat=True).distinct())
-        total = len(unique_dates)
-
-        start = (page - 1) * self.PAGE_SIZE
-        page_dates = unique_dates[start:start + self.PAGE_SIZE]
-        slice_items = []
-        for d in page_dates:
-            rec = qs.filter(date=d).first()
-            if rec:
-                slice_items.append(rec)
+        # most recent day first
+        items, meta = sidebar_page(request, 'daily', self.PAGE_SIZE, descending=True)
+        if items is None:
+            return meta
 
         # Format each daily record for sidebar
         payload = []
-        for r in slice_items:
+        for _, r in items:
             # Format Gregorian date
             greg_date_str = r.date.strftime("%b %d, %Y")  # e.g., "Dec 04, 2024"
             
@@ -1864,14 +1472,7 @@ class DailySidebarList(APIView):
                 "target": float(r.target) if r.target else None,
             })
 
-        return Response({
-            "results": payload,
-            "has_next": (start + self.PAGE_SIZE) < total,
-            "has_prev": page > 1,
-            "page": page,
-            "total": total,
-            "total_pages": (total + self.PAGE_SIZE - 1) // self.PAGE_SIZE,
-        })
+        return Response({"results": payload, **meta})
 
 # Category Assignments
 
@@ -2037,7 +1638,7 @@ def review_pending_data(request):
         assigned_categories = list(CategoryAssignment.objects.filter(manager=request.user, category__topic__is_initiative=False).values_list('category_id', flat=True))
 
     # 1. Annual Data
-    annuals = AnnualData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_datapoint')
+    annuals = AnnualData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_datapoint').order_by('for_datapoint__year_EC')
     if not request.user.is_superuser:
         annuals = annuals.filter(indicator__for_category__in=assigned_categories).distinct()
     
@@ -2051,7 +1652,7 @@ def review_pending_data(request):
         })
 
     # 2. Quarterly Data
-    quarters = QuarterData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_quarter', 'for_datapoint')
+    quarters = QuarterData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_quarter', 'for_datapoint').order_by('for_datapoint__year_EC', 'for_quarter__number')
     if not request.user.is_superuser:
         quarters = quarters.filter(indicator__for_category__in=assigned_categories).distinct()
 
@@ -2067,7 +1668,7 @@ def review_pending_data(request):
         })
 
     # 3. Monthly Data
-    months = MonthData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_month', 'for_datapoint')
+    months = MonthData.objects.filter(is_verified=False, indicator__for_category__topic__is_initiative=False).select_related('indicator', 'for_month', 'for_datapoint').order_by('for_datapoint__year_EC', 'for_month__number')
     if not request.user.is_superuser:
         months = months.filter(indicator__for_category__in=assigned_categories).distinct()
 
@@ -2179,20 +1780,8 @@ def approve_all_table_data_api(request):
         return Response({'error': 'Unauthorized'}, status=403)
     
     try:
-        q_filter = Q(is_verified=False)
-        if not request.user.is_superuser:
-            assigned_categories = CategoryAssignment.objects.filter(manager=request.user, category__topic__is_initiative=False).values_list('category_id', flat=True)
-            q_filter &= Q(indicator__for_category__in=assigned_categories)
-        
-        q_filter &= Q(indicator__for_category__topic__is_initiative=False)
-
-        AnnualData.objects.filter(q_filter).update(is_verified=True, is_seen=True)
-        QuarterData.objects.filter(q_filter).update(is_verified=True, is_seen=True)
-        MonthData.objects.filter(q_filter).update(is_verified=True, is_seen=True)
-        # KPIRecord filter doesn't support indicator__for_category directly in the same way if indicator is null, 
-        # but we follow the same pattern
-        KPIRecord.objects.filter(q_filter).update(is_verified=True, is_seen=True)
-
-        return Response({'status': 'success', 'message': 'All pending table data approved'})
+        # one UPDATE per table, scoped by the manager's categories
+        approved = approvals.verify_pending_rows(request.user)
+        return Response({'status': 'success', 'message': 'All pending table data approved', 'approved': approved})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
\ No newline at end of file
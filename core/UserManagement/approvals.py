@@ -0,0 +1,123 @@
+"""
+Set-based approval of pending submissions and data rows.
+
+Approving everything a manager can see used to save every submission and
+every row one at a time. Here each table is verified with one UPDATE
+scoped by the manager's CategoryAssignment categories, the audit entries
+are written in batches (Base.audit), and the files of approved data
+submissions are imported together as one upsert
+(DataSubmissionImporter.run_batch).
+"""
+import os
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from Base import api_cache, audit, dashboard_stats, series
+from Base.models import AnnualData, Indicator, KPIRecord, MonthData, QuarterData
+from .importer import DataSubmissionImporter
+from .models import CategoryAssignment
+from .row_source import RowSource
+
+
+VERIFIED_MODELS = (AnnualData, QuarterData, MonthData, KPIRecord)
+
+
+def pending_rows_filter(user):
+    """Unverified rows of the non-initiative categories ``user`` manages (all of them for superusers)."""
+    q_filter = Q(is_verified=False)
+    if not user.is_superuser:
+        assigned_categories = CategoryAssignment.objects.filter(
+            manager=user, category__topic__is_initiative=False,
+        ).values_list('category_id', flat=True)
+        q_filter &= Q(indicator__for_category__in=assigned_categories)
+    q_filter &= Q(indicator__for_category__topic__is_initiative=False)
+    return q_filter
+
+
+def verify_pending_rows(user):
+    """
+    Mark the pending rows ``user`` may approve verified and seen, one UPDATE
+    per table in a single transaction; returns {model name: rows approved}.
+    """
+    q_filter = pending_rows_filter(user)
+    approved = {}
+    with transaction.atomic():
+        for model in VERIFIED_MODELS:
+            pending = model.objects.filter(q_filter)
+            # the ids are only needed for the audit entries
+            ids = list(pending.order_by().values_list('id', flat=True).distinct())
+            if not ids:
+                approved[model.__name__] = 0
+                continue
+            if model is not KPIRecord:
+                # series are rebuilt when the transaction commits
+                series.mark_rows_dirty(pending)
+            approved[model.__name__] = pending.update(is_verified=True, is_seen=True)
+            audit.log_updates(
+                model, ids, {'is_verified': (False, True), 'is_seen': (False, True)}, actor=user, label='Approve all',
+            )
+    api_cache.invalidate(*VERIFIED_MODELS)
+    return approved
+
+
+def approve_submissions(submissions, user):
+    """
+    Approve the given pending submissions with one UPDATE and mark the
+    indicators of indicator submissions verified; returns the approved ids.
+    """
+    ids = list(submissions.order_by().values_list('id', flat=True).distinct())
+    if not ids:
+        return ids
+    model = submissions.model
+    with transaction.atomic():
+        model.objects.filter(id__in=ids).update(status='approved', verified_by=user, verified_at=timezone.now())
+        if model.__name__ == 'IndicatorSubmission':
+            indicator_ids = list(
+                Indicator.objects.filter(submissions__id__in=ids, is_verified=False)
+                .order_by().values_list('id', flat=True).distinct()
+            )
+            Indicator.objects.filter(id__in=indicator_ids).update(is_verified=True)
+            audit.log_updates(
+                Indicator, indicator_ids, {'is_verified': (False, True)}, actor=user, label='Approve submissions',
+            )
+            api_cache.invalidate(Indicator)
+            dashboard_stats.mark_stale()
+    return ids
+
+
+def submission_rows(submission):
+    """RowSource over the uploaded file of a data submission."""
+    ffield = submission.data_file
+    if not ffield:
+        raise ValueError('No uploaded file attached to submission')
+
+    file_path = ffield.path if hasattr(ffield, 'path') else None
+    if not file_path or not os.path.exists(file_path):
+        raise ValueError('Uploaded file not found on disk')
+
+    return RowSource(file_path)
+
+
+def import_submissions(submissions):
+    """
+    Import the files of approved data submissions as one upsert; returns
+    {submission id: result or {'error': message}}. Should the merged import
+    fail (an unreadable file), every file is imported on its own so one bad
+    file does not hold back the others.
+    """
+    results = {}
+    sources = []
+    for submission in submissions:
+        try:
+            sources.append((submission, submission_rows(submission)))
+        except Exception as e:
+            results[submission.id] = {'error': str(e)}
+    try:
+        results.update(DataSubmissionImporter.run_batch(sources))
+    except Exception:
+        for submission, rows in sources:
+            try:
+                results[submission.id] = DataSubmissionImporter(submission).run(rows)
+            except Exception as e:
+                results[submission.id] = {'error': str(e)}
+    return results
@@ -0,0 +1,478 @@
+from auditlog.models import LogEntry
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from Base.models import Indicator, DataPoint, Month, MonthData, Quarter, QuarterData, AnnualData, KPIRecord
+from Base import api_cache, audit, dashboard_stats, latest_values, rollups, series
+from Base.ethiopian_calendar import to_gregorian_date
+from project.sqlite import retry_when_locked
+from .row_source import normalize_row
+
+
+PERIOD_WIDE_CONTROL_COLUMNS = ['for_datapoint', 'for_quarter', 'for_month', 'indicator', 'title_eng', 'title_amh']
+
+
+def _year_key(value):
+    # Same coercion DataPoint.objects.get_or_create(year_EC=str(value)) applied
+    try:
+        return int(str(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"Field 'year_EC' expected a number but got {str(value)!r}.")
+
+
+class DataSubmissionImporter:
+    """
+    Staged importer for approved DataSubmission files.
+
+    1. resolve: a first pass over the file collects the indicator
+       codes/titles, years, quarters and months it references, which are
+       then loaded with one query each.
+    2. diff: the rows already stored for the touched indicators are fetched
+       once per table and keyed by (indicator, year, period).
+    3. stage/apply: a second pass over the file stages the upserts, then
+       new rows are bulk created and existing rows bulk updated in
+       chunks inside a single transaction.
+
+    ``raw_rows`` must be re-iterable (a list or a RowSource); rows are
+    normalized as they are read and never kept in memory as a whole.
+
+    The result has the same ``created/updated/skipped/errors`` shape as the
+    per-row importer it replaces. ``run_batch`` imports several submissions
+    as one upsert.
+    """
+    CHUNK_SIZE = 500
+
+    def __init__(self, submission):
+        self.submission = submission
+        self.result = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        # staged upserts: model -> {key: performance}, in first-seen order
+        self.staged = {AnnualData: {}, QuarterData: {}, MonthData: {}, KPIRecord: {}}
+
+    # ---------------------------------------------------------------- parse
+    def parse(self, raw_rows):
+        for i, raw in enumerate(raw_rows, start=1):
+            try:
+                # normalize keys to lowercase
+                row = normalize_row(raw)
+            except Exception as e:
+                row = e
+            yield i, row
+
+    # -------------------------------------------------------------- resolve
+    def resolve(self, rows):
+        codes = set()
+        columns = set()
+        years = set()
+        for _, row in rows:
+            if isinstance(row, Exception):
+                continue
+            code = row.get('indicator')
+            if isinstance(code, str) and code.strip():
+                codes.add(code.strip().lower())
+            for key, value in row.items():
+                if key.isdigit() and len(key) == 4:
+                    years.add(key)
+                elif key not in PERIOD_WIDE_CONTROL_COLUMNS:
+                    columns.add(key)
+            for key in ('for_datapoint', 'year_ec', 'year_gc'):
+                value = row.get(key)
+                if value not in (None, ''):
+                    years.add(value)
+                    if key == 'year_gc':
+                        try:
+                            years.add(int(value) - 7)
+                        except Exception:
+                            pass
+
+        def first_by(queryset, key):
+            found = {}
+            for obj in queryset.order_by('id'):
+                found.setdefault(getattr(obj, key), obj)
+            return found
+
+        self.indicators_by_code = first_by(
+            Indicator.objects.annotate(code_lower=Lower('code')).filter(code_lower__in=codes | columns),
+            'code_lower',
+        )
+        self.indicators_by_title = first_by(
+            Indicator.objects.annotate(title_lower=Lower('title_ENG')).filter(title_lower__in=columns),
+            'title_lower',
+        )
+
+        year_keys = set()
+        for year in years:
+            try:
+                year_keys.add(_year_key(year))
+            except ValueError:
+                continue
+        self.datapoints = {dp.year_EC: dp for dp in DataPoint.objects.filter(year_EC__in=year_keys)}
+        self.quarters = first_by(Quarter.objects.all(), 'number')
+        months = list(Month.objects.order_by('number', 'id'))
+        self.months = {}
+        self.months_by_name = {}
+        for month in months:
+            self.months.setdefault(month.number, month)
+            self.months_by_name.setdefault(month.month_ENG.lower(), month)
+
+    def datapoint(self, year):
+        year = _year_key(year)
+        if year not in self.datapoints:
+            self.datapoints[year] = DataPoint.objects.create(year_EC=year)
+        return self.datapoints[year]
+
+    def quarter(self, number):
+        if number not in self.quarters:
+            self.quarters[number] = Quarter.objects.create(number=number, title_ENG=f'Q{number}', title_AMH=f'Q{number}')
+        return self.quarters[number]
+
+    def create_month(self, number):
+        month = Month.objects.create(number=number, month_ENG=str(number), month_AMH=str(number))
+        self.months.setdefault(number, month)
+        self.months_by_name.setdefault(month.month_ENG.lower(), month)
+        return month
+
+    def indicator_for_column(self, column):
+        return self.indicators_by_code.get(column) or self.indicators_by_title.get(column)
+
+    # ---------------------------------------------------------------- stage
+    def stage_upsert(self, model, key, performance):
+        # Counted as it would have been by update_or_create, in row order
+        staged = self.staged[model]
+        if key in staged or key in self.existing[model]:
+            self.result['updated'] += 1
+        else:
+            self.result['created'] += 1
+        staged[key] = performance
+
+    def stage(self, rows):
+        result = self.result
+        submission_indicator = self.submission.indicator
+        indicator_code = (submission_indicator.code or '').strip().lower() if submission_indicator else None
+
+        for i, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+
+                # Determine which indicator this row belongs to
+                row_indicator_code = (row.get('indicator') or '').strip().lower()
+
+                target_indicator = None
+                if submission_indicator:
+                    # Single mode: only import rows matching the submission's indicator
+                    if row_indicator_code and indicator_code and row_indicator_code != indicator_code:
+                        continue
+                    target_indicator = submission_indicator
+                else:
+                    # Bulk mode (Multiple mode): look up indicator from row
+                    if not row_indicator_code:
+                        # Skip rows with no indicator in bulk mode
+                        continue
+                    target_indicator = self.indicators_by_code.get(row_indicator_code)
+                    if target_indicator is None:
+                        result['skipped'] += 1
+                        result['errors'].append({'row': i, 'error': f'Unknown indicator code: {row_indicator_code}'})
+                        continue
+
+                # Check if it's "Wide" format
+                year_cols = [k for k in row.keys() if k.isdigit() and len(k) == 4]
+                is_annual_wide = bool(year_cols)
+                is_period_wide = ('for_datapoint' in row) and ('for_quarter' in row or 'for_month' in row)
+
+                if is_annual_wide:
+                    # Wide format (Annual only - years as columns)
+                    for year_str in year_cols:
+                        perf_raw = row.get(year_str)
+                        if perf_raw in (None, ''):
+                            continue
+                        try:
+                            performance = float(perf_raw)
+                            datapoint = self.datapoint(year_str)
+                            self.stage_upsert(AnnualData, (target_indicator.id, datapoint.id), performance)
+                        except Exception:
+                            result['errors'].append({'row': i, 'error': f'Invalid value for {year_str}: {perf_raw}'})
+                    continue
+
+                if is_period_wide:
+                    # Wide-indicator format: for_datapoint, for_quarter/for_month, IND1, IND2...
+                    year_raw = (row.get('for_datapoint') or '').strip()
+                    if not year_raw:
+                        continue
+
+                    datapoint = self.datapoint(year_raw)
+
+                    # Identify period
+                    quarter_num = None
+                    month_num = None
+                    if 'for_quarter' in row and row.get('for_quarter') != '':
+                        try: quarter_num = int(row.get('for_quarter'))
+                        except: pass
+                    if 'for_month' in row and row.get('for_month') != '':
+                        try: month_num = int(row.get('for_month'))
+                        except: pass
+
+                    # Identify indicator columns (all except control columns)
+                    for col_name, val in row.items():
+                        if col_name in PERIOD_WIDE_CONTROL_COLUMNS or val in (None, ''):
+                            continue
+
+                        # Match indicator by code or title
+                        ind_obj = self.indicator_for_column(col_name)
+                        if not ind_obj:
+                            continue
+
+                        try:
+                            performance = float(val)
+                            if quarter_num:
+                                q_obj = self.quarter(quarter_num)
+                                self.stage_upsert(QuarterData, (ind_obj.id, datapoint.id, q_obj.id), performance)
+                            elif month_num:
+                                m_obj = self.months.get(month_num) or self.create_month(month_num)
+                                self.stage_upsert(MonthData, (ind_obj.id, datapoint.id, m_obj.id), performance)
+                            else:
+                                # Assume annual if neither quarter nor month
+                                self.stage_upsert(AnnualData, (ind_obj.id, datapoint.id), performance)
+                        except Exception:
+                            result['errors'].append({'row': i, 'error': f'Invalid value for indicator {col_name}: {val}'})
+                    continue
+
+                # Long format
+                year = row.get('year_ec') or row.get('year_gc')
+                if not year:
+                    result['skipped'] += 1
+                    result['errors'].append({'row': i, 'error': 'Missing year_EC/year_GC or year-columns'})
+                    continue
+
+                # performance
+                perf_raw = row.get('performance') or row.get('value') or row.get('amount')
+                if perf_raw in (None, ''):
+                    result['skipped'] += 1
+                    result['errors'].append({'row': i, 'error': 'Missing performance/value'})
+                    continue
+                try:
+                    performance = float(perf_raw)
+                except Exception:
+                    result['skipped'] += 1
+                    result['errors'].append({'row': i, 'error': f'Invalid performance value: {perf_raw}'})
+                    continue
+
+                # find or create datapoint by year_EC (prefer)
+                year_ec = row.get('year_ec') or None
+                if not year_ec and row.get('year_gc'):
+                    try:
+                        year_ec = str(int(row.get('year_gc')) - 7)
+                    except Exception:
+                        year_ec = None
+
+                datapoint = self.datapoint(year_ec if year_ec else year)
+
+                # frequency
+                if 'month' in row and row.get('month') != '':
+                    mraw = str(row.get('month')).strip()
+                    month_obj = None
+                    try:
+                        month_obj = self.months.get(int(mraw))
+                    except Exception:
+                        month_obj = self.months_by_name.get(mraw.lower())
+                    if not month_obj:
+                        if mraw.isdigit():
+                            month_obj = self.create_month(int(mraw))
+                        else:
+                            result['skipped'] += 1
+                            result['errors'].append({'row': i, 'error': f'Invalid month: {mraw}'})
+                            continue
+
+                    self.stage_upsert(MonthData, (target_indicator.id, datapoint.id, month_obj.id), performance)
+                    continue
+
+                # daily / weekly
+                for column, record_type in (('day', 'daily'), ('week', 'weekly')):
+                    if column in row and row.get(column) != '':
+                        try:
+                            month = int(str(row.get('month')).strip())
+                            value = int(str(row.get(column)).strip())
+                            # Following resource.py logic for weeks: day = (week-1)*7 + 1
+                            day = value if record_type == 'daily' else ((value - 1) * 7) + 1
+                            greg_date = to_gregorian_date(int(year_ec), month, day)
+                            self.stage_upsert(KPIRecord, (target_indicator.id, greg_date, record_type), performance)
+                        except Exception as e:
+                            result['skipped'] += 1
+                            result['errors'].append({'row': i, 'error': f'Invalid {record_type} date: {e}'})
+                        break
+                else:
+                    if 'quarter' in row and row.get('quarter') != '':
+                        qraw = row.get('quarter')
+                        try:
+                            qnum = int(qraw)
+                        except Exception:
+                            result['skipped'] += 1
+                            result['errors'].append({'row': i, 'error': f'Invalid quarter: {qraw}'})
+                            continue
+                        quarter_obj = self.quarter(qnum)
+                        self.stage_upsert(QuarterData, (target_indicator.id, datapoint.id, quarter_obj.id), performance)
+                        continue
+
+                    # else assume annual
+                    self.stage_upsert(AnnualData, (target_indicator.id, datapoint.id), performance)
+
+            except Exception as e:
+                result['skipped'] += 1
+                result['errors'].append({'row': i, 'error': str(e)})
+
+    # ----------------------------------------------------------------- diff
+    KEY_FIELDS = {
+        AnnualData: ('indicator_id', 'for_datapoint_id'),
+        QuarterData: ('indicator_id', 'for_datapoint_id', 'for_quarter_id'),
+        MonthData: ('indicator_id', 'for_datapoint_id', 'for_month_id'),
+        KPIRecord: ('indicator_id', 'date', 'record_type'),
+    }
+
+    def touched_indicator_ids(self):
+        """Ids of the indicators referenced by the file (after resolve)."""
+        indicator_ids = {indicator.id for indicator in self.indicators_by_code.values()}
+        indicator_ids |= {indicator.id for indicator in self.indicators_by_title.values()}
+        if self.submission.indicator_id:
+            indicator_ids.add(self.submission.indicator_id)
+        return indicator_ids
+
+    def load_existing(self, indicator_ids=None):
+        """
+        Fetch the stored rows the batch can touch: one query per table,
+        scoped to the indicators referenced by the file.
+        """
+        if indicator_ids is None:
+            indicator_ids = self.touched_indicator_ids()
+
+        self.existing = {}
+        for model, fields in self.KEY_FIELDS.items():
+            existing = {}
+            if indicator_ids:
+                for obj in model.objects.filter(indicator_id__in=indicator_ids).order_by('id').only(
+                    'id', *fields, *self.AUDITED_VALUES,
+                ):
+                    existing.setdefault(tuple(getattr(obj, f) for f in fields), obj)
+            self.existing[model] = existing
+
+    # ---------------------------------------------------------------- apply
+    AUDITED_VALUES = ('performance', 'is_verified')
+
+    @classmethod
+    def audit_row(cls, obj, fields, action, original=None):
+        """
+        Manifest row of a bulk-written object for Base.audit.log_batch;
+        updates list the values that differ from ``original``.
+        """
+        if original is None:
+            changes = {field: [None, str(getattr(obj, field))] for field in (*fields, *cls.AUDITED_VALUES)}
+        else:
+            changes = {
+                field: [str(original[field]), str(getattr(obj, field))]
+                for field in cls.AUDITED_VALUES if str(original[field]) != str(getattr(obj, field))
+            }
+        return [str(obj.pk), action, changes]
+
+    def apply(self):
+        now = timezone.now()
+        for model, staged in self.staged.items():
+            fields = self.KEY_FIELDS[model]
+            existing = self.existing[model]
+            to_create = []
+            to_update = []
+            originals = {}
+            for key, performance in staged.items():
+                if model is AnnualData:
+                    # AnnualData.save() rounding, which bulk writes bypass
+                    performance = round(performance, 2)
+                obj = existing.get(key)
+                if obj is None:
+                    obj = model(**dict(zip(fields, key)), performance=performance, is_verified=True)
+                    if model is KPIRecord:
+                        obj.set_ethiopian_date()
+                    to_create.append(obj)
+                else:
+                    originals[obj.pk] = {field: getattr(obj, field) for field in self.AUDITED_VALUES}
+                    obj.performance = performance
+                    obj.is_verified = True
+                    to_update.append(obj)
+
+            update_fields = ['performance', 'is_verified']
+            if model is not KPIRecord:
+                # auto_now is not applied by bulk_update
+                for obj in to_update:
+                    obj.created_at = now
+                update_fields.append('created_at')
+
+            model.objects.bulk_create(to_create, batch_size=self.CHUNK_SIZE)
+            model.objects.bulk_update(to_update, update_fields, batch_size=self.CHUNK_SIZE)
+            if staged:
+                audit.log_batch(
+                    model,
+                    [self.audit_row(obj, fields, LogEntry.Action.CREATE) for obj in to_create]
+                    + [self.audit_row(obj, fields, LogEntry.Action.UPDATE, originals[obj.pk]) for obj in to_update],
+                    actor=self.submission.verified_by,
+                    label='Data submission import',
+                )
+                # bulk writes send no post_save
+                api_cache.invalidate(model)
+                dashboard_stats.mark_stale()
+                if model is KPIRecord:
+                    for record_type in latest_values.RECORD_FREQUENCIES:
+                        series.mark_dirty({key[0] for key in staged if key[2] == record_type}, record_type)
+                else:
+                    series.mark_dirty({key[0] for key in staged}, series.frequency_of(model))
+
+        # KPIRecord.save() refreshes weekly aggregates for daily rows
+        rollups.refresh_weeks(
+            (indicator_id, rollups.week_key(day))
+            for indicator_id, day, record_type in self.staged[KPIRecord]
+            if record_type == 'daily'
+        )
+
+    def run(self, raw_rows):
+        # a locked SQLite database rolls the whole import back; start it over
+        return retry_when_locked(self._run, raw_rows)
+
+    # lookups and staged writes shared by the importers of a batch
+    SHARED = ('datapoints', 'quarters', 'months', 'months_by_name', 'existing', 'staged')
+
+    @classmethod
+    def run_batch(cls, sources):
+        """
+        Import several submissions, ``sources`` being (submission, raw_rows)
+        pairs, as one upsert in one transaction: the files are resolved one by
+        one, the stored rows of all their indicators are loaded once, and the
+        staged rows of every file (later files winning on the same key) are
+        written together. Returns {submission id: result}.
+        """
+        return retry_when_locked(cls._run_batch, sources)
+
+    @classmethod
+    def _run_batch(cls, sources):
+        importers = [cls(submission) for submission, _ in sources]
+        if not importers:
+            return {}
+        first = importers[0]
+        with transaction.atomic():
+            for importer, (_, raw_rows) in zip(importers, sources):
+                importer.resolve(importer.parse(raw_rows))
+            for importer in importers[1:]:
+                for name in ('datapoints', 'quarters', 'months', 'months_by_name'):
+                    for key, value in getattr(importer, name).items():
+                        getattr(first, name).setdefault(key, value)
+            first.load_existing(set().union(*(importer.touched_indicator_ids() for importer in importers)))
+            for importer, (_, raw_rows) in zip(importers, sources):
+                for name in cls.SHARED:
+                    setattr(importer, name, getattr(first, name))
+                importer.stage(importer.parse(raw_rows))
+            first.apply()
+        return {importer.submission.id: importer.result for importer in importers}
+
+    def _run(self, raw_rows):
+        self.result = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        self.staged = {model: {} for model in self.staged}
+        with transaction.atomic():
+            self.resolve(self.parse(raw_rows))
+            self.load_existing()
+            self.stage(self.parse(raw_rows))
+            self.apply()
+        return self.result
@@ -0,0 +1,24 @@
+from Base.job_queue import handler
+from . import approvals
+from .models import DataSubmission
+
+
+# submissions imported per transaction (and progress update)
+BATCH_SIZE = 20
+
+
+@handler('import_data_submissions')
+def import_data_submissions(job, submission_ids):
+    """
+    Import approved data submissions, BATCH_SIZE files per merged upsert;
+    per-submission errors are reported, not raised.
+    """
+    submissions = list(DataSubmission.objects.filter(id__in=submission_ids, status='approved').order_by('id'))
+    results = {}
+    for start in range(0, len(submissions), BATCH_SIZE):
+        batch = submissions[start:start + BATCH_SIZE]
+        for submission_id, result in approvals.import_submissions(batch).items():
+            results[str(submission_id)] = result
+        done = start + len(batch)
+        job.report_progress(done, len(submissions), f'Imported {done} of {len(submissions)} submissions')
+    return results
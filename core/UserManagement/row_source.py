@@ -0,0 +1,123 @@
+import csv
+import os
+from io import TextIOWrapper
+from itertools import islice
+try:
+    import openpyxl
+except Exception:
+    openpyxl = None
+
+
+CSV_EXTENSIONS = ('.csv',)
+EXCEL_EXTENSIONS = ('.xls', '.xlsx')
+
+
+def normalize_row(raw):
+    """Lowercase/strip the headers of a raw row and replace empty cells with ''."""
+    return {(k or '').strip().lower(): (v if v is not None else '') for k, v in raw.items()}
+
+
+class RowSource:
+    """
+    Lazily reads the rows of an uploaded CSV or Excel file as {header: value}
+    dicts.
+
+    ``source`` is a filesystem path or a file-like object (an uploaded file
+    or a FileField). Only the current row is held in memory: CSV text is
+    decoded incrementally and workbooks are opened in openpyxl read-only mode
+    and walked with ``iter_rows``. Every iteration starts again from the top
+    of the file, so a source can be read more than once, and stopping early
+    (see ``head``) never reads the rest of the file.
+    """
+
+    def __init__(self, source, name=None, errors='strict'):
+        self.source = source
+        self.name = name or (source if isinstance(source, str) else getattr(source, 'name', '')) or ''
+        self.errors = errors
+        self.extension = os.path.splitext(self.name.lower())[1]
+        if self.extension not in CSV_EXTENSIONS + EXCEL_EXTENSIONS:
+            raise RuntimeError('Unsupported file type. Accepts .csv, .xls, .xlsx')
+        if self.extension in EXCEL_EXTENSIONS and not openpyxl:
+            raise RuntimeError('openpyxl required to parse Excel files but is not installed')
+
+    @property
+    def is_path(self):
+        return isinstance(self.source, str)
+
+    def _rewind(self):
+        if hasattr(self.source, 'open') and getattr(self.source, 'closed', False):
+            self.source.open('rb')
+        if hasattr(self.source, 'seek'):
+            self.source.seek(0)
+
+    def _iter_csv(self):
+        if self.is_path:
+            with open(self.source, newline='', encoding='utf-8', errors=self.errors) as csvfile:
+                yield from csv.DictReader(csvfile)
+            return
+
+        self._rewind()
+        wrapper = TextIOWrapper(self.source, encoding='utf-8', errors=self.errors, newline='')
+        try:
+            yield from csv.DictReader(wrapper)
+        finally:
+            # keep the underlying upload open for the caller
+            wrapper.detach()
+
+    def _iter_excel(self):
+        if not self.is_path:
+            self._rewind()
+        wb = openpyxl.load_workbook(self.source, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            headers = [str(value).strip() if value is not None else '' for value in header]
+            for values in rows:
+                yield dict(zip(headers, values))
+        finally:
+            wb.close()
+
+    def __iter__(self):
+        if self.extension in CSV_EXTENSIONS:
+            return self._iter_csv()
+        return self._iter_excel()
+
+    def head(self, max_rows):
+        """The first ``max_rows`` rows; the rest of the file is not read."""
+        rows = iter(self)
+        try:
+            return list(islice(rows, max_rows))
+        finally:
+            rows.close()
+
+    def headers(self):
+        """Header names of the file, reading only its first line/row."""
+        if self.extension in CSV_EXTENSIONS:
+            rows = self._iter_csv()
+            try:
+                first = next(rows, None)
+            finally:
+                rows.close()
+            if first is not None:
+                return list(first.keys())
+            # header-only file: DictReader yields nothing, read the header line
+            self._rewind()
+            if self.is_path:
+                with open(self.source, newline='', encoding='utf-8', errors=self.errors) as csvfile:
+                    return next(csv.reader(csvfile), [])
+            wrapper = TextIOWrapper(self.source, encoding='utf-8', errors=self.errors, newline='')
+            try:
+                return next(csv.reader(wrapper), [])
+            finally:
+                wrapper.detach()
+
+        if not self.is_path:
+            self._rewind()
+        wb = openpyxl.load_workbook(self.source, read_only=True, data_only=True)
+        try:
+            header = next(wb.active.iter_rows(min_row=1, max_row=1, values_only=True), None)
+            return [str(value).strip() if value is not None else '' for value in header or ()]
+        finally:
+            wb.close()
@@ -1,3 +1,266 @@
-from django.test import TestCase
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from auditlog.models import LogEntry
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from Base import job_queue
+from Base.ethiopian_calendar import to_gregorian_date
+from Base.models import (
+    AnnualData, Category, DataPoint, Indicator, Job, KPIRecord, Month, MonthData, Quarter, QuarterData, Topic,
+)
+from UserManagement import approvals
+from UserManagement.api.api_views import WeeklySidebarList, approve_submission_api
+from UserManagement.importer import DataSubmissionImporter
+from UserManagement.models import CategoryAssignment, CustomUser, DataSubmission
+from UserManagement.row_source import RowSource
+
+
+class DataSubmissionImporterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email='importer@example.com', username='importer')
+        cls.gdp = Indicator.objects.create(title_ENG='GDP', code='ECO-01')
+        cls.cpi = Indicator.objects.create(title_ENG='CPI', code='ECO-02')
+        cls.q1 = Quarter.objects.create(title_ENG='Q1', title_AMH='Q1', number=1)
+        Month.objects.create(month_ENG='Meskerem', month_AMH='መስከረም', number=1)
+        AnnualData.objects.create(indicator=cls.gdp, for_datapoint=DataPoint.objects.create(year_EC=2015), performance=1)
+
+    def run_import(self, rows, indicator=None):
+        submission = DataSubmission.objects.create(submitted_by=self.user, indicator=indicator)
+        return DataSubmissionImporter(submission).run(rows)
+
+    def test_annual_wide_bulk_mode(self):
+        result = self.run_import([
+            {'indicator': 'eco-01', '2015': '10.456', '2016': '11'},
+            {'indicator': 'ECO-02', '2015': '', '2016': 'x'},
+            {'indicator': 'NOPE', '2016': '1'},
+            {'indicator': '', '2016': '1'},
+        ])
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['skipped'], 1)
+        self.assertEqual(
+            result['errors'],
+            [
+                {'row': 2, 'error': 'Invalid value for 2016: x'},
+                {'row': 3, 'error': 'Unknown indicator code: nope'},
+            ],
+        )
+        self.assertEqual(AnnualData.objects.get(indicator=self.gdp, for_datapoint__year_EC=2015).performance, 10.46)
+        self.assertTrue(AnnualData.objects.get(indicator=self.gdp, for_datapoint__year_EC=2016).is_verified)
+
+    def test_period_wide_quarter_and_month(self):
+        result = self.run_import([
+            {'for_datapoint': '2016', 'for_quarter': 1, 'ECO-01': '5', 'CPI': '6'},
+            {'for_datapoint': '2016', 'for_quarter': 1, 'ECO-01': '7'},
+            {'for_datapoint': '2016', 'for_month': 2, 'ECO-01': '8'},
+        ], indicator=self.gdp)
+
+        self.assertEqual(result, {'created': 3, 'updated': 1, 'skipped': 0, 'errors': []})
+        self.assertEqual(QuarterData.objects.get(indicator=self.gdp, for_quarter=self.q1).performance, 7)
+        self.assertEqual(QuarterData.objects.get(indicator=self.cpi).performance, 6)
+        self.assertEqual(MonthData.objects.get(indicator=self.gdp).for_month.number, 2)
+
+    def test_long_format_single_mode(self):
+        result = self.run_import(
+            [
+                {'year_EC': '2016', 'month': 'Meskerem', 'performance': '3'},
+                {'year_EC': '2016', 'quarter': '1', 'performance': '4'},
+                {'year_GC': '2022', 'performance': '9'},
+                {'indicator': 'ECO-02', 'year_EC': '2016', 'performance': '1'},
+                {'year_EC': '2016', 'performance': ''},
+                {'year_EC': '2016', 'month': 'Foo', 'performance': '1'},
+            ],
+            indicator=self.gdp,
+        )
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(result['skipped'], 2)
+        self.assertEqual([e['row'] for e in result['errors']], [5, 6])
+        self.assertEqual(AnnualData.objects.get(indicator=self.gdp, for_datapoint__year_EC=2015).performance, 9)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def rows(count):
+            return [{'indicator': 'ECO-01', str(2000 + n): str(n)} for n in range(count)]
+
+        def count_queries(count):
+            submission = DataSubmission.objects.create(submitted_by=self.user)
+            with CaptureQueriesContext(connection) as queries:
+                DataSubmissionImporter(submission).run(rows(count))
+            return len(queries)
+
+        # warm up: creates the DataPoint rows
+        count_queries(40)
+        self.assertEqual(count_queries(5), count_queries(40))
+
+
+class RowSourceTests(TestCase):
+
+    def xlsx_upload(self, rows):
+        wb = openpyxl.Workbook()
+        for row in rows:
+            wb.active.append(row)
+        buffer = BytesIO()
+        wb.save(buffer)
+        return SimpleUploadedFile('data.xlsx', buffer.getvalue())
+
+    def test_csv_rows_and_headers(self):
+        upload = SimpleUploadedFile('data.csv', 'Indicator,2015\nECO-01,1\nECO-02,\n'.encode())
+        source = RowSource(upload)
+
+        self.assertEqual(source.headers(), ['Indicator', '2015'])
+        self.assertEqual(list(source), [{'Indicator': 'ECO-01', '2015': '1'}, {'Indicator': 'ECO-02', '2015': ''}])
+        # iterating again starts from the top and leaves the upload open
+        self.assertEqual(len(list(source)), 2)
+        self.assertFalse(upload.closed)
+
+    def test_xlsx_head_stops_early(self):
+        upload = self.xlsx_upload([['indicator', 2015]] + [[f'IND-{n}', n] for n in range(100)])
+        source = RowSource(upload)
+
+        self.assertEqual(source.headers(), ['indicator', '2015'])
+        self.assertEqual(source.head(2), [{'indicator': 'IND-0', '2015': 0}, {'indicator': 'IND-1', '2015': 1}])
+
+    def test_unsupported_extension(self):
+        with self.assertRaises(RuntimeError):
+            RowSource(SimpleUploadedFile('data.txt', b''))
+
+
+class BackgroundApprovalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create(email='manager@example.com', username='manager', is_staff=True)
+        cls.gdp = Indicator.objects.create(title_ENG='GDP', code='ECO-01')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.submission = DataSubmission.objects.create(
+            submitted_by=self.manager,
+            data_file=SimpleUploadedFile('gdp.csv', b'indicator,2015,2016\nECO-01,10,11\n'),
+        )
+
+    def test_approval_queues_the_import(self):
+        request = APIRequestFactory().post(
+            '/user-management/api/approve-submission/', {'type': 'data', 'id': self.submission.id}, format='json',
+        )
+        force_authenticate(request, user=self.manager)
+        response = approve_submission_api(request)
+
+        self.assertEqual(response.data['status'], 'approved')
+        self.assertEqual(response.data['job']['status'], 'queued')
+        self.assertNotIn('import_result', response.data)
+        self.assertFalse(AnnualData.objects.exists())
+
+        job_queue.discover()
+        self.assertEqual(job_queue.run_pending(), 1)
+        job = Job.objects.get(token=response.data['job']['token'])
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result[str(self.submission.id)]['created'], 2)
+        self.assertEqual(AnnualData.objects.get(for_datapoint__year_EC=2016).performance, 11)
+
+
+class SetBasedApprovalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = CustomUser.objects.create(email='manager@example.com', username='manager', is_category_manager=True)
+        topic = Topic.objects.create(title_ENG='Economy')
+        cls.managed = Category.objects.create(name_ENG='Macro', name_AMH='ማክሮ', code='MAC', topic=topic)
+        cls.other = Category.objects.create(name_ENG='Trade', name_AMH='ንግድ', code='TRD', topic=topic)
+        CategoryAssignment.objects.create(manager=cls.manager, category=cls.managed)
+        cls.gdp = Indicator.objects.create(title_ENG='GDP', code='ECO-01')
+        cls.gdp.for_category.add(cls.managed)
+        cls.exports = Indicator.objects.create(title_ENG='Exports', code='TRD-01')
+        cls.exports.for_category.add(cls.other)
+        for year in (2014, 2015, 2016):
+            datapoint = DataPoint.objects.create(year_EC=year)
+            for indicator in (cls.gdp, cls.exports):
+                AnnualData.objects.create(indicator=indicator, for_datapoint=datapoint, performance=year, is_verified=False)
+
+    def test_pending_rows_are_verified_in_the_managers_categories_only(self):
+        LogEntry.objects.all().delete()
+        # 3 of them write the aggregate audit entry of the approved table and its index
+        with self.assertNumQueries(11):
+            approved = approvals.verify_pending_rows(self.manager)
+
+        self.assertEqual(approved, {'AnnualData': 3, 'QuarterData': 0, 'MonthData': 0, 'KPIRecord': 0})
+        self.assertFalse(AnnualData.objects.filter(indicator=self.gdp, is_verified=False).exists())
+        self.assertEqual(AnnualData.objects.filter(indicator=self.exports, is_verified=False).count(), 3)
+        entry = LogEntry.objects.get(content_type__model='annualdata')
+        self.assertEqual((entry.actor, entry.audit_batch.row_count), (self.manager, 3))
+        self.assertEqual(
+            sorted(int(object_pk) for object_pk, _, _ in entry.audit_batch.rows()),
+            sorted(AnnualData.objects.filter(indicator=self.gdp).values_list('id', flat=True)),
+        )
+
+    def test_submissions_are_imported_as_one_upsert(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        def submit(content):
+            return DataSubmission.objects.create(
+                submitted_by=self.manager, status='approved', data_file=SimpleUploadedFile('data.csv', content),
+            )
+        first = submit(b'indicator,2016,2017\nECO-01,1,2\n')
+        second = submit(b'indicator,2017,2018\nECO-01,3,4\nNOPE,1,1\n')
+        missing = DataSubmission.objects.create(submitted_by=self.manager, status='approved')
+
+        results = approvals.import_submissions([first, second, missing])
+
+        self.assertEqual(results[first.id], {'created': 1, 'updated': 1, 'skipped': 0, 'errors': []})
+        self.assertEqual(results[second.id]['created'], 1)
+        self.assertEqual(results[second.id]['updated'], 1)
+        self.assertEqual(results[missing.id], {'error': 'No uploaded file attached to submission'})
+        self.assertEqual(AnnualData.objects.get(indicator=self.gdp, for_datapoint__year_EC=2017).performance, 3)
+        self.assertTrue(DataPoint.objects.filter(year_EC=2018).exists())
+
+
+class KPISidebarTests(TestCase):
+    def setUp(self):
+        topic = Topic.objects.create(title_ENG='Economy')
+        initiatives = Topic.objects.create(title_ENG='Initiatives', is_initiative=True)
+        self.indicator = Indicator.objects.create(title_ENG='Fuel')
+        hidden = Indicator.objects.create(title_ENG='Initiative')
+        Category.objects.create(name_ENG='Fuel', name_AMH='Fuel', code='FUEL', topic=topic).indicators.add(self.indicator)
+        Category.objects.create(name_ENG='Plans', name_AMH='Plans', code='PLAN', topic=initiatives).indicators.add(hidden)
+        with self.captureOnCommitCallbacks(execute=True):
+            for month in range(1, 8):
+                KPIRecord.objects.create(
+                    indicator=self.indicator, record_type='weekly', date=to_gregorian_date(2016, month, 29), performance=month,
+                )
+            KPIRecord.objects.create(indicator=hidden, record_type='weekly', date=to_gregorian_date(2016, 8, 1))
+        self.user = CustomUser.objects.create_user(username='viewer', email='viewer@example.com', password='pw')
+
+    def get(self, **params):
+        request = APIRequestFactory().get('/user-management/sidebar/weekly/', params)
+        force_authenticate(request, user=self.user)
+        return WeeklySidebarList.as_view()(request).data
+
+    def test_weekly_sidebar_pages_with_a_cursor(self):
+        first = self.get(page=1)
+        self.assertEqual([item['month_number'] for item in first['results']], [1, 2, 3, 4, 5])
+        self.assertEqual(first['results'][0]['label'], f"Week 5 ({to_gregorian_date(2016, 1, 29):%b}) - 2023")
+        self.assertEqual((first['total'], first['total_pages'], first['has_next']), (7, 2, True))
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get(page=2, cursor=first['next_cursor'])
+        self.assertEqual([item['month_number'] for item in second['results']], [6, 7])
+        self.assertEqual((second['has_next'], second['has_prev'], second['next_cursor']), (False, True, None))
+        self.assertEqual(self.get(page=2)['results'], second['results'])
+        # the page itself and the periods before the cursor, no count
+        self.assertEqual(len(queries), 3)
+        self.assertFalse(first['has_prev'])
+        self.assertFalse(self.get(page=2, ids='0')['has_prev'])
@@ -7,12 +7,16 @@ from .serializers import *
 from mobile.models import MobileDahboardOverview
 from Base.models import Topic , ProjectInitiatives , SubProject , Category , Indicator
 from django.db.models import Q
+from Base.api_cache import cached_api_response
+from Base import exports, job_queue, series
+from Base.serializer import JobSerializer
 
 from django.http import JsonResponse, HttpResponse
-from Base.resource import AnnualDataResource , QuarterDataResource , MonthDataResource  # import your resource
+from Base.resource import annual_aggregate_resource, month_aggregate_resource, quarter_aggregate_resource
 
 #Time series data
 @api_view(['GET'])
+@cached_api_response('dashboard_overview')
 def dashboard_overview(request):
     topics = Topic.objects.filter(is_initiative = False, is_dashboard = True)
     serializer = TopicSerializer(topics, many=True)
@@ -26,6 +30,7 @@ def trending(request):
 
 
 @api_view(['GET'])
+@cached_api_response('mobile_topic')
 def mobile_topic(request):
     topics = Topic.objects.filter(is_initiative = False, is_dashboard = True)
     serializer = TopicSerializer(topics, many=True)
@@ -176,7 +181,7 @@ def indicators_filter(request):
         is_dashboard_visible=True
     )
 
-    serializer = IndicatorSerializer(indicators, many=True)
+    serializer = IndicatorSerializer(prefetch_indicator_tree(indicators), many=True)
     return Response({
         "result": "SUCCESS",
         "message": "SUCCESS",
@@ -189,36 +194,51 @@ def get_resource_by_data_type(data_type):
     """Return the correct resource class and filename suffix based on data type."""
     data_type = data_type.lower()
     if data_type == 'quarter':
-        return QuarterDataResource, "QuarterData"
+        return quarter_aggregate_resource(), "QuarterData"
     elif data_type == 'month':
-        return MonthDataResource, "MonthData"
+        return month_aggregate_resource(), "MonthData"
     else:  # default to annual
-        return AnnualDataResource, "AnnualData"
+        return annual_aggregate_resource(), "AnnualData"
 
 
 def export_dataset(indicators, resource_class, file_type, filename_prefix):
     """Export indicators dataset in requested format and return HttpResponse."""
-    dataset = resource_class().export(indicators)
-
     file_type = file_type.lower()
-    if file_type == 'csv':
-        content = dataset.csv
-        content_type = 'text/csv'
-        ext = 'csv'
-    elif file_type == 'html':
-        content = dataset.html
-        content_type = 'text/html'
-        ext = 'html'
-    else:  # default to Excel
-        content = dataset.xlsx
-        content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        ext = 'xlsx'
-
-    response = HttpResponse(content, content_type=content_type)
-    response['Content-Disposition'] = f'attachment; filename="{filename_prefix}.{ext}"'
+    if file_type != 'html':
+        # CSV and Excel (the default) are streamed row by row
+        return exports.export_response(
+            resource_class(), indicators, 'csv' if file_type == 'csv' else 'xlsx', filename_prefix
+        )
+
+    dataset = resource_class().export(indicators)
+    response = HttpResponse(dataset.html, content_type='text/html')
+    response['Content-Disposition'] = f'attachment; filename="{filename_prefix}.html"'
     return response
 
 
+def wants_background(request):
+    """
+    Whether to queue the export (``?background=1``). Only signed-in users can
+    poll a job, so anonymous requests get the streamed export instead.
+    """
+    return bool(request.GET.get("background")) and request.user.is_authenticated
+
+
+def enqueue_export(request, indicators, data_type, file_type, filename_prefix):
+    """Queue the export as a background job and return its status for polling."""
+    job = job_queue.enqueue('export_indicators', {
+        'indicator_ids': list(indicators.order_by('id').values_list('id', flat=True)),
+        'data_type': data_type,
+        'file_type': 'csv' if file_type.lower() == 'csv' else 'xlsx',
+        'filename': filename_prefix,
+    }, user=request.user)
+    return Response({
+        "result": "QUEUED",
+        "message": "The export is being prepared; poll status_url until download_url is set.",
+        "data": JobSerializer(job).data,
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['GET'])
 def download_topic_data(request, id):
     data_type = request.GET.get("data_type", "annual")
@@ -233,6 +253,8 @@ def download_topic_data(request, id):
     resource_class, filename_suffix = get_resource_by_data_type(data_type)
     filename_prefix = f"{topic.title_ENG}_{filename_suffix}"
 
+    if wants_background(request):
+        return enqueue_export(request, indicators, data_type, file_type, filename_prefix)
     return export_dataset(indicators, resource_class, file_type, filename_prefix)
 
 
@@ -250,6 +272,8 @@ def download_category_data(request, id):
     resource_class, filename_suffix = get_resource_by_data_type(data_type)
     filename_prefix = f"{category.name_ENG}_{filename_suffix}"
 
+    if wants_background(request):
+        return enqueue_export(request, indicators, data_type, file_type, filename_prefix)
     return export_dataset(indicators, resource_class, file_type, filename_prefix)
 
 
@@ -268,6 +292,8 @@ def download_indicator_data(request, id):
     resource_class, filename_suffix = get_resource_by_data_type(data_type)
     filename_prefix = f"{indicator.title_ENG}_{filename_suffix}"
 
+    if wants_background(request):
+        return enqueue_export(request, indicators, data_type, file_type, filename_prefix)
     return export_dataset(indicators, resource_class, file_type, filename_prefix)
 
 
@@ -354,61 +380,51 @@ def get_annual_value(request):
             return Response({"error": "Data not found"}, status=404)
     else:
 
-        annual_queryset = indicator.annual_data.filter(
-             Q(for_datapoint__year_EC__isnull=False)
-        ).annotate(
-            year_num=Cast('for_datapoint__year_EC', IntegerField())
-        ).order_by('-year_num')[:10]
-
-        quarter_queryset = indicator.quarter_data.filter(
-            Q(for_datapoint__year_EC__isnull=False)
-        ).annotate(
-                year_num=Cast('for_datapoint__year_EC', IntegerField())
-        ).order_by('-year_num', '-for_quarter__number')[:8]
-
-        month_queryset = indicator.month_data.filter(
-            Q(for_datapoint__year_EC__isnull=False)
-            ).annotate(
-                year_num=Cast('for_datapoint__year_EC', IntegerField())
-        ).order_by('-year_num', '-for_month__number')[:12]
-
+        # one blob per frequency instead of three joined, sorted row queries
+        stored = series.load_all(indicator.id)
+        annual_points = stored['annual'].latest(10)
+        quarter_points = stored['quarterly'].latest(8)
+        month_points = stored['monthly'].latest(12)
 
-        
-
-        if not (annual_queryset.exists() or quarter_queryset.exists() or month_queryset.exists()):
+        if not (annual_points or quarter_points or month_points):
             return Response({"error": "Data not found"}, status=404)
 
-        annual_serializer = AnnualDataSerializer(annual_queryset, many=True)
-        quarter_serializer = QuarterDataSerializer(quarter_queryset, many=True)
-        month_serializer = MonthDataSerializer(month_queryset, many=True)
+        quarter_titles = {}
+        for quarter in Quarter.objects.order_by('number', 'id'):
+            quarter_titles.setdefault(quarter.number, quarter.title_ENG)
+        month_names = {}
+        for month in Month.objects.order_by('number', 'id'):
+            month_names.setdefault(month.number, month.month_AMH)
+
+        def rounded(value):
+            return round(value, 2) if value is not None else None
 
         annual_full_series = [
             {
-                'year' : item['for_datapoint'],
-                'value': item['performance'] 
+                'year' : str(year),
+                'value': rounded(value)
             }
-            for item in annual_serializer.data
+            for _, year, _, value, *_ in annual_points
         ]
 
         quarter_full_series = [
             {
-                'year' : item['for_datapoint'],
-                'quarter' : item['for_quarter'], 
-                'value': item['performance'] 
+                'year' : str(year),
+                'quarter' : quarter_titles.get(number),
+                'value': rounded(value)
             }
-            for item in quarter_serializer.data
+            for _, year, number, value, *_ in quarter_points
         ]
 
         month_full_series = [
             {
-                'year' : item['for_datapoint'],
-                'month' : item['for_month'], 
-                'value': item['performance'] 
+                'year' : str(year),
+                'month' : month_names.get(number),
+                'value': rounded(value)
             }
-            for item in month_serializer.data
+            for _, year, number, value, *_ in month_points
         ]
 
-
         return Response({
             "indicator": code,
             "time_series": {
@@ -422,6 +438,7 @@ def get_annual_value(request):
 ##### Updated API For Category
 
 @api_view(['GET'])
+@cached_api_response('categories')
 def categories(request, topic_id):
     try:
         topic = Topic.objects.get(id = topic_id)
@@ -435,6 +452,7 @@ def categories(request, topic_id):
 
 
 @api_view(['GET'])
+@cached_api_response('kpis')
 def kpis(request, category_id):
     try:
         category = Category.objects.get(id = category_id)
@@ -445,6 +463,6 @@ def kpis(request, category_id):
         is_dashboard_visible=True,
         parent__isnull=True,
     ).distinct().order_by("rank", "id")
-    serializer = IndicatorSerializer(kpi_lists, many = True)
+    serializer = IndicatorSerializer(prefetch_indicator_tree(kpi_lists), many = True)
 
     return Response({"result" : "SUCCUSS", "message" : "SUCCUSS", "data" : serializer.data,}, status=status.HTTP_200_OK)
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from django.db.models import Prefetch, Q
+from Base.models import Indicator, AnnualData, QuarterData, MonthData, KPIRecord
+from Base.deltas import build_series, period_field, series_deltas
+
+
+def _indicator_series_prefetches():
+    """
+    Prefetches used by the batch IndicatorSerializer path. The rows are
+    ordered chronologically, as the per-indicator path lists them, so the
+    serialized output matches it exactly.
+    """
+    return (
+        'for_category',
+        Prefetch(
+            'annual_data',
+            queryset=AnnualData.objects.select_related('for_datapoint').order_by('for_datapoint__year_EC', 'id'),
+            to_attr='prefetched_annual_data',
+        ),
+        Prefetch(
+            'quarter_data',
+            queryset=QuarterData.objects.select_related('for_datapoint', 'for_quarter')
+            .order_by('for_datapoint__year_EC', 'for_quarter__number', 'id'),
+        ),
+        Prefetch(
+            'month_data',
+            queryset=MonthData.objects.select_related('for_datapoint', 'for_month')
+            .order_by('for_datapoint__year_EC', 'for_month__number', 'id'),
+            to_attr='prefetched_month_data',
+        ),
+        Prefetch(
+            'records',
+            queryset=KPIRecord.objects.filter(record_type='weekly').order_by('date'),
+            to_attr='prefetched_weekly_records',
+        ),
+        Prefetch(
+            'records',
+            queryset=KPIRecord.objects.filter(record_type='daily').order_by('date'),
+            to_attr='prefetched_daily_records',
+        ),
+    )
+
+
+def _attach_previous_year_performance(indicator, rows):
+    """
+    Compute the previous-year change for every quarter/month row of an
+    indicator from the already loaded series and store it on the row.
+    """
+    if not rows:
+        return
+    field = period_field(type(rows[0]))
+    deltas = series_deltas(
+        rows,
+        lags=(1,),
+        series=build_series(rows, field),
+        kpi_characteristics={indicator.id: indicator.kpi_characteristics},
+    )
+    for row, delta in zip(rows, deltas[1]):
+        row.prefetched_previous_year_performance = delta
+
+
+def prefetch_indicator_tree(queryset):
+    """
+    Load a list of indicators together with their whole children tree and all
+    annual/quarter/month/weekly/daily series.
+
+    Each level of the tree costs a fixed number of queries regardless of how
+    many indicators it contains. The returned indicators carry the
+    ``prefetched_*`` attributes that IndicatorSerializer reads instead of
+    querying per indicator.
+    """
+    roots = list(queryset.prefetch_related(*_indicator_series_prefetches()))
+    level = roots
+
+    while level:
+        for indicator in level:
+            indicator.prefetched_children = []
+            _attach_previous_year_performance(indicator, list(indicator.quarter_data.all()))
+            _attach_previous_year_performance(indicator, indicator.prefetched_month_data)
+
+        parents = {indicator.id: indicator for indicator in level}
+        children = (
+            Indicator.objects.filter(parent_id__in=parents.keys())
+            .prefetch_related(*_indicator_series_prefetches())
+            .order_by('rank', 'id')
+        )
+
+        children_map = defaultdict(list)
+        for child in children:
+            children_map[child.parent_id].append(child)
+
+        level = []
+        for parent_id, items in children_map.items():
+            parents[parent_id].prefetched_children = items
+            level.extend(items)
+
+    return roots
+
+
+def _bucket_by_week(daily_records):
+    """
+    {(indicator_id, eth_year, eth_month, week): [daily records]} keeping the
+    input order. Days 29-30 get week 5, which no weekly record points at.
+    """
+    buckets = defaultdict(list)
+    for record in daily_records:
+        year, month, day = record.ethiopian_date()
+        buckets[(record.indicator_id, year, month, (day - 1) // 7 + 1)].append(record)
+    return buckets
+
+
+def attach_week_days(weekly_records):
+    """
+    Set ``prefetched_week_days`` on every weekly record: the daily records of
+    its Ethiopian week, newest first.
+
+    Indicators loaded by prefetch_indicator_tree reuse their prefetched daily
+    series; the others are loaded together with one query on the stored
+    Ethiopian week columns.
+    """
+    weekly_records = list(weekly_records)
+    if not weekly_records:
+        return
+
+    keys = {}
+    daily = []
+    pending = set()
+    pending_weeks = set()
+    seen_indicators = set()
+    for week in weekly_records:
+        year, month, week_num = week.ethiopian_week()
+        keys[week] = (week.indicator_id, year, month, week_num)
+
+        indicator = week.indicator
+        prefetched = getattr(indicator, 'prefetched_daily_records', None) if indicator else None
+        if prefetched is None:
+            pending.add(week.indicator_id)
+            pending_weeks.add((year, month, week_num))
+        elif week.indicator_id not in seen_indicators:
+            # prefetched ascending, the queryset default ordering is '-date'
+            daily.extend(prefetched[::-1])
+        seen_indicators.add(week.indicator_id)
+
+    if pending:
+        indicator_filter = Q(indicator_id__in=pending - {None})
+        if None in pending:
+            indicator_filter |= Q(indicator__isnull=True)
+        week_filter = Q()
+        for year, month, week_num in pending_weeks:
+            week_filter |= Q(eth_year=year, eth_month=month, eth_week=week_num)
+        daily.extend(
+            KPIRecord.objects.filter(indicator_filter, week_filter, record_type='daily').order_by('-date')
+        )
+
+    buckets = _bucket_by_week(daily)
+    for week in weekly_records:
+        week.prefetched_week_days = buckets.get(keys[week], [])
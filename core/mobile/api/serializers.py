@@ -14,6 +14,62 @@ from django.db.models import F, Value, Case, When, IntegerField
 from django.db.models.functions import Cast
 from django.db.models import Func
 from django.db import connection
+from django.db.models import prefetch_related_objects
+from Base.deltas import series_deltas
+from .prefetch import attach_week_days, prefetch_indicator_tree
+from Base import latest_values
+
+
+def previous_year_performance(obj):
+    if hasattr(obj, 'prefetched_previous_year_performance'):
+        return obj.prefetched_previous_year_performance
+    return obj.get_previous_year_performance()
+
+
+def chronological(rows):
+    """Quarterly or monthly rows sorted by year, period number and id, with their year and period loaded."""
+    rows = list(rows)
+    if rows:
+        field = rows[0].DELTA_PERIOD_FIELD
+        prefetch_related_objects(rows, 'for_datapoint', field)
+
+        def key(row):
+            period = getattr(row, field)
+            return (row.for_datapoint.year_EC if row.for_datapoint else 0, period.number if period else 0, row.id)
+
+        rows.sort(key=key)
+    return rows
+
+
+class PerformanceDeltaListSerializer(serializers.ListSerializer):
+    """
+    Computes the previous-year change of all rows with one query before they
+    are serialized, instead of one lookup per row. Nested related managers
+    are unordered, so their rows are listed chronologically.
+    """
+    def to_representation(self, data):
+        rows = chronological(data.all()) if isinstance(data, models.manager.BaseManager) else list(data)
+        pending = [row for row in rows if not hasattr(row, 'prefetched_previous_year_performance')]
+        if pending:
+            prefetch_related_objects(pending, 'for_datapoint')
+            for row, delta in zip(pending, series_deltas(pending, lags=(1,))[1]):
+                row.prefetched_previous_year_performance = delta
+        return super().to_representation(rows)
+
+
+class LatestValuesListSerializer(serializers.ListSerializer):
+    """
+    Loads the IndicatorLatest rows of all indicators with one query before
+    they are serialized, for get_latest_data().
+    """
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        # trees loaded by prefetch_indicator_tree already carry their series
+        latest_values.attach([
+            row for row in rows
+            if not hasattr(row, 'prefetched_latest') and not hasattr(row, 'prefetched_annual_data')
+        ])
+        return super().to_representation(rows)
 
 
 class MonthSerializer(serializers.ModelSerializer):
@@ -38,27 +94,30 @@ class AnnualDataPreviousSerializer(serializers.ModelSerializer):
     class Meta:
         model = AnnualData
         fields = ('previous_year_performance_data',)
+        list_serializer_class = PerformanceDeltaListSerializer
 
     def get_previous_year_performance_data(self, obj):
-        return obj.get_previous_year_performance()
+        return previous_year_performance(obj)
     
 class QuarterDataPreviousSerializer(serializers.ModelSerializer):
     previous_year_performance_data = serializers.SerializerMethodField()
     class Meta:
         model = QuarterData
         fields = ('previous_year_performance_data',)
+        list_serializer_class = PerformanceDeltaListSerializer
 
     def get_previous_year_performance_data(self, obj):
-        return obj.get_previous_year_performance()
+        return previous_year_performance(obj)
     
 class MonthDataPreviousSerializer(serializers.ModelSerializer):
     previous_year_performance_data = serializers.SerializerMethodField()
     class Meta:
         model = MonthData
         fields = ('previous_year_performance_data',)
+        list_serializer_class = PerformanceDeltaListSerializer
 
     def get_previous_year_performance_data(self, obj):
-        return obj.get_previous_year_performance()
+        return previous_year_performance(obj)
     
 class TopicSerializer(serializers.ModelSerializer):
     count_category = serializers.SerializerMethodField()
@@ -102,12 +161,13 @@ class QuarterDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuarterData
         fields = '__all__'
+        list_serializer_class = PerformanceDeltaListSerializer
 
     def get_performance(self, obj):
         return round(obj.performance, 2) if obj.performance is not None else None
     
     def get_previous_year_performance_data(self, obj):
-        return obj.get_previous_year_performance()
+        return previous_year_performance(obj)
     
     def get_for_datapoint(self, obj):
         return str(obj.for_datapoint.year_EC) if obj.for_datapoint else None
@@ -122,9 +182,10 @@ class MonthDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = MonthData
         fields = '__all__'
+        list_serializer_class = PerformanceDeltaListSerializer
     
     def get_previous_year_performance_data(self, obj):
-        return obj.get_previous_year_performance()
+        return previous_year_performance(obj)
     
     def get_for_datapoint(self, obj):
         return str(obj.for_datapoint.year_EC) if obj.for_datapoint else None
@@ -132,37 +193,29 @@ class MonthDataSerializer(serializers.ModelSerializer):
     def get_performance(self, obj):
         return round(obj.performance, 2) if obj.performance is not None else None
     
+class WeekDataListSerializer(serializers.ListSerializer):
+    """
+    Groups the daily records of all weeks in one pass before they are
+    serialized, instead of scanning the indicator's days for every week.
+    """
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        attach_week_days([row for row in rows if not hasattr(row, 'prefetched_week_days')])
+        return super().to_representation(rows)
+
+
 class WeekDataSerializer(serializers.ModelSerializer):
     day_data = serializers.SerializerMethodField()
 
     class Meta:
         model = KPIRecord
         fields = ('target', 'performance', 'ethio_date', 'day_data')
+        list_serializer_class = WeekDataListSerializer
 
     def get_day_data(self, obj):
-        # Convert weekly date → Ethiopian
-        eth = to_ethiopian(EthDate(obj.date.day, obj.date.month, obj.date.year))
-
-        # Extract week (YYYY-MM-W)
-        week = int(obj.ethio_date.split("-")[-1])
-
-        # Ethiopian week day range
-        start_day = (week - 1) * 7 + 1
-        end_day = week * 7
-
-        # Fetch all daily records for this indicator
-        daily_qs = KPIRecord.objects.filter(
-            indicator=obj.indicator, record_type="daily"
-        )
-
-        # Filter Ethiopian dates directly
-        filtered = []
-        for r in daily_qs:
-            d = to_ethiopian(EthDate(r.date.day, r.date.month, r.date.year))
-            if d.year == eth.year and d.month == eth.month and start_day <= d.day <= end_day:
-                filtered.append(r)
-
-        return DayDataSerializer(filtered, many=True).data
+        if not hasattr(obj, 'prefetched_week_days'):
+            attach_week_days([obj])
+        return DayDataSerializer(obj.prefetched_week_days, many=True).data
     
 class DayDataSerializer(serializers.ModelSerializer):
     
@@ -183,13 +236,26 @@ class IndicatorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Indicator
         fields = '__all__'
+        list_serializer_class = LatestValuesListSerializer
     
 
     def get_children(self, obj):
-        children_qs = obj.children.filter().order_by("rank") 
+        children_qs = getattr(obj, 'prefetched_children', None)
+        if children_qs is None:
+            children_qs = obj.children.filter().order_by("rank") 
         return IndicatorSerializer(children_qs, many=True, context=self.context).data
     
     def get_annual_data(self, obj):
+        prefetched = getattr(obj, 'prefetched_annual_data', None)
+        if prefetched is not None:
+            # one row per year (first one wins), latest 12 years ascending
+            by_year = {}
+            for row in prefetched:
+                if row.for_datapoint is not None:
+                    by_year.setdefault(row.for_datapoint.year_EC, row)
+            annual_data = [by_year[year] for year in sorted(by_year)][-12:]
+            return AnnualDataSerializer(annual_data, many=True).data
+
         subquery = obj.annual_data.filter(
             Q(for_datapoint__year_EC__isnull=False),
             for_datapoint__year_EC=OuterRef('for_datapoint__year_EC')
@@ -227,48 +293,59 @@ class IndicatorSerializer(serializers.ModelSerializer):
         return QuarterDataSerializer(quarter_list, many=True).data
 
     def get_month_data(self, obj):
+        prefetched = getattr(obj, 'prefetched_month_data', None)
+        if prefetched is not None:
+            return MonthDataSerializer(prefetched[-12:], many=True).data
+
         subquery = obj.month_data.filter(
         Q(for_datapoint__year_EC__isnull=False)
         )
 
-        qs = obj.month_data.filter()[::-1][:12][::-1]
+        qs = obj.month_data.order_by('for_datapoint__year_EC', 'for_month__number')[::-1][:12][::-1]
 
         month_list = list(qs)
 
         return MonthDataSerializer(month_list, many=True).data
     
     def get_week_data(self, obj):
-        weekly_qs = obj.records.filter(record_type="weekly").order_by('date')
+        weekly_qs = getattr(obj, 'prefetched_weekly_records', None)
+        if weekly_qs is None:
+            weekly_qs = obj.records.filter(record_type="weekly").order_by('date')
         return WeekDataSerializer(weekly_qs, many=True).data
  
     def get_day_data(self, obj):
-        daily_qs = obj.records.filter(record_type="daily").order_by('date')
+        daily_qs = getattr(obj, 'prefetched_daily_records', None)
+        if daily_qs is None:
+            daily_qs = obj.records.filter(record_type="daily").order_by('date')
         return DayDataSerializer(daily_qs, many=True).data
     
     def get_latest_data(self, obj):
-        # Get the latest entry based on for_datapoint__year_EC from each dataset
-        latest_annual = obj.annual_data.order_by('-for_datapoint__year_EC').first() if obj.annual_data.exists() else None
-        latest_quarter = obj.quarter_data.order_by('-for_datapoint__year_EC').first() if obj.quarter_data.exists() else None
-        latest_month = obj.month_data.order_by('-for_datapoint__year_EC').first() if obj.month_data.exists() else None
-
-        # Extract year_EC values safely
-        annual_year = getattr(latest_annual.for_datapoint, 'year_EC', None) if latest_annual else None
-        quarter_year = getattr(latest_quarter.for_datapoint, 'year_EC', None) if latest_quarter else None
-        month_year = getattr(latest_month.for_datapoint, 'year_EC', None) if latest_month else None
-
-        # Default to a very old year for comparison if missing
-        annual_year = annual_year or 0
-        quarter_year = quarter_year or 0
-        month_year = month_year or 0
-
-        # Compare the year_EC values to determine the most recent dataset
-        latest_data = max(
-            [(annual_year, 'annual'), (quarter_year, 'quarterly'), (month_year, 'monthly')],
-            key=lambda x: x[0]
-        )
+        if hasattr(obj, 'prefetched_annual_data'):
+            def latest_year(rows):
+                years = [row.for_datapoint.year_EC for row in rows if row.for_datapoint is not None]
+                return max(years) if years else 0
+
+            latest_data = max(
+                [
+                    (latest_year(obj.prefetched_annual_data), 'annual'),
+                    (latest_year(obj.quarter_data.all()), 'quarterly'),
+                    (latest_year(obj.prefetched_month_data), 'monthly'),
+                ],
+                key=lambda x: x[0]
+            )
+            return latest_data[1]
 
-        return latest_data[1]
+        # latest year of each dataset, from the maintained IndicatorLatest rows
+        return latest_values.latest_frequency(obj)
     
+class MobileDashboardOverviewListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        prefetch_related_objects(rows, 'indicator', 'year', 'quarter', 'month')
+        latest_values.attach([row.indicator for row in rows if row.indicator])
+        return super().to_representation(rows)
+
+
 class MobileDashboardOverviewSerializer(serializers.ModelSerializer):
     performance = serializers.SerializerMethodField()
     indicator = IndicatorSerializer()
@@ -276,8 +353,20 @@ class MobileDashboardOverviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = MobileDahboardOverview
         fields = '__all__'
+        list_serializer_class = MobileDashboardOverviewListSerializer
     
     def get_performance(self, obj):
+        # the configured period is usually the latest one, whose change is precomputed
+        if obj.year:
+            if obj.quarter:
+                change = latest_values.previous_year_change(obj.indicator, obj.year.year_EC, obj.quarter.number, 'quarterly')
+            elif obj.month:
+                change = latest_values.previous_year_change(obj.indicator, obj.year.year_EC, obj.month.number, 'monthly')
+            else:
+                change = latest_values.previous_year_change(obj.indicator, obj.year.year_EC)
+            if change is not False:
+                return [{'previous_year_performance_data': change}]
+
         if obj.quarter:
             quarter_data = obj.indicator.quarter_data.filter(Q(for_datapoint__year_EC = obj.year.year_EC) , Q(for_quarter= obj.quarter))
             serializer = QuarterDataPreviousSerializer(quarter_data, many=True)
@@ -310,9 +399,18 @@ class IndicatorPerformanceSerializer(serializers.ModelSerializer):
         five_year_ago_performace = None
         ten_year_ago_performance = None
         if year:
-            previous_year_performance = obj.get_previous_year_performance(year = year , quarter = quarter , month = month)
-            five_year_ago_performace = obj.get_indicator_value_5_years_ago(year = year , quarter = quarter , month = month)
-            ten_year_ago_performance = obj.get_indicator_value_10_years_ago(year = year , quarter = quarter , month = month)
+            if quarter:
+                row = obj.quarter_data.filter(for_datapoint__year_EC = year , for_quarter__title_ENG = quarter).first()
+            elif month:
+                row = obj.month_data.filter(for_datapoint__year_EC = year , for_month__month_ENG = month).first()
+            else:
+                row = obj.annual_data.filter(for_datapoint__year_EC = year).first()
+            if row:
+                # all three lags come from a single series lookup
+                deltas = row.performance_deltas
+                previous_year_performance = deltas[1]
+                five_year_ago_performace = deltas[5]
+                ten_year_ago_performance = deltas[10]
         return {
             'previous_year_performance' : previous_year_performance  ,
             'five_year_ago_performace' :  five_year_ago_performace  ,
@@ -353,7 +451,7 @@ class IndicatorDetailSerializer(serializers.ModelSerializer):
 
         annual_data = obj.annual_data.filter(
             id__in=Subquery(subquery.values('id'))
-        )
+        ).order_by('for_datapoint__year_EC')
 
         return AnnualDataSerializer(annual_data, many=True).data
     
@@ -397,51 +495,7 @@ class IndicatorDetailSerializer(serializers.ModelSerializer):
     
     
     def get_latest_data(self, obj):
-   
-        latest_annual = obj.annual_data.order_by('-for_datapoint__year_EC').first() if obj.annual_data.exists() else None
-        latest_quarter = obj.quarter_data.order_by('-for_datapoint__year_EC').first() if obj.quarter_data.exists() else None
-        latest_month = obj.month_data.order_by('-for_datapoint__year_EC').first() if obj.month_data.exists() else None
-
-        latest_week = obj.records.filter(record_type='weekly').first()
-        latest_day = obj.records.filter(record_type='daily').first()
-
-        def get_year(entry):
-            if not entry:
-                return 0
-            if hasattr(entry, "for_datapoint") and entry.for_datapoint:
-                return int(entry.for_datapoint.year_EC)
-            return 0
-
-        annual_year = get_year(latest_annual)
-        quarter_year = get_year(latest_quarter)
-        month_year = get_year(latest_month)
-
-        def parse_ethio_date(e_date):
-            """e_date: '2017-2-1' or '2017-02-01' → (2017, 2, 1)"""
-            if not e_date:
-                return (0, 0, 0)
-            try:
-                parts = [int(p) for p in e_date.split('-')]
-                if len(parts) == 3:
-                    return (parts[0], parts[1], parts[2])
-            except:
-                pass
-            return (0, 0, 0)
-
-        week_ec = parse_ethio_date(latest_week.ethio_date) if latest_week else (0, 0, 0)
-        day_ec  = parse_ethio_date(latest_day.ethio_date) if latest_day else (0, 0, 0)
-        latest_data = max(
-            [
-                ((annual_year, 0, 0), 'annual'),
-                ((quarter_year, 0, 0), 'quarterly'),
-                ((month_year, 0, 0), 'monthly'),
-                (week_ec, 'weekly'),
-                (day_ec, 'daily'),
-            ],
-            key=lambda x: x[0]
-        )
-
-        return latest_data[1]
+        return latest_values.latest_frequency(obj, ('annual', 'quarterly', 'monthly', 'weekly', 'daily'))
 
     def get_children(self, obj):
         children_qs = obj.children.filter() 
@@ -471,7 +525,7 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
             code_number=Cast(Substr('code', 8), IntegerField())  
         ).order_by("rank", "code", "code_number")
 
-        serializer = IndicatorSerializer(indicators, many=True)
+        serializer = IndicatorSerializer(prefetch_indicator_tree(indicators), many=True)
         return serializer.data
 
     def to_representation(self, instance):
@@ -616,6 +670,7 @@ class IndicatorShortSerializer(serializers.ModelSerializer):
     class Meta:
         model = Indicator
         fields = ('id','title_ENG', 'code', 'measurement_units', 'measurement_units_quarter', 'measurement_units_month','latest_data', 'annual_data', 'quarter_data', 'month_data', 'children', 'kpi_characteristics')
+        list_serializer_class = LatestValuesListSerializer
     
 
     def get_children(self, obj):
@@ -698,28 +753,8 @@ class IndicatorShortSerializer(serializers.ModelSerializer):
         return MonthDataSerializer(month_list, many=True).data
 
     def get_latest_data(self, obj):
-        # Get the latest entry based on for_datapoint__year_EC from each dataset
-        latest_annual = obj.annual_data.order_by('-for_datapoint__year_EC').first() if obj.annual_data.exists() else None
-        latest_quarter = obj.quarter_data.order_by('-for_datapoint__year_EC').first() if obj.quarter_data.exists() else None
-        latest_month = obj.month_data.order_by('-for_datapoint__year_EC').first() if obj.month_data.exists() else None
-
-        # Extract year_EC values safely
-        annual_year = getattr(latest_annual.for_datapoint, 'year_EC', None) if latest_annual else None
-        quarter_year = getattr(latest_quarter.for_datapoint, 'year_EC', None) if latest_quarter else None
-        month_year = getattr(latest_month.for_datapoint, 'year_EC', None) if latest_month else None
-
-        # Default to a very old year for comparison if missing
-        annual_year = annual_year or 0
-        quarter_year = quarter_year or 0
-        month_year = month_year or 0
-
-        # Compare the year_EC values to determine the most recent dataset
-        latest_data = max(
-            [(annual_year, 'annual'), (quarter_year, 'quarterly'), (month_year, 'monthly')],
-            key=lambda x: x[0]
-        )
-
-        return latest_data[1]
+        # latest year of each dataset, from the maintained IndicatorLatest rows
+        return latest_values.latest_frequency(obj)
 
 class HighFrequencySerializer(serializers.ModelSerializer):
     indicator = serializers.SerializerMethodField()
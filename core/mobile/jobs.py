@@ -0,0 +1,32 @@
+import tempfile
+from django.core.files import File
+from Base import exports
+from Base.job_queue import handler
+from Base.models import Indicator
+from .api.api import get_resource_by_data_type
+
+
+# rows written between two progress updates
+PROGRESS_EVERY = 100
+
+
+@handler('export_indicators')
+def export_indicators(job, indicator_ids, data_type='annual', file_type='xlsx', filename='export'):
+    """Write the indicators' data to a CSV or XLSX file attached to the job."""
+    resource_class, _ = get_resource_by_data_type(data_type)
+    rows = exports.export_rows(resource_class(), Indicator.objects.filter(id__in=indicator_ids).order_by('id'))
+    total = len(indicator_ids)
+
+    def tracked():
+        # the first row is the header
+        yield next(rows)
+        for done, row in enumerate(rows):
+            if done and done % PROGRESS_EVERY == 0:
+                job.report_progress(done, total, f'Exported {done} of {total} indicators')
+            yield row
+
+    with tempfile.TemporaryFile() as spool:
+        exports.write_file(tracked(), spool, file_type)
+        spool.seek(0)
+        job.result_file.save(f'{filename}.{file_type}', File(spool), save=False)
+    return {'indicators': total}
@@ -1,3 +1,307 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
 
-# Create your tests here.
+from Base.models import (
+    AnnualData,
+    Category,
+    DataPoint,
+    Indicator,
+    IndicatorLatest,
+    Job,
+    KPIRecord,
+    Month,
+    MonthData,
+    Quarter,
+    QuarterData,
+)
+from mobile.api.prefetch import prefetch_indicator_tree
+from mobile.api.serializers import (
+    IndicatorSerializer, IndicatorShortSerializer, MobileDashboardOverviewSerializer, WeekDataSerializer,
+)
+from mobile.models import MobileDahboardOverview
+from UserManagement.models import CustomUser
+from Base import api_cache, job_queue, resource
+from Base.ethiopian_calendar import to_ethiopian_date
+
+
+class IndicatorTreeFixtureMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name_ENG='Economy', name_AMH='ኢኮኖሚ', code='ECO')
+        cls.years = [DataPoint.objects.create(year_EC=year) for year in range(2000, 2016)]
+        cls.quarters = [
+            Quarter.objects.create(title_ENG=f'Q{n}', title_AMH=f'ሩብ {n}', number=n) for n in range(1, 5)
+        ]
+        cls.months = [
+            Month.objects.create(month_ENG=f'M{n}', month_AMH=f'ወር {n}', number=n) for n in range(1, 13)
+        ]
+
+    @classmethod
+    def add_indicators(cls, count, start_rank=0):
+        for offset in range(count):
+            rank = start_rank + offset
+            kpi = ('inc', 'dec', 'const')[rank % 3]
+            parent = Indicator.objects.create(title_ENG=f'Indicator {rank}', rank=rank, kpi_characteristics=kpi)
+            parent.for_category.add(cls.category)
+            child = Indicator.objects.create(title_ENG=f'Child {rank}', parent=parent, rank=1, kpi_characteristics=kpi)
+            Indicator.objects.create(title_ENG=f'Grand child {rank}', parent=child, rank=1)
+
+            for indicator in (parent, child):
+                for index, year in enumerate(cls.years):
+                    AnnualData.objects.create(indicator=indicator, for_datapoint=year, performance=100 + index * 3.7 + rank)
+                for index, year in enumerate(cls.years[-3:]):
+                    for quarter in cls.quarters:
+                        QuarterData.objects.create(
+                            indicator=indicator, for_datapoint=year, for_quarter=quarter,
+                            performance=50 + index * 2.5 + quarter.number,
+                        )
+                    for month in cls.months[:6]:
+                        MonthData.objects.create(
+                            indicator=indicator, for_datapoint=year, for_month=month,
+                            performance=index * 1.5 + month.number,
+                        )
+
+            start = date(2024, 1, 1) + timedelta(days=rank)
+            for day in range(10):
+                KPIRecord.objects.create(
+                    indicator=parent, record_type='daily', date=start + timedelta(days=day),
+                    performance=day, target=10,
+                )
+
+    def kpis_queryset(self):
+        return self.category.indicators.filter(
+            is_dashboard_visible=True,
+            parent__isnull=True,
+        ).distinct().order_by("rank", "id")
+
+
+class PrefetchedIndicatorSerializerTests(IndicatorTreeFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_indicators(3)
+
+    def test_prefetched_output_matches_per_indicator_queries(self):
+        expected = JSONRenderer().render(IndicatorSerializer(self.kpis_queryset(), many=True).data)
+        actual = JSONRenderer().render(IndicatorSerializer(prefetch_indicator_tree(self.kpis_queryset()), many=True).data)
+
+        self.assertEqual(expected, actual)
+        self.assertEqual(len(json.loads(actual)), 3)
+
+    def test_unordered_tables_are_listed_chronologically(self):
+        indicator = self.kpis_queryset().first()
+        # written after the later years, so the row ids are out of order
+        QuarterData.objects.create(indicator=indicator, for_datapoint=self.years[0], for_quarter=self.quarters[1], performance=1)
+        QuarterData.objects.create(indicator=indicator, for_datapoint=self.years[0], for_quarter=self.quarters[0], performance=1)
+
+        data = IndicatorSerializer(Indicator.objects.get(id=indicator.id)).data
+        periods = [(row['for_datapoint'], row['for_quarter']) for row in data['quarter_data']]
+        self.assertEqual(periods[:2], [('2000', 'Q1'), ('2000', 'Q2')])
+        self.assertEqual(periods, sorted(periods))
+        prefetched = IndicatorSerializer(prefetch_indicator_tree(Indicator.objects.filter(id=indicator.id)), many=True).data
+        self.assertEqual(JSONRenderer().render(prefetched[0]['quarter_data']), JSONRenderer().render(data['quarter_data']))
+
+    def test_query_count_does_not_grow_with_indicator_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                IndicatorSerializer(prefetch_indicator_tree(self.kpis_queryset()), many=True).data
+            return len(queries)
+
+        baseline = count_queries()
+        self.add_indicators(5, start_rank=10)
+        self.assertEqual(count_queries(), baseline)
+        self.assertLessEqual(baseline, 30)
+
+
+class WeekDataSerializerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.indicators = [Indicator.objects.create(title_ENG=f'KPI {n}') for n in range(3)]
+        start = date(2023, 9, 1)
+        for indicator in cls.indicators:
+            for offset in range(0, 120):
+                KPIRecord.objects.create(
+                    indicator=indicator, record_type='daily', date=start + timedelta(days=offset),
+                    performance=offset, target=indicator.id,
+                )
+
+    def expected_days(self, week):
+        # the original per-week scan over every daily record of the indicator
+        year, month, _ = to_ethiopian_date(week.date)
+        number = int(week.ethio_date.split('-')[-1])
+        days = []
+        for record in KPIRecord.objects.filter(indicator=week.indicator, record_type='daily'):
+            eth_year, eth_month, eth_day = to_ethiopian_date(record.date)
+            if (eth_year, eth_month) == (year, month) and (number - 1) * 7 < eth_day <= number * 7:
+                days.append({'target': str(record.target), 'performance': str(record.performance), 'ethio_date': record.ethio_date})
+        return days
+
+    def test_days_grouped_with_one_query(self):
+        weeks = list(KPIRecord.objects.filter(record_type='weekly').select_related('indicator').order_by('date'))
+        self.assertGreater(len(weeks), 12)
+
+        with self.assertNumQueries(1):
+            data = WeekDataSerializer(weeks, many=True).data
+
+        for week, row in zip(weeks, data):
+            self.assertEqual(json.loads(json.dumps(row['day_data'])), self.expected_days(week))
+
+
+class CachedEndpointTests(IndicatorTreeFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_indicators(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_kpis(self):
+        response = self.client.get(f'/api/mobile/kpis/{self.category.id}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_hits_are_served_without_queries(self):
+        first = self.get_kpis()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_kpis(), first)
+        self.assertEqual(api_cache.stats()['kpis'], {'hits': 1, 'misses': 1, 'timeout': 300})
+
+    def test_edits_invalidate_cached_payload(self):
+        self.get_kpis()
+        row = AnnualData.objects.filter(indicator__title_ENG='Indicator 0').latest('for_datapoint__year_EC')
+        with self.captureOnCommitCallbacks(execute=True):
+            row.performance = 12345
+            row.save()
+            # the version is only bumped once the write commits
+            self.assertNotIn(12345, [item['performance'] for item in self.get_kpis()[0]['annual_data']])
+
+        annual = self.get_kpis()[0]['annual_data']
+        self.assertIn(12345, [item['performance'] for item in annual])
+
+        Indicator.objects.filter(title_ENG='Indicator 1').update(title_ENG='Renamed')
+        self.assertNotIn('Renamed', [item['title_ENG'] for item in self.get_kpis()])
+        with self.captureOnCommitCallbacks(execute=True):
+            api_cache.invalidate(Indicator)
+        self.assertIn('Renamed', [item['title_ENG'] for item in self.get_kpis()])
+
+    def test_missing_objects_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/mobile/kpis/0').status_code, 404)
+        self.assertEqual(self.client.get('/api/mobile/kpis/0').status_code, 404)
+        self.assertEqual(api_cache.stats()['kpis']['hits'], 0)
+
+
+class LatestValuesTests(IndicatorTreeFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_indicators(2)
+        call_command('rebuild_indicator_series', stdout=StringIO())
+        cls.indicator = Indicator.objects.get(title_ENG='Indicator 1')
+
+    def test_latest_rows(self):
+        annual = IndicatorLatest.objects.get(indicator=self.indicator, frequency='annual')
+        self.assertEqual(annual.year_EC, 2015)
+        self.assertEqual(annual.value, AnnualData.objects.get(indicator=self.indicator, for_datapoint__year_EC=2015).performance)
+        self.assertEqual(annual.previous_year_value, annual.previous_value)
+
+        quarter = IndicatorLatest.objects.get(indicator=self.indicator, frequency='quarterly')
+        self.assertEqual((quarter.year_EC, quarter.period), (2015, 4))
+        self.assertEqual(IndicatorLatest.objects.get(indicator=self.indicator, frequency='daily').date, date(2024, 1, 11))
+        self.assertEqual(IndicatorShortSerializer(self.indicator).data['latest_data'], 'annual')
+
+    def test_overview_performance_matches_row_deltas(self):
+        overviews = [
+            MobileDahboardOverview.objects.create(indicator=self.indicator, year=self.years[-1], rank=1),
+            MobileDahboardOverview.objects.create(indicator=self.indicator, year=self.years[-1], quarter=self.quarters[3], rank=2),
+            MobileDahboardOverview.objects.create(indicator=self.indicator, year=self.years[-2], month=self.months[2], rank=3),
+        ]
+        expected = [
+            AnnualData.objects.get(indicator=self.indicator, for_datapoint=self.years[-1]),
+            QuarterData.objects.get(indicator=self.indicator, for_datapoint=self.years[-1], for_quarter=self.quarters[3]),
+            MonthData.objects.get(indicator=self.indicator, for_datapoint=self.years[-2], for_month=self.months[2]),
+        ]
+
+        data = MobileDashboardOverviewSerializer(overviews, many=True).data
+        for row, obj in zip(data, expected):
+            self.assertEqual(row['performance'], [{'previous_year_performance_data': obj.get_previous_year_performance()}])
+
+
+class WideExportTests(IndicatorTreeFixtureMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.add_indicators(3)
+
+    def export(self, resource_class):
+        return resource_class().export(Indicator.objects.filter(for_category=self.category).distinct())
+
+    def test_rows_match_the_stored_observations(self):
+        dataset = self.export(resource.quarter_aggregate_resource())
+        indicator = Indicator.objects.get(title_ENG='Indicator 1')
+        row = next(row for row in dataset.dict if row['title_ENG'] == 'Indicator 1')
+        for quarter in QuarterData.objects.filter(indicator=indicator).select_related('for_datapoint', 'for_quarter'):
+            self.assertEqual(row[f'{quarter.for_quarter.title_ENG} {quarter.for_datapoint.year_EC}'], quarter.performance)
+        self.assertEqual(row['Q1 2000'], '')
+        self.assertEqual(row['Category'], 'Economy')
+
+        annual = next(row for row in self.export(resource.annual_aggregate_resource()).dict if row['title_ENG'] == 'Indicator 1')
+        self.assertEqual(annual['2015'], AnnualData.objects.get(indicator=indicator, for_datapoint__year_EC=2015).performance)
+
+    def test_query_count_does_not_grow_with_indicator_count(self):
+        resource_class = resource.month_aggregate_resource()
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.export(resource_class)
+            return len(queries)
+
+        baseline = count_queries()
+        self.add_indicators(5, start_rank=10)
+        self.assertEqual(count_queries(), baseline)
+        self.assertLessEqual(baseline, 5)
+
+    def test_download_endpoint(self):
+        response = self.client.get(f'/api/mobile/export-category-data/{self.category.id}/?data_type=quarter&file_type=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        header = response.getvalue().decode().splitlines()[0]
+        self.assertTrue(header.startswith('Topic,Category,'))
+        self.assertIn('Q4 2015', header)
+
+    def test_background_export_produces_a_download(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        url = f'/api/mobile/export-category-data/{self.category.id}/?data_type=month&file_type=csv&background=1'
+        # anonymous users cannot poll a job, so they get the streamed export
+        self.assertTrue(self.client.get(url).streaming)
+
+        self.client.force_login(CustomUser.objects.create(email='export@example.com', username='export'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['data']['status_url']
+
+        job_queue.discover()
+        job_queue.run_pending()
+        job = self.client.get(status_url).json()
+        self.assertEqual(job['status'], 'succeeded')
+        with Job.objects.get(token=job['token']).result_file.open() as exported:
+            lines = exported.read().decode().splitlines()
+        self.assertTrue(lines[0].startswith('Topic,Category,'))
+        self.assertEqual(len(lines), 1 + Indicator.objects.filter(for_category=self.category).count())
@@ -0,0 +1,83 @@
+"""
+Read replica routing.
+
+Read-only API requests (GET/HEAD/OPTIONS to the views in
+settings.READ_REPLICA_VIEW_MODULES) read from one of the replica aliases in
+settings.DATABASE_REPLICAS; everything else, and every write, goes to the
+primary ``default`` database. Without replicas all traffic stays on
+``default``. Code that writes what it reads (series rebuilds, the KPI
+period catalog, the dashboard snapshot) pins its reads to ``default`` with
+``read_from_replicas(False)``, so a lagging replica cannot be copied back
+into the primary.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def reading_from_replicas():
+    return getattr(_state, 'use_replicas', False)
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    """Route the reads of the block to the replicas."""
+    previous = reading_from_replicas()
+    _state.use_replicas = enabled
+    try:
+        yield
+    finally:
+        _state.use_replicas = previous
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and reading_from_replicas():
+            return random.choice(aliases)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        pool = {'default', *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReadReplicaMiddleware:
+    """Send the reads of read-only API requests to the replicas."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            _state.use_replicas = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS:
+            return None
+        module = getattr(view_func, '__module__', '') or ''
+        if module.startswith(tuple(settings.READ_REPLICA_VIEW_MODULES)):
+            _state.use_replicas = True
+        return None
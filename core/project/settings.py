@@ -3,7 +3,7 @@ import os
 import django
 from django.utils.translation import gettext
 django.utils.translation.ugettext = gettext
-from decouple import config
+from decouple import Csv, config
 from import_export.formats.base_formats import CSV, XLSX
 
 
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'auditlog.middleware.AuditlogMiddleware',
+    'project.db_router.ReadReplicaMiddleware',
 ]
 
 
@@ -119,13 +120,73 @@ REST_FRAMEWORK = {
 WSGI_APPLICATION = 'project.wsgi.application'
 
 # Database
-DATABASES = {
+# DB_ENGINE is 'sqlite' (single node, tests) or 'postgres'
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+if DB_ENGINE == 'postgres':
+    DATABASE_PROFILE = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': config('DB_NAME', default='tsms'),
+        'USER': config('DB_USER', default='tsms'),
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'PORT': config('DB_PORT', default='5432'),
+        # persistent per-worker connections, checked before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        # required when connections go through PgBouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
+        'OPTIONS': {'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int)},
+    }
+    DATABASES = {'default': {**DATABASE_PROFILE, 'HOST': config('DB_HOST', default='localhost')}}
+    # DB_REPLICA_HOSTS=replica1.example,replica2.example
+    for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+        DATABASES[f'replica_{index}'] = {**DATABASE_PROFILE, 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            # seconds a writer waits for the write lock before "database is locked"
+            'OPTIONS': {'timeout': config('DB_BUSY_TIMEOUT', default=20, cast=int)},
+        }
+    }
+    # run on every new connection by project.sqlite
+    SQLITE_PRAGMAS = {
+        'cache_size': -config('SQLITE_CACHE_SIZE_KB', default=64000, cast=int),
+        'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+    }
+
+# Read-only API traffic goes to the replicas (project.db_router)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['project.db_router.ReplicaRouter']
+READ_REPLICA_VIEW_MODULES = ('mobile.', 'DataPortal.', 'Base.api.')
+
+# Cache
+# CACHE_BACKEND is 'locmem', 'file', 'redis' or a dotted backend path. The API cache
+# versions must be shared by all uWSGI workers, so production defaults to 'file'.
+CACHE_BACKEND = config('CACHE_BACKEND', default='file' if DJANGO_ENV == 'production' else 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'tsms'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND_PATH, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS.get(CACHE_BACKEND, (CACHE_BACKEND, ''))
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKEND_PATH,
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_DEFAULT_LOCATION),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
     }
 }
 
+# Per-endpoint lifetimes of the API cache (Base.api_cache) in seconds,
+# e.g. API_CACHE_TTLS=kpis:60,topic_lists:900
+API_CACHE_TTLS = config(
+    'API_CACHE_TTLS', default='',
+    cast=lambda value: {
+        name.strip(): int(ttl) for name, ttl in (item.split(':') for item in value.split(',') if item.strip())
+    },
+)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -181,6 +242,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 #Import export
 IMPORT_FORMATS = [CSV, XLSX]
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 5000
+# parsed uploads waiting for confirmation (Base.import_staging); the system temp dir when empty
+IMPORT_STAGING_DIR = config('IMPORT_STAGING_DIR', default='')
+IMPORT_STAGE_MAX_AGE = config('IMPORT_STAGE_MAX_AGE', default=6 * 60 * 60, cast=int)
 
 
 AUTH_USER_MODEL = 'UserManagement.CustomUser'
@@ -0,0 +1,62 @@
+"""
+SQLite connection setup for single-node installs and tests.
+
+Every new SQLite connection is switched to write-ahead logging and tuned with
+the pragmas in ``settings.SQLITE_PRAGMAS``, so readers keep working while an
+import writes. Writers wait up to the connection ``timeout`` for the write
+lock; ``retry_when_locked`` re-runs a whole transaction when SQLite still
+gives up with "database is locked".
+"""
+import time
+from django.conf import settings
+from django.db import OperationalError, connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # fsync at checkpoints only; safe with WAL
+    'synchronous': 'NORMAL',
+    # negative = KiB of page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+def pragmas():
+    """The PRAGMA statements run on every new SQLite connection."""
+    values = {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return [f'PRAGMA {name}={value}' for name, value in values.items()]
+
+
+@receiver(connection_created, dispatch_uid='sqlite_connection_setup')
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragmas():
+            cursor.execute(statement)
+
+
+def is_locked_error(error):
+    return isinstance(error, OperationalError) and 'database is locked' in str(error)
+
+
+def retry_when_locked(func, *args, attempts=5, delay=0.2, connection=None, **kwargs):
+    """
+    Call ``func(*args, **kwargs)``, which runs its own transaction, and call
+    it again with a growing delay while SQLite reports "database is locked".
+
+    Inside an outer transaction a retry would replay only part of it, so the
+    error is raised straight away there.
+    """
+    connection = connection or default_connection
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            if not is_locked_error(e) or attempt == attempts or connection.in_atomic_block:
+                raise
+        time.sleep(delay * attempt)
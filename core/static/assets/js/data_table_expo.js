@@ -41,6 +41,7 @@
   let sidebarPage = 1;
   let sidebarHasNext = false;
   let sidebarHasPrev = false;
+  let sidebarCursors = {}; // page -> keyset cursor (weekly/daily sidebars)
   let currentSidebarResults = []; // Sync table rows with sidebar items
 
   // --- Helpers
@@ -273,6 +274,7 @@
   // --- Sidebar helpers -------------------------------------------------
   function resetSidebar() {
     sidebarPage = 1;
+    sidebarCursors = {};
     sidebarSelectedItem = null;
     sidebarFilter = null;
     sidebarHasNext = false;
@@ -324,10 +326,19 @@
     );
     $("#sidebar-loading").removeClass("hidden");
 
-    $.get(url, { page: sidebarPage, ids: selections.indicators.map(i => i.id).join(",") })
+    const params = { page: sidebarPage, ids: selections.indicators.map(i => i.id).join(",") };
+    if (sidebarCursors[sidebarPage] !== undefined) {
+      params.cursor = sidebarCursors[sidebarPage];
+    }
+    const requestedPage = sidebarPage;
+
+    $.get(url, params)
       .done(function (resp) {
         console.log("[Sidebar] Received response:", resp);
         const respObj = (resp && resp.results) ? resp : (Array.isArray(resp) ? { results: resp } : (resp || {}));
+        if (respObj.next_cursor !== undefined && respObj.next_cursor !== null) {
+          sidebarCursors[requestedPage + 1] = respObj.next_cursor;
+        }
         const items = respObj.results || [];
         currentSidebarResults = items;
 